@@ -9,5 +9,8 @@ if __name__ == "__main__":
     # 我們直接從 src 套件中匯入並執行 main 函式。
     # Python 會自動將 main.py 所在的目錄加入到 sys.path，
     # 因此可以直接匯入 'src'。
+    # 合成子程序 (synth_service.py) 以 spawn 啟動；打包後的執行檔需要 freeze_support 才能正確啟動子程序。
+    import multiprocessing
+    multiprocessing.freeze_support()
     from src.__main__ import main
     main()
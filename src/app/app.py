@@ -8,6 +8,7 @@
 import queue
 import os
 import sys
+import time
 import threading
 import collections
 import ctypes
@@ -38,12 +39,17 @@ except ImportError:
     pywin32_installed = False
 
 from ..utils.deps import (
-    APP_VERSION, CABLE_INPUT_HINT,
+    APP_VERSION, CABLE_INPUT_HINT, TRACE_DIR, PROFILE_DIR,
     ENGINE_EDGE, ENGINE_PYTTX3, ENGINE_CHAT_TTS, DEFAULT_EDGE_VOICE,
     ENGINE_SHERPA_VITS_ZH_AISHELL3, ENGINE_VITS_PIPER_EN_US_GLADOS,
     DependencyManager, ModelDownloader, delete_model as util_delete_model, IS_WINDOWS, check_model_downloaded # NEW: import check_model_downloaded
 )
 from .audio_engine import AudioEngine
+from .play_scheduler import PRIORITY_QUICK_PHRASE, PRIORITY_TYPED
+from .tracing import tracer
+from . import metrics
+from .profiler import profiler
+from .stall_detector import StallDetector
 from ..ui.popups import SettingsWindow, QuickPhrasesWindow, ModelManagementWindow
 from ..ui.main_window import MainWindow
 from .config_manager import ConfigManager
@@ -60,7 +66,9 @@ class AppSignals(QObject):
     prompt_vbcable_setup = pyqtSignal(str)
     check_for_updates = pyqtSignal(bool) # title, message, type, callback_or_event
     show_messagebox_signal = pyqtSignal(str, str, str, object)
-    show_quick_input_signal = pyqtSignal()
+    show_quick_input_signal = pyqtSignal(object) # 追蹤 ID (未啟用追蹤時為 None)
+    devices_changed = pyqtSignal()
+    model_loaded = pyqtSignal(str, bool) # model_id, 是否成功
 
 class LocalTTSPlayer(QObject):
     def __init__(self, startupinfo=None):
@@ -129,6 +137,10 @@ class LocalTTSPlayer(QObject):
         # --- 增強: 初始化動畫管理器 ---
         self.animator = AnimationManager(self.root)
 
+        self.audio.synthesis_workers = self.config.get("synthesis_workers", 2)
+        self.audio.on_devices_changed = self.signals.devices_changed.emit
+        if self.config.get("detect_device_changes", True):
+            self._watch_device_changes()
         self.audio.start() # UI 建立完成後，再啟動音訊背景執行緒
         # 載入設定
         self.audio.set_engine(self.config.get("engine", ENGINE_PYTTX3)) # Default to pyttsx3
@@ -138,12 +150,68 @@ class LocalTTSPlayer(QObject):
         self.audio.tts_pitch  = self.config.get("pitch", 0)
         self.log_message(f"DEBUG: LocalTTSPlayer.__init__: Loaded global TTS Rate: {self.audio.tts_rate}, Volume: {self.audio.tts_volume}, Pitch: {self.audio.tts_pitch}", "DEBUG")
         self.audio.set_listen_config(self.config.get("enable_listen_to_self"), self.config.get("listen_device_name"), self.config.get("listen_volume"))
+        self.audio.set_cache_budget(int(self.config.get("audio_cache_max_mb", 64)) * 1024 * 1024)
+        self.audio.configure_disk_cache(self.config.get("enable_disk_cache", True), int(self.config.get("disk_cache_max_mb", 256)) * 1024 * 1024)
+        self.audio.configure_model_pool(
+            self.config.get("model_pool_max_models", 3),
+            int(self.config.get("model_pool_max_mb", 1024)) * 1024 * 1024,
+            float(self.config.get("model_pool_idle_minutes", 15)) * 60,
+            pinned_model=self.config.get("engine") if self.config.get("pin_default_model", True) else None,
+        )
+        self.audio.set_onnx_overrides(self.config.get("onnx_num_threads", 0), self.config.get("onnx_max_num_sentences", 0))
+        self.audio.auto_tune_models = bool(self.config.get("auto_tune_models", False))
+        self.audio.set_parallel_sessions(self.config.get("sherpa_parallel_sessions", 1))
+        self.audio.set_process_workers(self.config.get("synthesis_process_workers", 0))
+        self.audio.latency_log_each = bool(self.config.get("latency_log_each", False))
+        self.audio.latency_report_interval = int(self.config.get("latency_report_interval", 20))
+        tracer.configure(enabled=self.config.get("trace_enabled", False))
+        profiling = self.config.get("profiling_enabled", False) or os.environ.get("JUMOUTH_PROFILE", "0") not in ("", "0")
+        profiler.configure(enabled=profiling, out_dir=PROFILE_DIR,
+                           interval_ms=self.config.get("profiling_interval_ms", 10),
+                           max_files=self.config.get("profiling_max_files", 100), log=self.log_message)
+        if profiler.enabled:
+            self.log_message(f"效能分析已啟用，結果輸出到 {PROFILE_DIR}")
+        self.stall_detector = None
+        stall_threshold = int(self.config.get("ui_stall_threshold_ms", 50) or 0)
+        if stall_threshold > 0:
+            self.stall_detector = StallDetector(
+                self.log_message, threshold_ms=stall_threshold,
+                summary_interval=float(self.config.get("ui_stall_summary_minutes", 10)) * 60)
+            metrics.registry.register_collector(self.stall_detector.collect_metrics)
+            self.stall_detector.start()
+        self.metrics_server = None
+        metrics_port = int(self.config.get("metrics_port", 0) or 0)
+        if metrics_port > 0:
+            self.metrics_server = metrics.MetricsServer(metrics.registry, metrics_port, log=self.log_message)
+            if not self.metrics_server.start():
+                self.metrics_server = None
+        self._trace_shortcut = QShortcut(QKeySequence("Ctrl+Shift+T"), self.main_window)
+        self._trace_shortcut.activated.connect(self.export_trace)
+        self.audio.configure_play_queue(
+            max_depth=self.config.get("play_queue_max_depth", 8),
+            coalesce_window=self.config.get("duplicate_coalesce_sec", 1.5),
+            quick_phrase_deadline=self.config.get("quick_phrase_deadline_sec", 5),
+            typed_deadline=self.config.get("typed_text_deadline_sec", 60),
+        )
 
         self._update_hotkey_display(self.config.get("hotkey"))
 
         # --- PyQt 信號連接 ---
         self._connect_signals()
 
+        # 背景模型載入: 在下拉選單快速切換時去抖動，只載入最後選擇的模型
+        self._pending_model_id = None
+        self._model_load_timer = QTimer()
+        self._model_load_timer.setSingleShot(True)
+        self._model_load_timer.setInterval(250)
+        self._model_load_timer.timeout.connect(self._start_pending_model_load)
+
+        # 快捷語音預先合成: 設定連續變動 (例如拖動滑桿) 時只在停止變動後觸發一次
+        self._phrase_warmup_timer = QTimer()
+        self._phrase_warmup_timer.setSingleShot(True)
+        self._phrase_warmup_timer.setInterval(800)
+        self._phrase_warmup_timer.timeout.connect(self._warm_up_quick_phrases)
+
         # 啟動音訊狀態佇列的消費者
         self.audio_status_timer = QTimer()
         self.audio_status_timer.timeout.connect(self._process_audio_status_queue)
@@ -153,7 +221,7 @@ class LocalTTSPlayer(QObject):
         QTimer.singleShot(100, lambda: self.updater.check_for_updates(silent=True))
 
         # 依賴流程（先 Log，再詢問）
-        QTimer.singleShot(2000, lambda: threading.Thread(target=self._dependency_flow_thread, daemon=True).start())
+        QTimer.singleShot(2000, lambda: threading.Thread(target=profiler.wrap("dependency-flow", self._dependency_flow_thread), daemon=True).start())
         
         # 在 UI 完全建立後，根據設定檔設定開關狀態
         if self.enable_quick_phrases:
@@ -183,6 +251,8 @@ class LocalTTSPlayer(QObject):
         self.signals.check_for_updates.connect(self.updater.check_for_updates, Qt.ConnectionType.QueuedConnection)
         self.signals.show_messagebox_signal.connect(self._show_messagebox_slot, Qt.ConnectionType.QueuedConnection)
         self.signals.show_quick_input_signal.connect(self._show_quick_input_slot, Qt.ConnectionType.QueuedConnection)
+        self.signals.devices_changed.connect(self._on_devices_changed, Qt.ConnectionType.QueuedConnection)
+        self.signals.model_loaded.connect(self._on_model_loaded, Qt.ConnectionType.QueuedConnection)
 
         # --- 核心修正: 監聽全域焦點變化以關閉快捷輸入框 ---
         QApplication.instance().focusChanged.connect(self.on_global_focus_changed)
@@ -392,15 +462,68 @@ class LocalTTSPlayer(QObject):
 
     def _on_engine_change(self, val):
         if self._ui_loading or not val: return
-        
-        self.audio.set_engine(val)
-        self.log_message(f"切換引擎: {self.audio.current_engine}")
 
         # Set UI properties for Sherpa-ONNX models
         self.main_window.pitch_slider.setEnabled(False)
         self.main_window.pitch_value_label.setText("N/A")
         self.main_window.speed_slider.setRange(0, 20) # 0.0 to 2.0
-        
+
+        if self.audio.sherpa_model_id == val:
+            self._pending_model_id = None
+            self._apply_engine(val)
+            return
+
+        # 模型在背景載入，載入完成前仍由目前的模型處理送出的文字；快速切換時只載入最後選擇的模型
+        self._pending_model_id = val
+        combo = self.main_window.voice_combo
+        combo.blockSignals(True)
+        combo.clear()
+        combo.addItem("正在載入...")
+        combo.setEnabled(False)
+        combo.blockSignals(False)
+        self._model_load_timer.start()
+
+    def _start_pending_model_load(self):
+        model_id = self._pending_model_id
+        if not model_id: return
+        self.log_message(f"嘗試載入 Sherpa-ONNX 模型: {model_id}", "INFO")
+        self.audio.request_model_load(model_id, self.signals.model_loaded.emit)
+
+    def _on_model_loaded(self, model_id, ok):
+        if model_id != self._pending_model_id:
+            # 使用者已改選其他模型，載入好的模型留在模型池中
+            self.audio.release_preloaded_model(model_id)
+            return
+        self._pending_model_id = None
+        if not ok:
+            self.show_messagebox("錯誤", f"載入 Sherpa-ONNX 模型 '{model_id}' 失敗。", "error")
+            # 還原為目前仍在使用的模型
+            previous = self.audio.current_engine
+            self.main_window.engine_combo.blockSignals(True)
+            self.main_window.engine_combo.setCurrentText(previous)
+            self.main_window.engine_combo.blockSignals(False)
+            if self.audio.sherpa_model_id == previous:
+                self.on_voice_change(None)
+            else:
+                # 沒有可用的模型 (例如第一次選擇就載入失敗)，清掉「正在載入...」並恢復下拉選單
+                combo = self.main_window.voice_combo
+                combo.blockSignals(True)
+                combo.clear()
+                combo.setEnabled(True)
+                combo.blockSignals(False)
+            return
+        self._apply_engine(model_id)
+
+    def _apply_engine(self, val):
+        """模型已在記憶體中 (模型池命中)，切換引擎並載入講者與設定。"""
+        if self.audio.sherpa_model_id != val and not self.audio.activate_pooled_model(val):
+            # 背景載入完成後到切換前模型已被模型池淘汰: 重新在背景載入，不在 UI 執行緒上同步載入
+            self.log_message(f"DEBUG: 模型 '{val}' 已不在模型池中，重新在背景載入。", "DEBUG")
+            self._pending_model_id = val
+            self._start_pending_model_load()
+            return
+        self.audio.set_engine(val)
+        self.log_message(f"切換引擎: {self.audio.current_engine}")
         self.config.set("engine", val)
         # This will trigger on_voice_change, which handles loading speakers and settings
         self.on_voice_change(None)
@@ -411,13 +534,9 @@ class LocalTTSPlayer(QObject):
         model_id = self.audio.current_engine
         if not model_id: return
 
-        # Load model if it's not already loaded
-        if self.audio.sherpa_model_id != model_id:
-            self.log_message(f"嘗試載入 Sherpa-ONNX 模型: {model_id}", "INFO")
-            if not self.audio._load_sherpa_onnx_voice(model_id):
-                self.show_messagebox("錯誤", f"載入 Sherpa-ONNX 模型 '{model_id}' 失敗。", "error")
-                # Handle fallback if needed, e.g., switch to another model
-                return
+        # 模型尚未載入 (例如仍在背景載入中) 時不處理講者清單
+        if self.audio.sherpa_model_id != model_id or self._pending_model_id:
+            return
         
         # Populate speaker list and set selection
         combo = self.main_window.voice_combo
@@ -460,6 +579,37 @@ class LocalTTSPlayer(QObject):
         
         # Update settings sliders for the selected model
         self.update_tts_settings(force_load=True)
+        self._schedule_phrase_warmup()
+
+    def _watch_device_changes(self):
+        """系統的音訊輸出設備變更時通知設備快取重新掃描 (不再定期重新初始化 PortAudio)。"""
+        try:
+            from PyQt6.QtMultimedia import QMediaDevices
+        except ImportError:
+            self.log_message("DEBUG: 無法載入 QtMultimedia，只在開啟輸出串流失敗時重新掃描音訊設備。", "DEBUG")
+            return
+        self._media_devices = QMediaDevices()
+        self._media_devices.audioOutputsChanged.connect(self.audio.devices.request_refresh)
+
+    def _on_devices_changed(self):
+        """音訊設備熱插拔後重新填入設備下拉選單，保留目前的選擇。"""
+        devnames = self.audio.get_output_device_names()
+        combo = self.main_window.local_device_combo
+        combo.blockSignals(True)
+        try:
+            combo.clear()
+            combo.addItems(devnames)
+            if self.audio.local_output_device_name in devnames:
+                combo.setCurrentText(self.audio.local_output_device_name)
+        finally:
+            combo.blockSignals(False)
+
+        if self.settings_window:
+            try:
+                self.settings_window.refresh_listen_devices()
+            except RuntimeError:
+                # 設定視窗已關閉，底層 Qt 物件已被刪除
+                self.settings_window = None
 
     def _on_local_device_change(self, device_name):
         if self._ui_loading or not device_name: return
@@ -491,6 +641,21 @@ class LocalTTSPlayer(QObject):
         
         self.config.set_model_setting(model_id, "rate", rate)
         self.config.set_model_setting(model_id, "volume", volume)
+        self._schedule_phrase_warmup()
+
+    def _schedule_phrase_warmup(self):
+        """語音設定變更後重新預先合成快捷語音；進行中的舊工作立即取消。"""
+        self.audio.cancel_phrase_warmup()
+        if self.is_running and self.enable_quick_phrases:
+            self._phrase_warmup_timer.start()
+
+    def _warm_up_quick_phrases(self):
+        if not self.is_running or not self.enable_quick_phrases:
+            return
+        phrases = [p for p in self.quick_phrases if p.get("text") and p.get("hotkey")]
+        if phrases:
+            self.log_message(f"開始在背景預先合成 {len(phrases)} 句快捷語音...", "DEBUG")
+        self.audio.warm_up_phrases(phrases)
 
     def _process_audio_status_queue(self):
         try:
@@ -516,10 +681,13 @@ class LocalTTSPlayer(QObject):
         self.main_window.stop_button.setEnabled(True)
         
         self._start_hotkey_listener()
+        self._schedule_phrase_warmup()
 
     def stop_local_player(self):
         if not self.is_running: return
         self.is_running = False
+        self._phrase_warmup_timer.stop()
+        self.audio.cancel_phrase_warmup()
         if self.hotkey_listener: self.hotkey_listener.stop()
             
         self.main_window.status_label.setText("● 已停止")
@@ -554,6 +722,14 @@ class LocalTTSPlayer(QObject):
                     self.config.set("hotkey", "")
                     config_changed = True
 
+            # 中斷播放 (barge-in) 快捷鍵
+            cancel_hotkey = self.config.get("cancel_hotkey", "")
+            if cancel_hotkey:
+                if self._is_hotkey_valid_for_pynput(cancel_hotkey):
+                    hotkeys[self._normalize_hotkey(cancel_hotkey)] = self._cancel_playback
+                else:
+                    self.log_message(f"已忽略無效的中斷播放快捷鍵 '{cancel_hotkey}'。", "WARN")
+
             # Validate and format quick phrase hotkeys
             if self.enable_quick_phrases:
                 for i, phrase in enumerate(self.quick_phrases):
@@ -594,7 +770,37 @@ class LocalTTSPlayer(QObject):
 
     def _play_quick_phrase(self, text, phrase_info=None):
         if not self.is_running: return
-        self.audio.play_text(text)
+        trace_id = self._start_hotkey_trace("quick_phrase")
+        self.audio.play_text(text, priority=PRIORITY_QUICK_PHRASE, source="quick_phrase", trace_id=trace_id)
+
+    @staticmethod
+    def _start_hotkey_trace(action):
+        """在 pynput 的快捷鍵回呼中呼叫，以觸發時間開始一次追蹤，回傳 trace_id (未啟用時為 None)。"""
+        pressed = time.perf_counter()
+        trace_id = tracer.new_trace("hotkey", ts=pressed, action=action)
+        tracer.begin("hotkey_to_audio", trace_id, ts=pressed, action=action)
+        return trace_id
+
+    def _cancel_playback(self):
+        # 由 pynput 執行緒呼叫；cancel() 不會等待播放執行緒，可直接呼叫
+        if not self.is_running: return
+        self.audio.cancel(flush=True)
+
+    def export_trace(self, path=None):
+        """將目前的追蹤記錄匯出為 Chrome trace-event JSON (預設寫入 traces 資料夾)，回傳檔案路徑。"""
+        if not tracer.enabled:
+            self.log_message("追蹤未啟用 (設定 trace_enabled)。", "WARN")
+            return None
+        if path is None:
+            from datetime import datetime
+            path = os.path.join(TRACE_DIR, f"trace-{datetime.now():%Y%m%d-%H%M%S}.json")
+        try:
+            count = tracer.export_chrome_trace(path)
+        except OSError as e:
+            self.log_message(f"匯出追蹤記錄失敗: {e}", "ERROR")
+            return None
+        self.log_message(f"已匯出 {count} 筆追蹤事件: {path}")
+        return path
 
     # ===================== 快捷鍵編輯 =====================
     def _key_to_str(self, key):
@@ -676,6 +882,10 @@ class LocalTTSPlayer(QObject):
             if main_hotkey == normalized_hotkey:
                 return f"此快捷鍵已被「快捷輸入框」使用。"
 
+        cancel_hotkey = self._normalize_hotkey(self.config.get("cancel_hotkey", ""))
+        if cancel_hotkey and cancel_hotkey == normalized_hotkey:
+            return f"此快捷鍵已被「中斷播放」使用。"
+
         for i, phrase in enumerate(self.quick_phrases):
             if hotkey_type == 'quick_phrase' and i == index:
                 continue
@@ -753,10 +963,16 @@ class LocalTTSPlayer(QObject):
 
     # ===================== 快速輸入框 =====================
     def _show_quick_input(self):
-        self.signals.show_quick_input_signal.emit()
-
-    def _show_quick_input_slot(self):
-        if not self._input_window_lock.acquire(blocking=False): return
+        trace_id = self._start_hotkey_trace("quick_input")
+        tracer.begin("qt_signal_queue", trace_id)
+        self.signals.show_quick_input_signal.emit(trace_id)
+
+    def _show_quick_input_slot(self, trace_id=None):
+        tracer.end("qt_signal_queue", trace_id)
+        if not self._input_window_lock.acquire(blocking=False):
+            tracer.end("hotkey_to_audio", trace_id, result="busy")
+            return
+        shown_at = time.perf_counter()
         try:
             if not self.quick_input_window:
                 from ..ui.popups import QuickInputWindow
@@ -796,6 +1012,8 @@ class LocalTTSPlayer(QObject):
             win.show()
             win.activateWindow()
             win.raise_()
+            tracer.complete("show_quick_input", trace_id, shown_at)
+            win.set_trace(trace_id)
         finally:
             self._input_window_lock.release()
 
@@ -806,15 +1024,26 @@ class LocalTTSPlayer(QObject):
                 if text in self.text_history: self.text_history.remove(text)
                 self.text_history.appendleft(text)
                 self.config.set("text_history", list(self.text_history))
-                self.audio.play_text(text)
+                trace_id = self.quick_input_window.take_trace()
+                with tracer.span("send_quick_input", trace_id):
+                    self.audio.play_text(text, priority=PRIORITY_TYPED, source="quick_input", trace_id=trace_id)
             self.quick_input_window.close()
     
     # ===================== 設定視窗 & 快捷語音 =====================
     def _open_settings_window(self):
         if self.main_window.stacked_layout.currentIndex() == 1: return
         settings_widget = SettingsWindow(self.main_window, self)
+        self.settings_window = settings_widget
         self.main_window.show_overlay(settings_widget)
 
+    def run_onnx_tuning(self):
+        models = self.get_sherpa_onnx_engines()
+        if not models:
+            self.show_messagebox("效能測試", "尚未下載任何 Sherpa-ONNX 模型。", "info")
+            return
+        if self.audio.run_tuning_benchmark(models):
+            self.log_message(f"開始在背景執行效能測試 ({len(models)} 個模型)，期間合成速度可能變慢。")
+
     def _open_quick_phrases_window(self):
         if self.main_window.stacked_layout.currentIndex() == 1: return
         while len(self.quick_phrases) < 10: self.quick_phrases.append({"text": "", "hotkey": ""})
@@ -851,6 +1080,7 @@ class LocalTTSPlayer(QObject):
 
     def _delete_model_thread(self, model_id):
         util_delete_model(model_id, log_cb=self.log_message)
+        self.audio.purge_model_cache(model_id)
         self._refresh_model_management_ui()
 
     def _refresh_model_management_ui(self):
@@ -865,6 +1095,7 @@ class LocalTTSPlayer(QObject):
         self.log_message(f"快捷語音功能已 {'啟用' if self.enable_quick_phrases else '停用'}")
         self.config.set("enable_quick_phrases", self.enable_quick_phrases)
         if self.is_running: self._start_hotkey_listener()
+        self._schedule_phrase_warmup()
     
     def toggle_log_area(self, initial_load=False):
         is_expanded = self.config.get("show_log_area", True)
@@ -879,7 +1110,15 @@ class LocalTTSPlayer(QObject):
             try: self.hotkey_listener.stop() 
             except Exception: pass
         
+        if self.stall_detector:
+            self.stall_detector.stop()
+            for location, count, total_ms in self.stall_detector.hotspots()[:5]:
+                self.log_message(f"介面凍結統計: {location} ({count} 次，累計 {total_ms:.0f} ms)", "DEBUG")
         self.audio.stop()
+        if self.metrics_server:
+            self.metrics_server.stop()
+        if tracer.enabled and len(tracer):
+            self.export_trace()
         self.config.save() # NEW: Save config on exit
         QApplication.instance().quit()
 
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+# 檔案: audio_cache.py
+# 功用: 記憶體內的合成音訊快取。
+#      - 以位元組為單位的容量上限，超過時依最近最少使用 (LRU) 順序淘汰。
+#      - 快捷語音可以「釘選」，釘選的項目永遠不會被淘汰。
+#      - 記錄命中/未命中/淘汰次數，供除錯與效能觀察使用。
+
+import threading
+from collections import OrderedDict
+
+DEFAULT_CACHE_BUDGET_BYTES = 64 * 1024 * 1024
+
+
+class AudioCache:
+    """以 key -> (samples, sample_rate) 儲存合成結果的 LRU 快取。"""
+    def __init__(self, max_bytes=DEFAULT_CACHE_BUDGET_BYTES):
+        self.max_bytes = int(max_bytes)
+        self._entries = OrderedDict()  # key -> (samples, sample_rate)
+        self._pinned = set()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _entry_size(samples) -> int:
+        return int(getattr(samples, "nbytes", 0))
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def get(self, key):
+        """取得快取項目並標記為最近使用；不存在時回傳 None。"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, samples, sample_rate, pinned=False):
+        """加入快取項目；未釘選且大於整個容量上限的項目不會被保存。"""
+        size = self._entry_size(samples)
+        with self._lock:
+            if not pinned and size > self.max_bytes:
+                return False
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= self._entry_size(old[0])
+            self._entries[key] = (samples, sample_rate)
+            self._bytes += size
+            if pinned:
+                self._pinned.add(key)
+            self._evict_locked()
+            return True
+
+    def pin(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._pinned.add(key)
+
+    def unpin_all(self):
+        """解除所有釘選 (例如快捷語音清單或語音設定變更時)，項目仍保留，依 LRU 規則淘汰。"""
+        with self._lock:
+            self._pinned.clear()
+            self._evict_locked()
+
+    def set_max_bytes(self, max_bytes):
+        with self._lock:
+            self.max_bytes = int(max_bytes)
+            self._evict_locked()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._pinned.clear()
+            self._bytes = 0
+
+    def _evict_locked(self):
+        if self._bytes <= self.max_bytes:
+            return
+        for key in list(self._entries.keys()):
+            if self._bytes <= self.max_bytes:
+                break
+            if key in self._pinned:
+                continue
+            samples, _ = self._entries.pop(key)
+            self._bytes -= self._entry_size(samples)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "pinned": len(self._pinned),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": (self.hits / total) if total else 0.0,
+            }
@@ -7,22 +7,26 @@
 #      - 設備管理: 查詢、載入並管理系統中的音訊輸出設備。
 #      - TTS 合成: 根據選擇的引擎，將文字合成為音訊。
 #      - 音訊播放: 將合成的音訊播放到指定的一或多個輸出設備。
-#      - 多設備播放: 實現音訊同時串流到主輸出和一個額外的「聆聽」設備。
+#      - 多設備播放: 實現音訊同時串流到主輸出和一個額外的「聆聽」設備，
+#        每個設備維持一個常駐的 callback 串流 (見 output_stream.py)。
+#      - 分句管線: 長文字逐句合成，第一句合成完成即開始播放，其餘句子邊播邊合成。
+#      - 延遲量測: 每筆請求帶有一條時間軸 (見 latency.py)，播放結束後彙整為各引擎的百分位數。
+#        由快捷鍵觸發的請求另外帶有追蹤 ID，合成與播放的區段會記錄到 tracing.tracer。
+#      - 效能分析: 啟用時每句話 (合成與播放) 與每次模型載入各輸出一份取樣結果 (見 profiler.py)。
 
 import os
 import asyncio
 import threading
-import tempfile
-import shutil # NEW import for file operations
 import numpy as np
 import sounddevice as sd
-from scipy.signal import resample # NEW import
 from datetime import datetime
 import subprocess
 import queue
 import hashlib
+import time
 from pathlib import Path
 import logging
+import contextlib
 
 # 延遲匯入，避免在 ffmpeg 路徑設定前就發出警告
 pyttsx3 = None
@@ -31,8 +35,76 @@ sherpa_onnx = None
 soundfile = None
 
 from ..utils.deps import (DEFAULT_EDGE_VOICE, ENGINE_EDGE, ENGINE_PYTTX3,
-                          CABLE_INPUT_HINT, TTS_MODELS_DIR)
+                          CABLE_INPUT_HINT, TTS_MODELS_DIR, CACHE_DIR)
 from .model_manager import PREDEFINED_MODELS
+from .text_segmenter import segment_text
+from .play_scheduler import PlayScheduler, PRIORITY_QUICK_PHRASE, PRIORITY_TYPED
+from .output_stream import DeviceOutput, write_blocking, DEFAULT_CANCEL_FADE_MS
+from .audio_cache import AudioCache
+from .disk_cache import DiskAudioCache
+from .mp3_decoder import create_mp3_decoder
+from .resampler import StreamResampler
+from . import resampler
+from . import pcm
+from .device_registry import DeviceRegistry
+from .model_staging import remove_staged_model
+from .sherpa_loader import build_sherpa_tts
+from .model_pool import SherpaModelPool
+from . import tuning
+from .parallel_synth import SherpaSessionPool, CrossfadeJoiner, DEFAULT_CROSSFADE_MS
+from .synth_service import SynthesisService
+from .pyttsx3_engine import Pyttsx3Renderer
+from .latency import LatencyTimeline, LatencyStats
+from .tracing import tracer
+from . import metrics
+from .profiler import profiler
+
+# 分句管線: 首段目標合成時間 (秒) 與首段長度的上下限 (字元)
+FIRST_CHUNK_TARGET_SEC = 0.35
+FIRST_CHUNK_MIN_CHARS = 6
+FIRST_CHUNK_MAX_CHARS = 60
+FIRST_CHUNK_DEFAULT_CHARS = 24
+
+# 合成階段的工作執行緒數量 (可由設定 synthesis_workers 覆寫)
+DEFAULT_SYNTHESIS_WORKERS = 2
+MAX_SYNTHESIS_WORKERS = 8
+
+# 快捷語音預先合成: 有即時請求在合成/等待時，每隔多久檢查一次是否可以繼續
+PHRASE_WARMUP_YIELD_SEC = 0.05
+# 批次合成: Edge-TTS 為網路 I/O，可同時送出的請求數
+EDGE_BATCH_CONCURRENCY = 4
+# 自動效能測試: 播放與合成閒置多久後才開始，以及閒置檢查的間隔 (秒)
+AUTO_TUNE_IDLE_SEC = 30.0
+AUTO_TUNE_POLL_SEC = 1.0
+# Edge-TTS 輸出的 MP3 採樣率 (開啟輸出串流時預先設計對應的重採樣濾波器)
+EDGE_TTS_SAMPLE_RATE = 24000
+
+
+def _lower_thread_priority():
+    """降低目前執行緒的 OS 優先權 (僅 Windows)，讓背景合成不與即時請求搶 CPU。"""
+    if os.name != 'nt':
+        return
+    try:
+        import ctypes
+        THREAD_PRIORITY_BELOW_NORMAL = -1
+        kernel32 = ctypes.windll.kernel32
+        kernel32.SetThreadPriority(kernel32.GetCurrentThread(), THREAD_PRIORITY_BELOW_NORMAL)
+    except Exception:
+        pass
+
+
+class _Utterance:
+    """一筆播放請求，由合成階段產生片段、播放階段依序取出播放。"""
+    def __init__(self, seq, text, is_preview=False, item_id=None, timeline=None):
+        self.seq = seq
+        self.text = text
+        self.item_id = item_id # 排程器 (PlayScheduler) 中的項目 ID
+        self.timeline = timeline or LatencyTimeline(text) # 延遲時間軸，合成與播放兩個階段都會寫入
+        self.is_preview = is_preview
+        self.segments = queue.Queue() # (samples, sample_rate)，以 None 表示結束
+        self.cancelled = threading.Event() # 中斷播放 (barge-in) 時設定，合成與播放都會盡快停止
+        self.profile = None # 效能分析區段 (未啟用時為 None)，合成與播放執行緒都會加入，播放結束時完成
+
 
 class AudioEngine:
     def __init__(self, log_cb, audio_status_queue, startupinfo=None):
@@ -55,49 +127,308 @@ class AudioEngine:
         self.listen_device_name = "Default"
         self.listen_volume = 1.0
 
-        self._pyttsx3_engine = None
+        self._pyttsx3_engine = None # 常駐的 pyttsx3 合成執行緒 (第一次合成時建立)
         self._pyttsx3_voices = []
         self._edge_voices = []
         self._sherpa_tts = None
         self.sherpa_model_id = None
-        self._temp_model_dir = None # To hold the TemporaryDirectory object for Sherpa-ONNX models
+        self._model_pool = SherpaModelPool(log_cb) # 常駐的已載入模型 (LRU)
+        self._tuning = tuning.TuningStore(log=log_cb) # 各模型在本機測得的最佳執行參數
+        self.onnx_num_threads_override = 0 # 0 代表使用調校結果
+        self.onnx_max_num_sentences_override = 0
+        self._tuning_thread = None
+        self._tuning_lock = threading.Lock() # 同時只執行一個效能測試 (手動或自動)
+        self.auto_tune_models = False # 模型沒有本機調校結果時，於閒置時自動執行效能測試
+        self._auto_tune_scheduled = set()
+        # 長文字的句子並行合成: 同一模型的多個工作階段 (1 為停用)
+        self.sherpa_parallel_sessions = 1
+        self._session_pool = None
+        self._session_pool_lock = threading.Lock()
+        self._session_pool_building = False
+        # 程序外合成服務: Sherpa-ONNX 與 pyttsx3 在子程序中執行 (0 為停用，於本程序內合成)
+        self.synthesis_process_workers = 0
+        self._synth_service = None
+        # 背景模型載入: 只處理最新的請求；載入完成後由 UI 執行緒切換，切換前的文字仍由舊模型合成
+        self._model_load_lock = threading.Lock()
+        self._model_load_event = threading.Event()
+        self._requested_model = None
+        self._model_load_callback = None
+        self._model_loader_thread = None
+        self._model_loading = False
+        self._model_cond = threading.Condition()
 
         self._local_output_devices = {}
         self._listen_devices = {}
 
         self.local_output_device_name = "Default"
         self.cable_is_present = False
-
-        self.play_queue = queue.Queue()
-        self.worker_thread = None
-
-        self._audio_cache = {} # Initialize audio cache for quick phrases
+        # 設備能力快取；背景定期重新整理以偵測熱插拔
+        self.devices = DeviceRegistry(log_cb, on_refresh=self._on_devices_refreshed, reinit_guard=self._device_reinit_guard)
+        self.on_devices_changed = None # 設備清單變動時的回呼 (由 app 設定，用於更新 UI)
+
+        # 待合成/播放的文字: 依優先權排序，有深度上限、等待期限與重複合併 (見 play_scheduler.py)
+        self.play_queue = PlayScheduler(on_drop=self._on_play_item_dropped)
+        self.synthesis_workers = DEFAULT_SYNTHESIS_WORKERS
+        self.worker_threads = []
+        self.playback_thread = None
+        # 合成與播放兩階段之間的有序緩衝: seq -> _Utterance (None 代表停止信號)
+        self._dequeue_lock = threading.Lock()
+        self._next_seq = 0
+        self._ready = {}
+        self._ready_cond = threading.Condition()
+        # 非執行緒安全的引擎在多個合成執行緒間需序列化
+        self._sherpa_lock = threading.Lock()
+        self._outputs = {} # 角色 ("main"/"listen") -> 常駐的 DeviceOutput
+        self._synth_rates = {EDGE_TTS_SAMPLE_RATE} # 已知的合成採樣率，開啟輸出串流時預先設計重採樣濾波器
+        self._output_lock = threading.Lock() # 播放中持有，避免重新初始化 PortAudio 時串流仍在使用
+        self._reopen_after_reinit = {} # 重新初始化前開啟中的輸出: 角色 -> 採樣率
+
+        self._audio_cache = AudioCache() # 合成音訊的 LRU 快取 (快捷語音會被釘選)
+        self._disk_cache = DiskAudioCache(CACHE_DIR, log=log_cb) # 跨重啟保存的磁碟快取
+        self.enable_disk_cache = True
+        self._synth_chars_per_sec = {} # 各引擎的合成速度 (EMA)，用於決定首段長度
+        self._active_synthesis = 0 # 正在合成的即時請求數量
+        self._active_synthesis_lock = threading.Lock()
+        self._warmup_generation = 0 # 快捷語音預先合成的世代，遞增即取消進行中的工作
+        # 中斷播放: 已取出但尚未播放完的請求 (seq -> _Utterance)，以及各合成執行緒目前請求的取消事件
+        self._live = {}
+        self._live_lock = threading.Lock()
+        self._synth_local = threading.local()
+        self.last_batch_stats = None # 最近一次批次合成的吞吐量統計
+        # 延遲量測: 各引擎的首段音訊延遲百分位數 (latency_percentiles())，以及在日誌面板輸出的方式
+        self.latency = LatencyStats()
+        self.latency_log_each = False # 每句播放完都在日誌面板顯示時間軸摘要
+        self.latency_report_interval = 20 # 每 N 句在日誌面板顯示一次百分位數統計 (0 為停用)
+        metrics.registry.register_collector(self._collect_metrics)
 
     def start(self):
-        self.worker_thread = threading.Thread(target=self._audio_worker, daemon=True)
-        self.worker_thread.start()
+        count = max(1, min(MAX_SYNTHESIS_WORKERS, int(self.synthesis_workers)))
+        self.worker_threads = [
+            threading.Thread(target=self._synthesis_worker, name=f"tts-synth-{i}", daemon=True)
+            for i in range(count)
+        ]
+        for thread in self.worker_threads:
+            thread.start()
+        self.playback_thread = threading.Thread(target=self._playback_worker, name="tts-playback", daemon=True)
+        self.playback_thread.start()
 
     def stop(self):
         self.log("正在停止音訊引擎...", "DEBUG")
-        self.play_queue.put(None)
+        self.devices.stop()
+        self._disk_cache.flush()
+        stats = self._audio_cache.stats()
+        self.log(f"音訊快取統計: {stats['entries']} 筆 / {stats['bytes'] / 1024 / 1024:.1f} MB，"
+                 f"命中 {stats['hits']}、未命中 {stats['misses']}、淘汰 {stats['evictions']}", "DEBUG")
+        for line in self.latency.summary_lines():
+            self.log(f"延遲統計 {line}", "DEBUG")
+        for _ in self.worker_threads:
+            self.play_queue.put_stop()
+        if self._synth_service is not None:
+            self._synth_service.close()
+            self._synth_service = None
+        if self._pyttsx3_engine is not None:
+            self._pyttsx3_engine.close()
         self.log("音訊引擎已停止。")
 
-    def _audio_worker(self):
+    def _publish(self, seq, utterance):
+        with self._ready_cond:
+            self._ready[seq] = utterance
+            self._ready_cond.notify_all()
+
+    def _synthesis_worker(self):
+        """合成階段: 依序取出佇列項目並合成，結果交給有序緩衝，由播放階段依序播放。"""
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
-        self.log("音訊工作執行緒已啟動。", "DEBUG")
+        self.log(f"合成執行緒 {threading.current_thread().name} 已啟動。", "DEBUG")
 
         while True:
-            try:
+            # 取出項目與分配序號必須是同一個原子操作，才能保證播放順序與送出順序一致
+            with self._dequeue_lock:
                 item = self.play_queue.get()
-                if item is None:
-                    self.log("音訊工作執行緒收到停止信號。", "DEBUG")
-                    break
-                self._process_and_play_text(item, loop, self.startupinfo)
+                dequeued = time.perf_counter()
+                seq = self._next_seq
+                self._next_seq += 1
+            if item is None:
+                self.log("合成執行緒收到停止信號。", "DEBUG")
+                self._publish(seq, None)
+                break
+            timeline = LatencyTimeline(item.text, origin=item.enqueued, trace_id=item.trace_id)
+            timeline.mark("dequeue", dequeued)
+            utterance = _Utterance(seq, item.text, item_id=item.id, timeline=timeline)
+            utterance.profile = profiler.start_phase(f"utterance-{seq}")
+            tracer.begin("queued", item.trace_id, ts=item.enqueued, priority=item.priority)
+            tracer.end("queued", item.trace_id, ts=dequeued, seq=seq)
+            with self._live_lock:
+                self._live[seq] = utterance
+            self._publish(seq, utterance)
+            with self._active_synthesis_lock:
+                self._active_synthesis += 1
+            self._synth_local.cancelled = utterance.cancelled
+            try:
+                with tracer.span("synthesize", item.trace_id, engine=self.current_engine), \
+                        profiler.attach(utterance.profile):
+                    self._synthesize_utterance(utterance, loop)
             except Exception as e:
                 self.log(f"音訊工作執行緒發生錯誤: {e}", "ERROR")
+            finally:
+                self._synth_local.cancelled = None
+                with self._active_synthesis_lock:
+                    self._active_synthesis -= 1
+                utterance.segments.put(None)
+        loop.close()
+
+    def _playback_worker(self):
+        """播放階段: 嚴格依序號播放，合成中的項目會邊合成邊播放。"""
+        self.log("播放執行緒已啟動。", "DEBUG")
+        seq = 0
+        while True:
+            with self._ready_cond:
+                while seq not in self._ready:
+                    self._ready_cond.wait()
+                utterance = self._ready.pop(seq)
+            seq += 1
+            if utterance is None:
+                break
+            try:
+                with self._output_lock, tracer.span("playback", utterance.timeline.trace_id, seq=utterance.seq), \
+                        profiler.attach(utterance.profile):
+                    self._play_utterance(utterance)
+            except Exception as e:
+                self.log(f"音訊播放執行緒發生錯誤: {e}", "ERROR")
+            finally:
+                for out in list(self._outputs.values()):
+                    out.feeding = False
+                with self._live_lock:
+                    self._live.pop(utterance.seq, None)
+                self._record_latency(utterance)
+                if utterance.profile is not None:
+                    utterance.profile.finish()
+        with self._output_lock:
+            self._close_all_outputs()
         self.log("音訊工作執行緒已結束。", "DEBUG")
 
+    def cancel(self, flush=True, fade_ms=DEFAULT_CANCEL_FADE_MS):
+        """
+        中斷播放 (barge-in): 輸出在一個音訊區塊內淡出並清空緩衝區，進行中的合成 (含 Sherpa-ONNX) 盡快中止。
+        flush=True 時一併取消所有排隊與合成中的請求；否則只跳過目前這一句。回傳被取消的請求數。
+        可從任何執行緒呼叫，不會等待播放執行緒。
+        """
+        dropped = self.play_queue.clear() if flush else 0
+        with self._live_lock:
+            live = [u for _, u in sorted(self._live.items()) if not u.cancelled.is_set()]
+        targets = live if flush else live[:1]
+        self._cancel_utterances(targets, fade_ms)
+        if targets or dropped:
+            self.log(f"DEBUG: Playback cancelled ({len(targets)} active, {dropped} queued dropped).", "DEBUG")
+            self.audio_status_queue.put(("PLAY", "[■]", "已中斷播放"))
+        return len(targets) + dropped
+
+    def _cancel_utterances(self, utterances, fade_ms=DEFAULT_CANCEL_FADE_MS):
+        # 播放執行緒依序號播放，尚未取消的請求中序號最小的就是正在 (或即將) 播放的那一句
+        with self._live_lock:
+            current = min((seq for seq, u in self._live.items() if not u.cancelled.is_set()), default=None)
+        for utterance in utterances:
+            utterance.cancelled.set()
+            utterance.segments.put(None)  # 喚醒正在等待片段的播放執行緒
+        if current is not None and any(u.seq == current for u in utterances):
+            for out in list(self._outputs.values()):
+                out.cancel(fade_ms)
+
+    # ---------- 播放排程 ----------
+    def configure_play_queue(self, max_depth=None, coalesce_window=None, quick_phrase_deadline=None,
+                             typed_deadline=None):
+        deadlines = {}
+        if quick_phrase_deadline is not None:
+            deadlines[PRIORITY_QUICK_PHRASE] = float(quick_phrase_deadline)
+        if typed_deadline is not None:
+            deadlines[PRIORITY_TYPED] = float(typed_deadline)
+        self.play_queue.configure(max_depth=max_depth, coalesce_window=coalesce_window, deadlines=deadlines)
+
+    def pending_items(self):
+        """等待中 (尚未開始合成) 的項目資訊，依將被處理的順序。"""
+        return self.play_queue.pending()
+
+    def cancel_item(self, item_id) -> bool:
+        """取消指定 ID 的項目: 還在等待就直接移除，已在合成或播放則中斷該句。"""
+        if self.play_queue.cancel(item_id):
+            return True
+        with self._live_lock:
+            targets = [u for u in self._live.values() if u.item_id == item_id and not u.cancelled.is_set()]
+        self._cancel_utterances(targets)
+        return bool(targets)
+
+    def _on_play_item_dropped(self, item, reason):
+        tracer.end("hotkey_to_audio", item.trace_id, result=reason)
+        self.log(f"DEBUG: Play item {item.id} dropped ({reason}): '{item.text[:20]}...'", "DEBUG")
+        if reason == "expired":
+            self.audio_status_queue.put(("INFO", "[⌛]", f"等待過久，已略過: {item.text[:20]}..."))
+        elif reason == "overflow":
+            self.audio_status_queue.put(("INFO", "[⌛]", f"待播放項目過多，已略過: {item.text[:20]}..."))
+
+    def latency_percentiles(self, engine=None, interval="ttfa"):
+        """各引擎的延遲百分位數 (毫秒)，格式見 LatencyStats.percentiles()；快取命中的請求歸在 "cache"。"""
+        return self.latency.percentiles(engine=engine, interval=interval)
+
+    def recent_latency(self, count=None):
+        """最近播放請求的時間軸 (各時間點相對於送出的毫秒數)。"""
+        return self.latency.recent(count)
+
+    def _record_latency(self, utterance):
+        timeline = utterance.timeline
+        timeline.cancelled = utterance.cancelled.is_set()
+        self.latency.record(timeline)
+        if "first_write" not in timeline.marks:
+            tracer.end("hotkey_to_audio", timeline.trace_id, result="cancelled" if timeline.cancelled else "no_audio")
+        if timeline.cancelled:
+            return
+        summary = timeline.summary()
+        self.log(f"Latency: {summary}", "DEBUG")
+        if self.latency_log_each:
+            self.log(f"⏱ {summary}")
+        interval = int(self.latency_report_interval or 0)
+        if interval > 0 and self.latency.recorded % interval == 0:
+            self.log(f"⏱ 最近 {self.latency.window} 句的延遲統計:")
+            for line in self.latency.summary_lines():
+                self.log(f"    {line}")
+
+    def _collect_metrics(self):
+        """指標端點讀取時呼叫 (見 metrics.py)，回傳佇列、快取、合成速度與延遲的即時數值。"""
+        Sample = metrics.Sample
+        samples = [Sample("play_queue_depth", len(self.play_queue), "待播放佇列中的項目數"),
+                   Sample("synthesis_active", self._active_synthesis, "正在合成的請求數")]
+        for reason, count in self.play_queue.stats.items():
+            samples.append(Sample("play_queue_items_total", count, "待播放佇列的項目數 (依結果分類)", "counter",
+                                  {"result": reason}))
+        cache = self._audio_cache.stats()
+        for key in ("entries", "bytes", "max_bytes", "hit_ratio"):
+            samples.append(Sample(f"audio_cache_{key}", cache[key], "記憶體音訊快取"))
+        for key in ("hits", "misses", "evictions"):
+            samples.append(Sample(f"audio_cache_{key}_total", cache[key], "記憶體音訊快取", "counter"))
+        seconds = metrics.synthesis_seconds.values()
+        for engine, audio_sec in metrics.synthesis_audio_seconds.values().items():
+            if audio_sec > 0:
+                samples.append(Sample("synthesis_real_time_factor", seconds.get(engine, 0.0) / audio_sec,
+                                      "合成耗時 / 音訊長度 (累計)", labels={"engine": engine}))
+        for engine, entry in self.latency.percentiles().items():
+            if not entry:
+                continue
+            for pct in (50, 95, 99):
+                samples.append(Sample("time_to_first_audio_ms", entry[f"p{pct}"], "首段音訊延遲 (最近的請求)",
+                                      labels={"engine": engine, "quantile": f"0.{pct}"}))
+        samples.append(Sample("output_streams_open", len(self._outputs), "常駐輸出串流數"))
+        return samples
+
+    def _record_synthesis(self, engine, elapsed, samples, sample_rate):
+        """累計各引擎的合成耗時與產生的音訊長度 (即時率 = 兩者相除)。"""
+        metrics.synthesis_requests.inc(label_value=engine)
+        metrics.synthesis_seconds.inc(elapsed, engine)
+        if sample_rate:
+            metrics.synthesis_audio_seconds.inc(samples / sample_rate, engine)
+            self._synth_rates.add(int(sample_rate))
+
+    def _has_pending_playback(self):
+        return not self.play_queue.empty() or bool(self._ready)
+
     # ---------- 初始化 & 資源 ----------
     def _lazy_import(self):
         """Lazy import of heavy modules."""
@@ -155,127 +486,348 @@ class AudioEngine:
             self.log(f"未定義的模型 ID: {model_id}", "ERROR")
             return False
 
+        # 模型池中已有載入好的實例時直接切換，不必重新載入 ONNX 與 FST
+        if self.activate_pooled_model(model_id):
+            return True
+
+        try:
+            built = self._build_sherpa_tts(model_id)
+        except Exception as e:
+            self.log(f"載入 Sherpa-ONNX 模型失敗: {e}", "ERROR")
+            built = None
+        if built is None:
+            self._sherpa_tts = None
+            self.sherpa_model_id = None
+            return False
+        tts, est_bytes = built
+        # 先設為使用中再放入模型池，避免池已滿時剛載入的模型立刻被淘汰
+        self._activate_sherpa_model(model_id, tts)
+        self._model_pool.put(model_id, tts, est_bytes)
+        return True
+
+    def activate_pooled_model(self, model_id: str) -> bool:
+        """模型已在模型池中時切換為使用中的模型 (只需毫秒，可在 UI 執行緒呼叫)；不在池中時回傳 False，不會載入。"""
+        pooled = self._model_pool.get(model_id)
+        if pooled is None:
+            return False
+        self.log(f"DEBUG: 從模型池切換至 '{model_id}'。", "DEBUG")
+        self._activate_sherpa_model(model_id, pooled)
+        self._model_pool.unprotect(model_id)
+        return True
+
+    def _runtime_params(self, model_id: str):
+        """決定模型的 (num_threads, max_num_sentences)：設定覆寫 > 本機調校結果 > 預設值。"""
+        profile = self._tuning.get(model_id) or {}
+        num_threads = int(self.onnx_num_threads_override) or profile.get("num_threads", tuning.DEFAULT_NUM_THREADS)
+        max_num_sentences = (int(self.onnx_max_num_sentences_override)
+                             or profile.get("max_num_sentences", tuning.DEFAULT_MAX_NUM_SENTENCES))
+        return num_threads, max_num_sentences
+
+    def _build_sherpa_tts(self, model_id: str, num_threads=None, max_num_sentences=None):
+        """建立模型的 OfflineTts 實例，回傳 (tts, 估計的記憶體用量)；檔案不完整時回傳 None。"""
+        if num_threads is None or max_num_sentences is None:
+            num_threads, max_num_sentences = self._runtime_params(model_id)
+        start = time.perf_counter()
+        with profiler.phase(f"model-load-{model_id}"):
+            built = build_sherpa_tts(model_id, num_threads, max_num_sentences, log=self.log)
+        if built is not None:
+            metrics.model_loads.inc(label_value=model_id)
+            metrics.model_load_seconds.inc(time.perf_counter() - start, model_id)
+        return built
+
+    def _activate_sherpa_model(self, model_id: str, tts):
         model_config = PREDEFINED_MODELS[model_id]
-        original_model_dir = Path(TTS_MODELS_DIR) / model_id
-        
-        # 檢查所有模型檔案是否存在 (原始位置)
-        required_files_original = [original_model_dir / fname for fname in model_config["file_names"]]
-        for f in required_files_original:
-            if not f.exists():
-                self.log(f"模型 '{model_id}' 缺少以下檔案：{str(f)}", "WARNING")
-                self.log(f"模型 '{model_id}' 檔案不完整。", "WARNING")
-                self._sherpa_tts = None
-                self.sherpa_model_id = None
+        if self._session_pool is not None and self._session_pool.model_id != model_id:
+            self._drop_session_pool()
+        with self._model_cond:
+            self._sherpa_tts = tts
+            self.sherpa_speakers = [f"Speaker {i}" for i in range(tts.num_speakers)]
+            self.sherpa_model_id = model_id
+            self._model_pool.active_id = model_id
+            self._model_loading = False
+            self._model_cond.notify_all()
+        if self._synth_service is not None:
+            self._synth_service.preload(model_id, *self._runtime_params(model_id))
+        self._schedule_auto_tune(model_id)
+        try:
+            self._prepare_resamplers()
+        except Exception as e:
+            self.log(f"DEBUG: 預先設計重採樣濾波器失敗: {e}", "DEBUG")
+
+        # Load model-specific rate and volume from config, fallback to default_rate/volume from model_config
+        # Note: app_controller is LocalTTSPlayer, which has the config manager
+        self.tts_rate = self.app_controller.config.get_model_setting(model_id, "rate", model_config.get("default_rate", 1.0))
+        self.tts_volume = self.app_controller.config.get_model_setting(model_id, "volume", model_config.get("default_volume", 1.0))
+        self.log(f"DEBUG: _load_sherpa_onnx_voice: Loaded model-specific TTS Rate: {self.tts_rate}, Volume: {self.tts_volume}", "DEBUG")
+
+        self.log(f"DEBUG: Sherpa-ONNX 引擎已成功載入模型 '{model_id}'。設定速率: {self.tts_rate}, 音量: {self.tts_volume}", "DEBUG")
+
+    def request_model_load(self, model_id: str, callback):
+        """
+        在背景載入模型到模型池 (不切換目前的模型)，完成後呼叫 callback(model_id, ok)。
+        連續的請求只會處理最新的一個；呼叫端收到 callback 後再以 activate_pooled_model 切換 (命中模型池，只需毫秒)。
+        """
+        with self._model_cond:
+            self._requested_model = model_id
+            self._model_load_callback = callback
+            self._model_loading = True
+        if self._model_loader_thread is None:
+            self._model_loader_thread = threading.Thread(target=self._model_loader, name="model-loader", daemon=True)
+            self._model_loader_thread.start()
+        self._model_load_event.set()
+
+    def _model_loader(self):
+        while True:
+            self._model_load_event.wait()
+            self._model_load_event.clear()
+            with self._model_cond:
+                model_id, callback = self._requested_model, self._model_load_callback
+                self._requested_model = None
+            if model_id is None:
+                continue
+            ok = self._preload_sherpa_model(model_id)
+            with self._model_cond:
+                if not ok and self._requested_model is None:
+                    # 載入失敗且沒有新的請求: 喚醒等待模型的合成執行緒
+                    self._model_loading = False
+                    self._model_cond.notify_all()
+            if callback:
+                callback(model_id, ok)
+
+    def _preload_sherpa_model(self, model_id: str) -> bool:
+        if not self._init_sherpa_onnx_runtime() or model_id not in PREDEFINED_MODELS:
+            return False
+        with self._model_load_lock:
+            if model_id in self._model_pool:
+                return True
+            start = time.perf_counter()
+            try:
+                built = self._build_sherpa_tts(model_id)
+            except Exception as e:
+                self.log(f"載入 Sherpa-ONNX 模型失敗: {e}", "ERROR")
+                return False
+            if built is None:
                 return False
+            tts, est_bytes = built
+            # 尚未切換前保護此模型，避免池已滿時被淘汰
+            self._model_pool.put(model_id, tts, est_bytes, protect=True)
+            self.log(f"DEBUG: 模型 '{model_id}' 背景載入完成，耗時 {time.perf_counter() - start:.2f} 秒。", "DEBUG")
+            return True
+
+    def release_preloaded_model(self, model_id: str):
+        """背景載入完成但不再需要切換 (使用者已改選其他模型) 時，交回 LRU 管理。"""
+        self._model_pool.unprotect(model_id)
 
-        # --- NEW: Create a temporary directory with ASCII-safe path and copy model files ---
-        # Clean up previous temporary directory if it exists
-        if self._temp_model_dir is not None:
-            self._temp_model_dir.cleanup()
-            self._temp_model_dir = None
+    def _wait_for_sherpa_model(self, timeout=30.0):
+        """啟動時模型仍在背景載入的話，先等待載入完成，讓期間送出的文字排隊而不是失敗。"""
+        with self._model_cond:
+            self._model_cond.wait_for(lambda: self._sherpa_tts is not None or not self._model_loading, timeout)
+            return self._sherpa_tts
 
+    def set_process_workers(self, workers: int):
+        """設定合成子程序數量；0 代表停用程序外合成服務。"""
+        workers = max(0, int(workers))
+        if workers == self.synthesis_process_workers and (self._synth_service is not None) == (workers > 0):
+            return
+        self.synthesis_process_workers = workers
+        service, self._synth_service = self._synth_service, None
+        if service is not None:
+            service.close()
+        if workers <= 0:
+            return
+        service = SynthesisService(workers, log=self.log)
+        try:
+            service.start()
+        except Exception as e:
+            self.log(f"啟動合成子程序失敗，改為在本程序內合成: {e}", "WARN")
+            service.close()
+            return
+        self._synth_service = service
+        # 合成改由子程序處理，釋放本程序內的並行工作階段
+        self._drop_session_pool()
+        if self.sherpa_model_id:
+            service.preload(self.sherpa_model_id, *self._runtime_params(self.sherpa_model_id))
+
+    def set_parallel_sessions(self, sessions: int):
+        self.sherpa_parallel_sessions = max(1, int(sessions))
+        if self._session_pool is not None and self._session_pool.size != self.sherpa_parallel_sessions:
+            self._drop_session_pool()
+
+    def _drop_session_pool(self):
+        pool, self._session_pool = self._session_pool, None
+        if pool is not None:
+            pool.close()
+
+    def _parallel_session_pool(self):
+        """取得目前模型的並行工作階段池；尚未建立時在背景建立，這次先回傳 None (改為逐句合成)。"""
+        sessions = int(self.sherpa_parallel_sessions)
+        model_id = self.sherpa_model_id
+        if sessions <= 1 or not model_id:
+            return None
+        pool = self._session_pool
+        if pool is not None and pool.model_id == model_id and pool.size == sessions:
+            return pool
+        with self._session_pool_lock:
+            if not self._session_pool_building:
+                self._session_pool_building = True
+                threading.Thread(target=self._build_session_pool, args=(model_id, sessions),
+                                 name="sherpa-sessions", daemon=True).start()
+        return None
+
+    def _build_session_pool(self, model_id, sessions):
+        # 各工作階段平分 CPU 核心，整體合成時間隨核心數縮短
+        threads_per_session = max(1, (os.cpu_count() or 2) // sessions)
         try:
-            self._temp_model_dir = tempfile.TemporaryDirectory(prefix=f"sherpa_onnx_{model_id}_")
-            temp_model_path = Path(self._temp_model_dir.name)
-            self.log(f"DEBUG: 建立臨時模型目錄: {temp_model_path}", "DEBUG")
-
-            # Copy all required files/directories to the temporary location
-            for fname in model_config["file_names"]:
-                src_path = original_model_dir / fname
-                dst_path = temp_model_path / fname
-                if src_path.is_dir():
-                    shutil.copytree(src_path, dst_path)
+            built = [self._build_sherpa_tts(model_id, threads_per_session, 1) for _ in range(sessions)]
+            if any(b is None for b in built) or self.sherpa_model_id != model_id:
+                return
+            old, self._session_pool = self._session_pool, SherpaSessionPool(model_id, [b[0] for b in built])
+            if old is not None:
+                old.close()
+            self.log(f"DEBUG: 已為 '{model_id}' 建立 {sessions} 個並行工作階段 (各 {threads_per_session} 執行緒)。", "DEBUG")
+        except Exception as e:
+            self.log(f"建立並行合成工作階段失敗: {e}", "ERROR")
+        finally:
+            with self._session_pool_lock:
+                self._session_pool_building = False
+
+    def set_onnx_overrides(self, num_threads: int, max_num_sentences: int):
+        """設定執行參數覆寫 (0 為自動)；已載入的模型會以新參數重新建立。"""
+        changed = (int(num_threads), int(max_num_sentences)) != (self.onnx_num_threads_override, self.onnx_max_num_sentences_override)
+        self.onnx_num_threads_override = int(num_threads)
+        self.onnx_max_num_sentences_override = int(max_num_sentences)
+        if changed and self.sherpa_model_id:
+            threading.Thread(target=self._rebuild_loaded_models, name="model-rebuild", daemon=True).start()
+
+    def _rebuild_loaded_models(self, model_ids=None):
+        """執行參數變更後: 釋放模型池中其他模型，並以新參數重建目前使用中與釘選的模型。"""
+        with self._model_load_lock:
+            active = self.sherpa_model_id
+            pool_stats = self._model_pool.stats()
+            pinned = set(pool_stats["pinned"])
+            rebuild = []
+            for model_id in pool_stats["models"]:
+                if model_ids is not None and model_id not in model_ids:
+                    continue
+                if model_id == active or model_id in pinned:
+                    rebuild.append(model_id)
                 else:
-                    shutil.copy2(src_path, dst_path)
-                self.log(f"DEBUG: 複製 '{src_path}' 到 '{dst_path}'", "DEBUG")
+                    self._model_pool.remove(model_id)
+            for model_id in rebuild:
+                try:
+                    built = self._build_sherpa_tts(model_id)
+                except Exception as e:
+                    self.log(f"以新參數重新載入模型失敗: {e}", "ERROR")
+                    continue
+                if built is None:
+                    continue
+                tts, est_bytes = built
+                if model_id == active:
+                    if self.sherpa_model_id != active:
+                        continue
+                    self._activate_sherpa_model(active, tts)
+                # 直接取代池中的實例，釘選狀態不變
+                self._model_pool.put(model_id, tts, est_bytes)
+                self.log(f"模型 '{model_id}' 已套用新的執行參數 (執行緒 {self._runtime_params(model_id)[0]})。", "DEBUG")
+
+    def run_tuning_benchmark(self, model_ids):
+        """在背景對每個模型測試不同的執行緒數與句子批次大小，保存最佳組合並重新載入使用中的模型。"""
+        if self._tuning_lock.locked():
+            self.log("效能測試正在進行中。", "WARN")
+            return False
+        if not self._init_sherpa_onnx_runtime():
+            return False
+        self._tuning_thread = threading.Thread(target=self._tuning_worker, args=(list(model_ids),),
+                                               name="onnx-tuning", daemon=True)
+        self._tuning_thread.start()
+        return True
 
-            # Update paths to point to the temporary directory
-            model_dir = temp_model_path
+    def _schedule_auto_tune(self, model_id):
+        """本機還沒有此模型的調校結果時，在播放閒置後自動測試 (每個模型在每次執行程式中只排程一次)。"""
+        if not self.auto_tune_models or model_id in self._auto_tune_scheduled:
+            return
+        if self.onnx_num_threads_override and self.onnx_max_num_sentences_override:
+            return  # 兩個參數都已手動指定，測試結果不會被使用
+        if self._tuning.get(model_id) is not None:
+            return
+        self._auto_tune_scheduled.add(model_id)
+        threading.Thread(target=self._auto_tune_worker, args=(model_id,), name="onnx-auto-tuning", daemon=True).start()
 
-            # Dynamically find the .onnx file from model_config["file_names"]
-            onnx_filename = ""
-            for fname in model_config["file_names"]:
-                if fname.endswith(".onnx"):
-                    onnx_filename = fname
-                    break
-            if not onnx_filename:
-                self.log(f"模型 '{model_id}' 的配置中未找到 .onnx 檔案。", "ERROR")
-                self._sherpa_tts = None
-                self.sherpa_model_id = None
-                return False
-            vits_model = str(model_dir / onnx_filename)
+    def _auto_tune_worker(self, model_id):
+        busy = lambda: self._synthesis_busy() or self._has_pending_playback()
+        while True:
+            # 等待播放與合成持續閒置一段時間；有新的請求時測試會在下一次合成前中止，閒置後再重新開始
+            idle_since = time.monotonic()
+            while time.monotonic() - idle_since < AUTO_TUNE_IDLE_SEC:
+                time.sleep(AUTO_TUNE_POLL_SEC)
+                if busy() or self._tuning_lock.locked():
+                    idle_since = time.monotonic()
+            if self._tuning.get(model_id) is not None:
+                return  # 期間已手動測試
+            self.log(f"模型 '{model_id}' 尚未在本機進行效能測試，趁閒置時自動測試。")
+            if self._tuning_worker([model_id], should_stop=busy):
+                return
+            self.log(f"DEBUG: 有新的播放請求，中止 '{model_id}' 的自動效能測試，稍後再試。", "DEBUG")
 
-            glados_data_dir = "" # Initialize data_dir for glados model
-            # Special handling for glados model, which requires data_dir
-            if model_id == "vits-piper-en_US-glados":
-                glados_data_dir = str(model_dir / "espeak-ng-data")
+    def _tuning_worker(self, model_ids, should_stop=None):
+        """執行效能測試並保存結果；should_stop() 中途要求停止時不保存任何結果並回傳 False。"""
+        if not self._tuning_lock.acquire(blocking=False):
+            return False
+        try:
+            return self._run_tuning(model_ids, should_stop)
+        finally:
+            self._tuning_lock.release()
+
+    def _run_tuning(self, model_ids, should_stop=None):
+        tuned = []
+        for model_id in model_ids:
+            model_config = PREDEFINED_MODELS.get(model_id)
+            if not model_config:
+                continue
+            text = tuning.reference_text(model_config.get("language", "English"))
+
+            def build(num_threads, max_num_sentences):
+                # 測試用的實例不計入模型載入指標，也不建立效能分析區段
+                built = build_sherpa_tts(model_id, num_threads, max_num_sentences, log=self.log)
+                if built is None:
+                    raise RuntimeError(f"模型 '{model_id}' 檔案不完整")
+                return built[0]
+
+            def progress(i, total, num_threads, max_num_sentences):
+                self.audio_status_queue.put(("INFO", "[⏱]", f"效能測試 {model_id}: {i}/{total} (執行緒 {num_threads}，句子批次 {max_num_sentences})"))
 
-            lexicon_file = model_dir / "lexicon.txt"
-            lexicon = str(lexicon_file) if lexicon_file.exists() else "" # Make lexicon optional
-            tokens = str(model_dir / "tokens.txt")
-            
-            # 找到所有 rule FST 檔案
-            rules_files = [str(f) for f in model_dir.glob("*.fst")]
-
-            self.log(f"DEBUG: Sherpa-ONNX 載入參數 - model_id: {model_id}", "DEBUG")
-            self.log(f"DEBUG: vits_model (temp): {vits_model}", "DEBUG")
-            self.log(f"DEBUG: lexicon (temp): {lexicon}", "DEBUG")
-            self.log(f"DEBUG: tokens (temp): {tokens}", "DEBUG")
-            self.log(f"DEBUG: glados_data_dir (temp): {glados_data_dir}", "DEBUG")
-            self.log(f"DEBUG: rules_files (temp): {rules_files}", "DEBUG")
-
-            tts_config = sherpa_onnx.OfflineTtsConfig(
-                model=sherpa_onnx.OfflineTtsModelConfig(
-                    vits=sherpa_onnx.OfflineTtsVitsModelConfig(
-                        model=vits_model,
-                        lexicon=lexicon,
-                        tokens=tokens,
-                        data_dir=glados_data_dir # Pass data_dir for glados
-                    ),
-                    num_threads=2,
-                    provider="cpu",
-                ),
-                rule_fsts=','.join(rules_files) if rules_files else ""
-            )
-            self.log(f"DEBUG: tts_config constructed. Attempting to instantiate sherpa_onnx.OfflineTts...", "DEBUG")
-            self._sherpa_tts = sherpa_onnx.OfflineTts(tts_config)
-            self.log(f"DEBUG: sherpa_onnx.OfflineTts instantiated successfully.", "DEBUG")
-            self.sherpa_speakers = [f"Speaker {i}" for i in range(self._sherpa_tts.num_speakers)]
-            self.sherpa_model_id = model_id
-            
-            # Load model-specific rate and volume from config, fallback to default_rate/volume from model_config
-            # Note: app_controller is LocalTTSPlayer, which has the config manager
-            self.tts_rate = self.app_controller.config.get_model_setting(model_id, "rate", model_config.get("default_rate", 1.0))
-            self.tts_volume = self.app_controller.config.get_model_setting(model_id, "volume", model_config.get("default_volume", 1.0))
-            self.log(f"DEBUG: _load_sherpa_onnx_voice: Loaded model-specific TTS Rate: {self.tts_rate}, Volume: {self.tts_volume}", "DEBUG")
+            try:
+                best, results = tuning.benchmark_model(build, text, progress=progress, should_stop=should_stop)
+            except Exception as e:
+                self.log(f"模型 '{model_id}' 效能測試失敗: {e}", "ERROR")
+                continue
+            if best is None:
+                if should_stop and should_stop():
+                    self.audio_status_queue.put(("INFO", "[■]", f"效能測試 {model_id} 已中止"))
+                    return False
+                continue
+            self.log(f"DEBUG: {model_id} 效能測試結果: {results}", "DEBUG")
+            self._tuning.set(model_id, best)
+            tuned.append(model_id)
+            self.log(f"模型 '{model_id}' 最佳設定: 執行緒 {best['num_threads']}，句子批次 {best['max_num_sentences']} (RTF {best['rtf']:.3f})")
+        if tuned:
+            self._rebuild_loaded_models(tuned)
+        self.audio_status_queue.put(("INFO", "[✔]", f"效能測試完成 ({len(tuned)}/{len(model_ids)} 個模型)"))
+        return True
 
-            self.log(f"DEBUG: Sherpa-ONNX 引擎已成功載入模型 '{model_id}'。設定速率: {self.tts_rate}, 音量: {self.tts_volume}", "DEBUG")
-            return True
-        except Exception as e:
-            self.log(f"載入 Sherpa-ONNX 模型失敗: {e}", "ERROR")
-            self._sherpa_tts = None
-            self.sherpa_model_id = None
-            # Ensure cleanup if an error occurs during loading after copying
-            if self._temp_model_dir is not None:
-                self._temp_model_dir.cleanup()
-                self._temp_model_dir = None
-            return False
+    def configure_model_pool(self, max_models, max_bytes, idle_timeout, pinned_model=None):
+        self._model_pool.configure(max_models=max_models, max_bytes=max_bytes, idle_timeout=idle_timeout)
+        self._model_pool.pin(pinned_model)
 
     def query_devices(self):
         return sd.query_devices()
 
     def load_devices(self):
         try:
-            devices = sd.query_devices()
-            all_device_names_upper = [d['name'].upper() for d in devices]
-            output_devices = [d for d in devices if d['max_output_channels'] > 0]
-
-            self._listen_devices = {d['name']: d['index'] for d in output_devices}
-            self._local_output_devices = {d['name']: d['index'] for d in output_devices}
-
-            self.cable_is_present = any(CABLE_INPUT_HINT.upper() in name for name in all_device_names_upper)
+            self.devices.refresh()
 
             best_candidate = None
+            output_devices = self.devices.output_devices()
             for d in output_devices:
                 if "CABLE Input".upper() in d['name'].upper():
                     best_candidate = d['name']
@@ -291,6 +843,64 @@ class AudioEngine:
 
         except Exception as e:
             self.log(f"取得音效卡失敗: {e}", "ERROR")
+        # 首次載入完成後才開始背景偵測熱插拔
+        self.devices.start()
+
+    def _on_devices_refreshed(self, added, removed, changed):
+        """設備快取更新後重建 名稱 -> 索引 對照表 (重新初始化後索引可能改變)。"""
+        output_devices = self.devices.output_devices()
+        self._listen_devices = {d['name']: d['index'] for d in output_devices}
+        self._local_output_devices = {d['name']: d['index'] for d in output_devices}
+        all_device_names_upper = [name.upper() for name in self.devices.all_device_names()]
+        self.cable_is_present = any(CABLE_INPUT_HINT.upper() in name for name in all_device_names_upper)
+        self._reopen_outputs()
+
+        if not (added or removed or changed):
+            return
+        if added:
+            self.log(f"偵測到新的音訊設備: {', '.join(added)}")
+        for name in (self.local_output_device_name, self.listen_device_name):
+            if name in removed:
+                self.log(f"音訊設備 '{name}' 已移除，暫時改用系統預設設備。", "WARN")
+        if self.on_devices_changed:
+            self.on_devices_changed()
+
+    def _reopen_outputs(self):
+        """重新開啟 PortAudio 重新初始化前存在的輸出串流，讓下一次播放不必等待開啟串流。"""
+        roles, self._reopen_after_reinit = self._reopen_after_reinit, {}
+        if not roles or not self._output_lock.acquire(blocking=False):
+            return
+        try:
+            default_device = sd.default.device[1]
+            names = {"main": (self._local_output_devices, self.local_output_device_name),
+                     "listen": (self._listen_devices, self.listen_device_name)}
+            for role, samplerate in roles.items():
+                mapping, name = names[role]
+                device_id = mapping.get(name, default_device)
+                try:
+                    self._get_output(role, device_id, self._device_samplerate(device_id, samplerate))
+                except Exception as e:
+                    self.log(f"重新開啟輸出串流 {role} 失敗: {e}", "DEBUG")
+        finally:
+            self._output_lock.release()
+
+    @contextlib.contextmanager
+    def _device_reinit_guard(self):
+        """只有在沒有播放、沒有待播項目且緩衝區已播完時才允許重新初始化 PortAudio。"""
+        if not self._output_lock.acquire(blocking=False):
+            yield False
+            return
+        try:
+            busy = self._has_pending_playback() or not all(out.is_drained() or not out.active for out in self._outputs.values())
+            if busy:
+                yield False
+            else:
+                # 重新初始化後舊的串流會失效，先關閉，更新完設備索引後再重新開啟
+                self._reopen_after_reinit = {role: out.samplerate for role, out in self._outputs.items()}
+                self._close_all_outputs()
+                yield True
+        finally:
+            self._output_lock.release()
 
     # ---------- 參數設定 ----------
     def set_engine(self, engine: str):
@@ -331,51 +941,243 @@ class AudioEngine:
         self.listen_device_name = device_name
         self.listen_volume = float(volume)
 
-    def cache_phrase(self, phrase_info: dict):
-        text = phrase_info.get("text", "").strip()
-        if not text:
-            return
-
-        # Generate a unique key for the cache based on text and current TTS settings
+    # ---------- 快取 ----------
+    def _make_cache_key(self, text):
+        """根據文字與目前的 TTS 設定產生快取鍵。Sherpa-ONNX 以講者 ID 作為聲線。"""
+        voice = self.current_voice
+        if self.app_controller and self.current_engine in self.app_controller.get_sherpa_onnx_engines():
+            voice = f"sid{self.sherpa_speaker_id}"
         cache_key_components = [
             text,
             self.current_engine,
-            self.current_voice,
+            str(voice),
             str(self.tts_rate),
             str(self.tts_volume),
             str(self.tts_pitch)
         ]
-        cache_key = hashlib.md5('+'.join(cache_key_components).encode('utf-8')).hexdigest()
-
-        # Check if already cached
-        if cache_key in self._audio_cache:
-            return
-
-        self.log(f"Caching phrase: '{text[:20]}...' (Engine: {self.current_engine})", "DEBUG")
+        return hashlib.md5('+'.join(cache_key_components).encode('utf-8')).hexdigest()
+
+    def set_cache_budget(self, max_bytes):
+        self._audio_cache.set_max_bytes(max_bytes)
+
+    def configure_disk_cache(self, enabled: bool, max_bytes):
+        self.enable_disk_cache = bool(enabled)
+        self._disk_cache.set_max_bytes(max_bytes)
+
+    def purge_model_cache(self, model_id: str):
+        """刪除某個模型在磁碟快取中的所有項目與 ASCII 暫存鏡像 (刪除模型時呼叫)。"""
+        self._model_pool.remove(model_id)
+        remove_staged_model(model_id)
+        removed = self._disk_cache.purge_engine(model_id)
+        if removed:
+            self.log(f"已清除模型 '{model_id}' 的 {removed} 筆音訊磁碟快取。", "DEBUG")
+
+    def get_cache_stats(self) -> dict:
+        stats = self._audio_cache.stats()
+        stats["disk"] = self._disk_cache.stats()
+        return stats
+
+    def _cache_lookup(self, cache_key, pin=False):
+        """依序查詢記憶體快取與磁碟快取；磁碟命中時提升到記憶體快取。"""
+        cached = self._audio_cache.get(cache_key)
+        if cached is not None:
+            if pin:
+                self._audio_cache.pin(cache_key)
+            return cached
+        if not self.enable_disk_cache:
+            return None
+        cached = self._disk_cache.get(cache_key)
+        if cached is not None:
+            self._audio_cache.put(cache_key, cached[0], cached[1], pinned=pin)
+        return cached
+
+    def _cache_store(self, cache_key, samples, sample_rate, pin=False):
+        self._audio_cache.put(cache_key, samples, sample_rate, pinned=pin)
+        if self.enable_disk_cache:
+            self._disk_cache.put(cache_key, samples, sample_rate, engine=self.current_engine)
+
+    def unpin_cached_phrases(self):
+        self._audio_cache.unpin_all()
+
+    # ---------- 批次合成 ----------
+    def _batch_capacity(self):
+        """目前引擎可同時處理的合成數量 (批次合成的預設並行度)。"""
+        engine = self.current_engine
+        if engine == ENGINE_EDGE:
+            return EDGE_BATCH_CONCURRENCY
+        if self._synth_service is not None:
+            return self._synth_service.size
+        if self.app_controller and engine in self.app_controller.get_sherpa_onnx_engines():
+            pool = self._parallel_session_pool()
+            if pool is not None:
+                return pool.size
+        return 1
+
+    def _synthesize_batch_item(self, text, loop, pool):
+        """合成批次中的一段文字；有 Sherpa 工作階段池時直接使用池中的工作階段。"""
+        try:
+            if pool is not None and self._synth_service is None:
+                start = time.perf_counter()
+                with pool.session() as tts:
+                    audio = tts.generate(text, sid=self.sherpa_speaker_id, speed=self.tts_rate)
+                samples, sample_rate = pcm.from_engine_samples(audio.samples), audio.sample_rate
+                self._update_synth_speed(self.current_engine, len(text), time.perf_counter() - start)
+                return samples, sample_rate
+            return self._synthesize(text, loop)
+        except Exception as e:
+            self.log(f"Batch synthesis failed for '{text[:20]}...': {e}", "ERROR")
+            return None, None
 
-        samples = None
-        sample_rate = None
-        
-        loop = asyncio.new_event_loop() # Create a new event loop for async operations in this thread
-        asyncio.set_event_loop(loop)
+    def synthesize_batch(self, texts, pin=False, use_cache=True, concurrency=None, should_stop=None,
+                         background=False, loop: asyncio.AbstractEventLoop = None):
+        """
+        依目前的語音設定合成多段文字，依完成順序產生 (index, text, samples, sample_rate)；失敗時 samples 為 None。
+        - 快取中已有的文字直接產生；合成結果存入快取 (pin=True 時釘選)。
+        - 並行度預設依引擎而定 (Edge 的同時請求數、合成子程序數或 Sherpa 工作階段數)；為 1 時在呼叫端的執行緒內合成。
+        - should_stop() 回傳 True 時，尚未開始的文字不再合成。
+        - background=True 時以較低的優先權執行，且有即時請求在合成或排隊時先等待。
+        完成後吞吐量統計存於 last_batch_stats。
+        """
+        texts = list(texts)
+        stats = {"texts": len(texts), "cached": 0, "synthesized": 0, "failed": 0,
+                 "chars": 0, "audio_sec": 0.0, "elapsed": 0.0, "concurrency": 0}
+        start = time.perf_counter()
+
+        pending = []
+        for index, text in enumerate(texts):
+            cache_key = self._make_cache_key(text)
+            cached = self._cache_lookup(cache_key, pin=pin) if use_cache else None
+            if cached is not None:
+                stats["cached"] += 1
+                yield index, text, cached[0], cached[1]
+            else:
+                pending.append((index, text, cache_key))
+
+        pool = None
+        if pending and self._synth_service is None and self.app_controller \
+                and self.current_engine in self.app_controller.get_sherpa_onnx_engines():
+            pool = self._parallel_session_pool()
+        workers = max(1, min(len(pending), int(concurrency or self._batch_capacity())))
+        stats["concurrency"] = workers if pending else 0
+        items = queue.Queue()
+        for item in pending:
+            items.put(item)
+        closed = threading.Event()  # 呼叫端提前結束迭代時，工作執行緒不再取新的文字
+
+        def next_item():
+            if background:
+                # 即時請求優先: 有請求正在合成或排隊時先等待
+                while self._synthesis_busy() and not (should_stop and should_stop()):
+                    time.sleep(PHRASE_WARMUP_YIELD_SEC)
+            if closed.is_set() or (should_stop and should_stop()):
+                return None
+            try:
+                return items.get_nowait()
+            except queue.Empty:
+                return None
 
-        try:
-            if self.app_controller and self.current_engine in self.app_controller.get_sherpa_onnx_engines():
-                samples, sample_rate = self._synth_sherpa_onnx(text)
-            elif self.current_engine == ENGINE_EDGE:
-                samples, sample_rate = loop.run_until_complete(self._synth_edge_to_memory(text))
-            elif self.current_engine == ENGINE_PYTTX3:
-                samples, sample_rate = self._synth_pyttsx3_to_memory(text)
-            
+        def process(item, item_loop):
+            index, text, cache_key = item
+            samples, sample_rate = self._synthesize_batch_item(text, item_loop, pool)
             if samples is not None and sample_rate is not None:
-                self._audio_cache[cache_key] = (samples, sample_rate)
-                self.log(f"Phrase cached successfully: '{text[:20]}...'", "DEBUG")
+                self._cache_store(cache_key, samples, sample_rate, pin=pin)
+            return index, text, samples, sample_rate
+
+        def record(result):
+            _, text, samples, sample_rate = result
+            if samples is None:
+                stats["failed"] += 1
+                self.log(f"Failed to synthesize '{text[:20]}...' in batch", "WARNING")
             else:
-                self.log(f"Failed to cache phrase: '{text[:20]}...' (synthesis failed)", "WARNING")
-        except Exception as e:
-            self.log(f"Error caching phrase '{text[:20]}...': {e}", "ERROR")
+                stats["synthesized"] += 1
+                stats["chars"] += len(text)
+                stats["audio_sec"] += len(samples) / float(sample_rate)
+
+        try:
+            if workers == 1 and pending:
+                own_loop = loop is None
+                if own_loop:
+                    loop = asyncio.new_event_loop()
+                    asyncio.set_event_loop(loop)
+                try:
+                    while (item := next_item()) is not None:
+                        result = process(item, loop)
+                        record(result)
+                        yield result
+                finally:
+                    if own_loop:
+                        loop.close()
+            elif pending:
+                results = queue.Queue()
+
+                def run():
+                    if background:
+                        _lower_thread_priority()
+                    thread_loop = asyncio.new_event_loop()
+                    asyncio.set_event_loop(thread_loop)
+                    try:
+                        while (item := next_item()) is not None:
+                            results.put(process(item, thread_loop))
+                    finally:
+                        thread_loop.close()
+                        results.put(None)
+
+                for i in range(workers):
+                    threading.Thread(target=run, name=f"tts-batch-{i}", daemon=True).start()
+                finished = 0
+                while finished < workers:
+                    result = results.get()
+                    if result is None:
+                        finished += 1
+                        continue
+                    record(result)
+                    yield result
         finally:
-            loop.close()
+            closed.set()
+            stats["elapsed"] = time.perf_counter() - start
+            self.last_batch_stats = stats
+            if stats["synthesized"]:
+                elapsed = stats["elapsed"] or 1e-9
+                self.log(f"DEBUG: Batch synthesis: {stats['synthesized']} synthesized, {stats['cached']} cached, "
+                         f"{stats['failed']} failed in {elapsed:.2f}s with {stats['concurrency']} workers "
+                         f"({stats['synthesized'] / elapsed:.2f} texts/s, {stats['chars'] / elapsed:.1f} chars/s, "
+                         f"{stats['audio_sec'] / elapsed:.1f}x realtime)", "DEBUG")
+
+    def warm_up_phrases(self, phrases):
+        """
+        在背景依目前的語音設定重新合成所有快捷語音並釘選在快取中。
+        再次呼叫 (或呼叫 cancel_phrase_warmup) 會讓進行中的工作在下一句之前結束。
+        """
+        texts = [p.get("text", "").strip() for p in phrases if p.get("text", "").strip()]
+        self._warmup_generation += 1
+        if not texts:
+            return
+        threading.Thread(target=self._phrase_warmup_worker, args=(self._warmup_generation, texts),
+                         name="phrase-warmup", daemon=True).start()
+
+    def cancel_phrase_warmup(self):
+        self._warmup_generation += 1
+
+    def _synthesis_busy(self):
+        return self._active_synthesis > 0 or not self.play_queue.empty()
+
+    def _phrase_warmup_worker(self, generation, texts):
+        _lower_thread_priority()
+        # 舊設定的快捷語音不再需要常駐，交回 LRU 管理
+        self.unpin_cached_phrases()
+        total = len(texts)
+        cancelled = lambda: generation != self._warmup_generation
+        done = 0
+        for _, text, _, _ in self.synthesize_batch(texts, pin=True, should_stop=cancelled, background=True):
+            done += 1
+            if not cancelled():
+                self.audio_status_queue.put(("INFO", "[⏳]", f"預先合成快捷語音 {done}/{total}: {text[:20]}"))
+        if cancelled():
+            self.log("語音設定已變更，中止快捷語音預先合成。", "DEBUG")
+            return
+        stats = self.last_batch_stats
+        rate = f"，{stats['synthesized'] / stats['elapsed']:.1f} 句/秒" if stats["synthesized"] and stats["elapsed"] else ""
+        self.audio_status_queue.put(("INFO", "[✔]", f"快捷語音已預先合成 ({total} 句{rate})"))
 
     # ---------- 取得資訊 ----------
     def get_voice_names(self):
@@ -414,14 +1216,35 @@ class AudioEngine:
         return self._edge_voices
 
     # ---------- 合成 ----------
+    def _sherpa_generate(self, tts, text, sid, speed, cancelled=None):
+        """
+        呼叫 tts.generate()；所屬的請求被中斷時，讓進度 callback 回傳 0 中止 Sherpa-ONNX 的合成。
+        cancelled 預設為目前合成執行緒正在處理的請求的取消事件。
+        """
+        cancelled = cancelled or getattr(self._synth_local, "cancelled", None)
+        if cancelled is None:
+            return tts.generate(text, sid=sid, speed=speed)
+
+        def on_progress(samples, progress):
+            return 0 if cancelled.is_set() else 1
+
+        try:
+            return tts.generate(text, sid=sid, speed=speed, callback=on_progress)
+        except TypeError:
+            # 舊版 sherpa-onnx 的 generate() 不支援 callback
+            return tts.generate(text, sid=sid, speed=speed)
+
     def _synth_sherpa_onnx(self, text):
-        if not self._sherpa_tts:
+        if not self._sherpa_tts and not self._wait_for_sherpa_model():
             self.log("Sherpa-ONNX 引擎未初始化，無法合成。", "ERROR")
             return None, None
+        cancelled = getattr(self._synth_local, "cancelled", None)
+        if cancelled is not None and cancelled.is_set():
+            return None, None
         try:
             self.log(f"DEBUG: _synth_sherpa_onnx: Generating speech with speed={self.tts_rate}, speaker_id={self.sherpa_speaker_id}", "DEBUG")
-            audio = self._sherpa_tts.generate(text, sid=self.sherpa_speaker_id, speed=self.tts_rate)
-            samples = np.array(audio.samples, dtype=np.float32)
+            audio = self._sherpa_generate(self._sherpa_tts, text, self.sherpa_speaker_id, self.tts_rate)
+            samples = pcm.from_engine_samples(audio.samples)
             return samples, audio.sample_rate
         except Exception as e:
             self.log(f"Sherpa-ONNX 合成失敗: {e}", "ERROR")
@@ -429,36 +1252,41 @@ class AudioEngine:
 
     async def _synth_edge_to_file(self, text, path, **kwargs):
         import edge_tts
-        # ... (logic from old file, simplified)
-        rate_param = f"{int(round((self.tts_rate - 175) * (40 / 75))):+d}%"
-        volume_param = f"{int((self.tts_volume - 1.0) * 100):+d}%"
-        pitch_param = f"{int(self.tts_pitch):+d}Hz"
+        rate_param, volume_param, pitch_param = self._edge_params()
         comm = edge_tts.Communicate(text, self.current_voice, rate=rate_param, volume=volume_param, pitch=pitch_param)
         await comm.save(path)
         return True
 
-    async def _synth_edge_to_memory(self, text):
-        import edge_tts
-        global AudioSegment # Ensure pydub is imported
-        if AudioSegment is None: self._lazy_import()
-
+    def _edge_params(self):
         rate_param = f"{int(round((self.tts_rate - 175) * (40 / 75))):+d}%"
         volume_param = f"{int((self.tts_volume - 1.0) * 100):+d}%"
         pitch_param = f"{int(self.tts_pitch):+d}Hz"
-        
-        with tempfile.NamedTemporaryFile(suffix=".mp3", delete=False) as tmp_file:
-            try:
-                comm = edge_tts.Communicate(text, self.current_voice, rate=rate_param, volume=volume_param, pitch=pitch_param)
-                await comm.save(tmp_file.name)
-                audio = AudioSegment.from_mp3(tmp_file.name)
-                samples = self._audiosegment_to_float32_numpy(audio)
-                sample_rate = audio.frame_rate
-                return samples, sample_rate
-            except Exception as e:
-                self.log(f"Edge TTS 合成到記憶體失敗: {e}", "ERROR")
-                return None, None
-            finally:
-                os.remove(tmp_file.name)
+        return rate_param, volume_param, pitch_param
+
+    async def _synth_edge_stream(self, text):
+        """逐塊產生 Edge-TTS 的 PCM: 網路資料一到就在程序內解碼，不經過暫存 MP3 與 ffmpeg。"""
+        import edge_tts
+        rate_param, volume_param, pitch_param = self._edge_params()
+        decoder = create_mp3_decoder(self._audiosegment_to_float32_numpy, self.log)
+        comm = edge_tts.Communicate(text, self.current_voice, rate=rate_param, volume=volume_param, pitch=pitch_param)
+        async for chunk in comm.stream():
+            if chunk.get("type") != "audio":
+                continue
+            for block in decoder.feed(chunk["data"]):
+                yield block
+        for block in decoder.flush():
+            yield block
+
+    async def _synth_edge_to_memory(self, text):
+        try:
+            blocks = [block async for block in self._synth_edge_stream(text)]
+        except Exception as e:
+            self.log(f"Edge TTS 合成到記憶體失敗: {e}", "ERROR")
+            return None, None
+        if not blocks:
+            return None, None
+        samples = blocks[0][0] if len(blocks) == 1 else np.concatenate([b for b, _ in blocks])
+        return samples, blocks[0][1]
 
     def _synth_pyttsx3_to_file(self, text, path):
         if pyttsx3 is None: return False
@@ -476,195 +1304,424 @@ class AudioEngine:
             if engine: engine.stop()
 
     def _synth_pyttsx3_to_memory(self, text):
-        global pyttsx3, AudioSegment # Ensure modules are imported
-        if pyttsx3 is None or AudioSegment is None: self._lazy_import()
-        if pyttsx3 is None or AudioSegment is None: return None, None
+        global pyttsx3 # Ensure modules are imported
+        if pyttsx3 is None: self._lazy_import()
+        if pyttsx3 is None: return None, None
 
-        engine = None
-        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp_file:
-            try:
-                engine = pyttsx3.init()
-                engine.setProperty("rate", self.tts_rate)
-                engine.setProperty("volume", self.tts_volume)
-                if self.pyttsx3_voice_id:
-                    engine.setProperty("voice", self.pyttsx3_voice_id)
-                engine.save_to_file(text, tmp_file.name)
-                engine.runAndWait()
-                
-                audio = AudioSegment.from_wav(tmp_file.name)
-                samples = self._audiosegment_to_float32_numpy(audio)
-                sample_rate = audio.frame_rate
-                return samples, sample_rate
-            except Exception as e:
-                self.log(f"pyttsx3 合成到記憶體失敗: {e}", "ERROR")
-                return None, None
-            finally:
-                if engine: engine.stop()
-                os.remove(tmp_file.name)
+        if self._pyttsx3_engine is None:
+            self._pyttsx3_engine = Pyttsx3Renderer(self.log)
+        try:
+            return self._pyttsx3_engine.render(text, self.tts_rate, self.tts_volume, self.pyttsx3_voice_id)
+        except Exception as e:
+            self.log(f"pyttsx3 合成到記憶體失敗: {e}", "ERROR")
+            return None, None
 
     # ---------- 播放 ----------
-    def play_text(self, text: str):
-        if isinstance(text, str) and not text.strip(): return
-        self.play_queue.put(text)
+    def play_text(self, text: str, priority=PRIORITY_TYPED, source=None, trace_id=None):
+        """
+        送出一段要播放的文字，回傳排程器中的項目 ID (被合併時為原項目的 ID，被拒絕時為 None)。
+        trace_id 為快捷鍵觸發時取得的追蹤 ID (見 tracing.py)。
+        """
+        if isinstance(text, str) and not text.strip(): return None
+        item_id = self.play_queue.submit(text, priority=priority, source=source, trace_id=trace_id)
+        tracer.instant("play_text", trace_id, item_id=item_id, source=source or "")
+        return item_id
+
+    def _synthesize(self, text, loop: asyncio.AbstractEventLoop):
+        """依目前引擎合成一段文字，回傳 (samples, sample_rate)，並更新該引擎的合成速度統計。"""
+        global AudioSegment
+        engine = self.current_engine
+        start = time.perf_counter()
+        if self.app_controller and engine in self.app_controller.get_sherpa_onnx_engines():
+            samples, sample_rate = self._synth_in_service(engine, text)
+            if samples is None:
+                with self._sherpa_lock:
+                    samples, sample_rate = self._synth_sherpa_onnx(text)
+        elif engine == ENGINE_EDGE:
+            if AudioSegment is None: self._lazy_import()
+            samples, sample_rate = loop.run_until_complete(self._synth_edge_to_memory(text))
+        elif engine == ENGINE_PYTTX3:
+            samples, sample_rate = self._synth_in_service(engine, text)
+            cancelled = getattr(self._synth_local, "cancelled", None)
+            if samples is None and not (cancelled is not None and cancelled.is_set()):
+                # 常駐的 pyttsx3 執行緒本身就會依序處理請求，不需另外加鎖
+                samples, sample_rate = self._synth_pyttsx3_to_memory(text)
+        else:
+            return None, None
 
-    def _process_and_play_text(self, item, loop: asyncio.AbstractEventLoop, startupinfo=None):
-        text = item # Assuming item is just text for now
-        is_preview = False # Simplified for now
+        if samples is not None:
+            elapsed = time.perf_counter() - start
+            self._update_synth_speed(engine, len(text), elapsed)
+            self._record_synthesis(engine, elapsed, len(samples), sample_rate)
+        return samples, sample_rate
+
+    def _synth_in_service(self, engine, text):
+        """
+        透過合成子程序合成；服務未啟用或失敗時回傳 (None, None)，由呼叫端改回程序內合成。
+        這句話被中斷時會通知子程序中止合成 (pyttsx3 無法中止，結果直接丟棄)。
+        """
+        service = self._synth_service
+        if service is None:
+            return None, None
+        cancelled = getattr(self._synth_local, "cancelled", None)
+        try:
+            if engine == ENGINE_PYTTX3:
+                result = service.synthesize_pyttsx3(text, self.tts_rate, self.tts_volume, self.pyttsx3_voice_id,
+                                                    cancelled=cancelled)
+            else:
+                model_id = self.sherpa_model_id
+                if not model_id and self._wait_for_sherpa_model():
+                    model_id = self.sherpa_model_id
+                if not model_id:
+                    return None, None
+                result = service.synthesize_sherpa(model_id, text, self.sherpa_speaker_id, self.tts_rate,
+                                                   *self._runtime_params(model_id), cancelled=cancelled)
+        except Exception as e:
+            self.log(f"合成子程序處理失敗，改為在本程序內合成: {e}", "WARN")
+            return None, None
+        return result if result is not None else (None, None)
+
+    def _update_synth_speed(self, engine, chars, elapsed):
+        if elapsed > 0:
+            speed = chars / elapsed
+            prev = self._synth_chars_per_sec.get(engine)
+            self._synth_chars_per_sec[engine] = speed if prev is None else prev * 0.7 + speed * 0.3
+
+    def _synthesize_stream(self, text, loop: asyncio.AbstractEventLoop):
+        """
+        逐塊產生合成結果 (samples, sample_rate)。
+        Edge-TTS 邊下載邊解碼；其他引擎一次合成整段後產生單一區塊。
+        """
+        if self.current_engine != ENGINE_EDGE:
+            samples, sample_rate = self._synthesize(text, loop)
+            if samples is not None and sample_rate is not None:
+                yield samples, sample_rate
+            return
 
-        self.log(f"Worker: Starting to process text: '{text[:30]}...'", "DEBUG")
-        self.audio_status_queue.put(("PLAY", "[~]", f"正在處理: {text[:20]}..."))
+        engine = self.current_engine
+        start = time.perf_counter()
+        produced = 0
+        sample_rate = None
+        agen = self._synth_edge_stream(text)
+        try:
+            while True:
+                try:
+                    block = loop.run_until_complete(agen.__anext__())
+                except StopAsyncIteration:
+                    break
+                produced += len(block[0])
+                sample_rate = block[1]
+                yield block
+        finally:
+            loop.run_until_complete(agen.aclose())
+        elapsed = time.perf_counter() - start
+        self._update_synth_speed(engine, len(text), elapsed)
+        self._record_synthesis(engine, elapsed, produced, sample_rate)
 
-        samples = None
+    def _synthesize_parallel(self, segments, pool: SherpaSessionPool, cancelled=None):
+        """在工作階段池上同時合成各句，依序產生 (samples, sample_rate)，接縫處交叉淡化；失敗的句子產生 (None, None)。"""
+        sid, speed = self.sherpa_speaker_id, self.tts_rate
+
+        def generate(tts, segment):
+            audio = self._sherpa_generate(tts, segment, sid, speed, cancelled)
+            return pcm.from_engine_samples(audio.samples), audio.sample_rate
+
+        joiner = None
         sample_rate = None
+        for index, result in enumerate(pool.map_ordered(generate, segments)):
+            if isinstance(result, Exception) or not len(result[0]):
+                self.log(f"Parallel synthesis failed for segment {index + 1}/{len(segments)}: {result if isinstance(result, Exception) else 'no samples'}", "ERROR")
+                yield None, None
+                continue
+            samples, sample_rate = result
+            if joiner is None:
+                joiner = CrossfadeJoiner(sample_rate * DEFAULT_CROSSFADE_MS / 1000.0)
+            yield joiner.push(samples), sample_rate
+        if joiner is not None:
+            yield joiner.flush(), sample_rate
+
+    def _first_chunk_chars(self):
+        """依該引擎過去的合成速度，計算首段可在 FIRST_CHUNK_TARGET_SEC 內合成完的字數。"""
+        speed = self._synth_chars_per_sec.get(self.current_engine)
+        if not speed:
+            return FIRST_CHUNK_DEFAULT_CHARS
+        return max(FIRST_CHUNK_MIN_CHARS, min(FIRST_CHUNK_MAX_CHARS, int(speed * FIRST_CHUNK_TARGET_SEC)))
+
+    def _synthesize_utterance(self, utterance: _Utterance, loop: asyncio.AbstractEventLoop):
+        """合成一筆請求，將完成的片段依序放入 utterance.segments。"""
+        text = utterance.text
+        timeline = utterance.timeline
+
+        def emit(samples, sample_rate):
+            timeline.mark("first_chunk")
+            utterance.segments.put((samples, sample_rate))
+
+        self.log(f"Worker: Starting to process text: '{text[:30]}...'", "DEBUG")
+        self.audio_status_queue.put(("PLAY", "[~]", f"正在處理: {text[:20]}..."))
 
         # --- New Caching Logic ---
-        cache_key_components = [
-            text,
-            self.current_engine,
-            self.current_voice,
-            str(self.tts_rate),
-            str(self.tts_volume),
-            str(self.tts_pitch)
-        ]
-        cache_key = hashlib.md5('+'.join(cache_key_components).encode('utf-8')).hexdigest()
+        cache_key = self._make_cache_key(text)
 
-        if cache_key in self._audio_cache:
-            samples, sample_rate = self._audio_cache[cache_key]
+        cached = self._cache_lookup(cache_key)
+        timeline.mark("cache_lookup")
+        if cached is not None:
+            samples, sample_rate = cached
             self.log(f"Retrieved phrase from cache: '{text[:20]}...'", "DEBUG")
-        else:
-            try:
-                if self.app_controller and self.current_engine in self.app_controller.get_sherpa_onnx_engines():
-                    samples, sample_rate = self._synth_sherpa_onnx(text)
-                    if samples is None: self.log(f"Sherpa-ONNX synthesis returned no samples for '{text[:20]}...'", "DEBUG"); return
-
-                elif self.current_engine == ENGINE_EDGE:
-                    global AudioSegment
-                    if AudioSegment is None: self._lazy_import()
-                    samples, sample_rate = loop.run_until_complete(self._synth_edge_to_memory(text))
-                    if samples is None: self.log(f"Edge-TTS synthesis returned no samples for '{text[:20]}...'", "DEBUG"); return
-
-                elif self.current_engine == ENGINE_PYTTX3:
-                    if AudioSegment is None: self._lazy_import()
-                    samples, sample_rate = self._synth_pyttsx3_to_memory(text)
-                    if samples is None: self.log(f"pyttsx3 synthesis returned no samples for '{text[:20]}...'", "DEBUG"); return
-                
-                # Cache the newly synthesized audio
-                if samples is not None and sample_rate is not None:
-                    self._audio_cache[cache_key] = (samples, sample_rate)
-                    self.log(f"Cached newly synthesized phrase: '{text[:20]}...'", "DEBUG")
-
-            except Exception as e:
-                self.log(f"合成失敗: {e}", "ERROR")
-                self.audio_status_queue.put(("PLAY", "[❌]", f"合成失敗: {text[:20]}..."))
-                return
+            timeline.cache_hit = True
+            emit(samples, sample_rate)
+            return
         # --- End Caching Logic ---
-        
-        # Add log to confirm samples are ready for playback
-        if samples is not None and sample_rate is not None:
-            self.log(f"Prepared {len(samples)} samples at SR {sample_rate} for playback.", "DEBUG")
-        else:
-            self.log(f"No samples prepared for playback for '{text[:20]}...'.", "ERROR") # Change to ERROR from original log.
-            self.audio_status_queue.put(("PLAY", "[❌]", f"合成失敗，無法取得音訊數據: {text[:20]}..."))
-            return # Ensure to return if samples are None here
-
-        self._play_audio(samples, sample_rate, text, is_preview)
 
+        if self.current_engine == ENGINE_EDGE:
+            # Edge-TTS 本身就是串流輸出，整段送出可省去每句一次的連線開銷
+            segments = [text]
+        else:
+            segments = segment_text(text, first_chunk_chars=self._first_chunk_chars())
+        self.log(f"Worker: Text split into {len(segments)} segment(s).", "DEBUG")
+
+        pool = None
+        # 啟用合成服務時由子程序合成，不在本程序內另外載入工作階段 (與 synthesize_batch 一致)
+        if len(segments) > 1 and self._synth_service is None and self.app_controller \
+                and self.current_engine in self.app_controller.get_sherpa_onnx_engines():
+            pool = self._parallel_session_pool()
+
+        # 分句管線: 本執行緒依序合成各句 (或交給並行工作階段)，播放階段同時播放已完成的句子
+        rendered = []
+        failed = False
+        timeline.engine = self.current_engine
+        timeline.mark("synth_start")
+        try:
+            if pool is not None:
+                self.log(f"Worker: Synthesizing {len(segments)} segments on {pool.size} parallel sessions.", "DEBUG")
+                start = time.perf_counter()
+                for samples, sample_rate in self._synthesize_parallel(segments, pool, utterance.cancelled):
+                    if utterance.cancelled.is_set():
+                        break
+                    if samples is None:
+                        failed = True
+                    elif len(samples):
+                        rendered.append((samples, sample_rate))
+                        emit(samples, sample_rate)
+                if rendered:
+                    self._record_synthesis(self.current_engine, time.perf_counter() - start,
+                                           sum(len(smp) for smp, _ in rendered), rendered[0][1])
+            else:
+                for index, segment in enumerate(segments):
+                    if utterance.cancelled.is_set():
+                        break
+                    produced = False
+                    for samples, sample_rate in self._synthesize_stream(segment, loop):
+                        if utterance.cancelled.is_set():
+                            break
+                        produced = True
+                        rendered.append((samples, sample_rate))
+                        emit(samples, sample_rate)
+                    if utterance.cancelled.is_set():
+                        break
+                    if not produced:
+                        self.log(f"Synthesis returned no samples for segment {index + 1}/{len(segments)}: '{segment[:20]}...'", "ERROR")
+                        failed = True
+                        continue
+                    self.log(f"Prepared segment {index + 1}/{len(segments)}.", "DEBUG")
+        except Exception as e:
+            self.log(f"合成失敗: {e}", "ERROR")
+            failed = True
+        timeline.mark("synth_end")
 
+        if utterance.cancelled.is_set():
+            # 被中斷的請求不寫入快取 (內容不完整)
+            self.log(f"Worker: Synthesis cancelled: '{text[:20]}...'", "DEBUG")
+            return
 
+        if not rendered:
+            self.audio_status_queue.put(("PLAY", "[❌]", f"合成失敗，無法取得音訊數據: {text[:20]}..."))
+            return
 
-    def _play_stream_threaded(self, stream, data, stream_name):
-        """Plays an audio stream in a separate thread."""
+        # Cache the newly synthesized audio (only complete renders with a uniform sample rate)
+        if not failed and len({sr for _, sr in rendered}) == 1:
+            samples = rendered[0][0] if len(rendered) == 1 else np.concatenate([smp for smp, _ in rendered])
+            self._cache_store(cache_key, samples, rendered[0][1])
+            self.log(f"Cached newly synthesized phrase: '{text[:20]}...'", "DEBUG")
+
+    def _play_utterance(self, utterance: _Utterance):
+        """依序播放一筆請求中合成完成的片段，直到收到 None。"""
+        text = utterance.text
+        played = 0
+        # 同一筆請求的片段共用重採樣器，濾波器狀態跨片段延續，片段交界不會產生雜音
+        resamplers = {}
+        # 上一句若被中斷，輸出仍在丟棄資料；等殘留樣本清空後再開始播放
+        for out in list(self._outputs.values()):
+            out.resume()
+        while not utterance.cancelled.is_set():
+            entry = utterance.segments.get()
+            if entry is None or utterance.cancelled.is_set():
+                break
+            samples, sample_rate = entry
+            self._play_audio(samples, sample_rate, text, utterance.is_preview, final=False, resamplers=resamplers,
+                             cancelled=utterance.cancelled, timeline=utterance.timeline)
+            played += 1
+        if utterance.cancelled.is_set():
+            self.log(f"Playback cancelled: '{text[:20]}...'", "DEBUG")
+            return
+        # 不再有新的片段，之後緩衝區播完不算 underrun
+        for out in list(self._outputs.values()):
+            out.feeding = False
+        self._flush_resamplers(resamplers)
+        if played and self._report_finished(text, utterance.cancelled):
+            utterance.timeline.mark("drained")
+
+    def _get_output(self, role, device_id, samplerate, timeline=None):
+        """取得 (必要時建立) 指定角色的常駐輸出串流；設備或採樣率改變時才重新開啟。"""
+        out = self._outputs.get(role)
+        if out is not None and out.device == device_id and out.samplerate == samplerate and out.active:
+            return out
+        start = time.perf_counter()
+        if out is not None:
+            out.close()
         try:
-            self.log(f"Opening and writing to {stream_name} stream. Data shape: {data.shape}, dtype: {data.dtype}", "DEBUG")
-            with stream:
-                stream.write(data)
-            self.log(f"Audio stream to device {stream.device} finished.", "DEBUG")
-        except Exception as e:
-            self.log(f"Error during audio playback to stream {stream_name}: {e}", "ERROR")
+            out = DeviceOutput(device_id, samplerate, self.log, name=f"{role.capitalize()} ({device_id})")
+        except Exception:
+            # 設備可能已拔除或索引已改變，重新掃描設備清單 (播放結束後才會實際重新初始化 PortAudio)
+            self._outputs.pop(role, None)
+            self.devices.request_refresh()
+            raise
+        self._outputs[role] = out
+        self._prepare_resamplers([samplerate])
+        if timeline is not None:
+            timeline.add_duration("stream_open", time.perf_counter() - start)
+            timeline.mark("stream_open")
+        return out
+
+    def _prepare_resamplers(self, device_rates=None):
+        """為已知的合成採樣率與輸出串流採樣率組合預先設計重採樣濾波器，避免在第一句話播放時才計算。"""
+        if device_rates is None:
+            # 已開啟的輸出串流，加上尚未開啟的主輸出/監聽設備的預設採樣率
+            device_rates = {out.samplerate for out in list(self._outputs.values())}
+            default_device = sd.default.device[1]
+            for mapping, name in ((self._local_output_devices, self.local_output_device_name),
+                                  (self._listen_devices, self.listen_device_name)):
+                rate = self._device_samplerate(mapping.get(name, default_device), None)
+                if rate:
+                    device_rates.add(int(rate))
+        tts = self._sherpa_tts
+        if tts is not None:
+            self._synth_rates.add(int(tts.sample_rate))
+        for device_sr in device_rates:
+            for synth_sr in list(self._synth_rates):
+                resampler.prepare(synth_sr, device_sr)
+
+    def _close_output(self, role):
+        out = self._outputs.pop(role, None)
+        if out is not None:
+            out.close()
+
+    def _close_all_outputs(self):
+        for role in list(self._outputs.keys()):
+            self._close_output(role)
+
+    def _wait_outputs_drained(self, poll_interval=0.02, cancelled=None):
+        """等待所有輸出緩衝區播完；若佇列中已有下一筆待播放項目或已被中斷則提前返回，以保持連續播放。"""
+        while self._outputs and not all(out.is_drained() or not out.active for out in self._outputs.values()):
+            if self._has_pending_playback() or (cancelled is not None and cancelled.is_set()):
+                return
+            time.sleep(poll_interval)
 
-    def _play_audio(self, samples, sample_rate, text, is_preview):
-        self.log(f"_play_audio called. Samples shape: {samples.shape}, SR: {sample_rate}, is_preview: {is_preview}", "DEBUG")
-        self.log(f"DEBUG: Applying TTS volume: {self.tts_volume}, Listen volume: {self.listen_volume}", "DEBUG")
+    def _report_finished(self, text, cancelled=None):
+        """等待播放完畢並回報；等待期間被中斷 (cancel() 已回報「已中斷播放」) 時不回報，回傳 False。"""
+        self._wait_outputs_drained(cancelled=cancelled)
+        if cancelled is not None and cancelled.is_set():
+            return False
+        self.audio_status_queue.put(("PLAY", "[✔]", f"播放完畢: {text[:20]}..."))
+        return True
+
+    def _device_samplerate(self, device_id, fallback):
+        """從設備快取取得預設採樣率；查無資料時沿用合成的採樣率。"""
+        return self.devices.default_samplerate(device_id, fallback)
 
+    def _playback_targets(self, is_preview, sample_rate):
+        """回傳本次要輸出的 [(role, device_id, device_sr, gain), ...]。"""
         main_device_id = self._local_output_devices.get(self.local_output_device_name, sd.default.device[1])
         listen_device_id = self._listen_devices.get(self.listen_device_name, sd.default.device[1])
-        
+
         play_to_main = not is_preview
         play_to_listen = is_preview or self.enable_listen_to_self
 
         self.log(f"Main Device: {self.local_output_device_name} (ID: {main_device_id}), Listen Device: {self.listen_device_name} (ID: {listen_device_id})", "DEBUG")
         self.log(f"Play to Main: {play_to_main}, Play to Listen: {play_to_listen}", "DEBUG")
 
-        # Apply master volume to main output samples
-        samples_main = samples * self.tts_volume
-        # Apply listen volume to listen output samples
-        samples_listen = samples * self.listen_volume
+        targets = []
+        if play_to_main:
+            targets.append(("main", main_device_id, self._device_samplerate(main_device_id, sample_rate), self.tts_volume))
+        if play_to_listen:
+            targets.append(("listen", listen_device_id, self._device_samplerate(listen_device_id, sample_rate), self.listen_volume))
+        return targets
+
+    def _resample_for(self, samples, sample_rate, device_sr, resamplers, converted, timeline=None):
+        """
+        將樣本轉為 device_sr。同一目標採樣率只計算一次 (main 與 listen 共用結果)。
+        resamplers 為 None 時視為獨立的一段音訊，直接補齊尾端。
+        """
+        if sample_rate == device_sr:
+            return samples
+        if device_sr in converted:
+            return converted[device_sr]
+        self.log(f"Resampling from {sample_rate} Hz to {device_sr} Hz.", "DEBUG")
+        start = time.perf_counter()
+        if resamplers is None:
+            rs = StreamResampler(sample_rate, device_sr)
+            out = np.concatenate([rs.process(samples), rs.flush()])
+        else:
+            rs = resamplers.get((sample_rate, device_sr))
+            if rs is None:
+                rs = resamplers[(sample_rate, device_sr)] = StreamResampler(sample_rate, device_sr)
+            out = rs.process(samples)
+        converted[device_sr] = out
+        if timeline is not None:
+            timeline.add_duration("resample", time.perf_counter() - start)
+        return out
+
+    def _flush_resamplers(self, resamplers):
+        """送出各重採樣器延遲中的尾端樣本到採樣率相符的輸出串流。"""
+        writes = []
+        for (_, device_sr), rs in resamplers.items():
+            tail = rs.flush()
+            if not len(tail):
+                continue
+            for out in self._outputs.values():
+                if out.samplerate == device_sr and out.active:
+                    writes.append((out, tail))
+        if writes:
+            try:
+                write_blocking(writes)
+            except Exception as e:
+                self.log(f"Error while flushing resampler tails: {e}", "WARNING")
+        resamplers.clear()
 
-        try:
-            main_info = sd.query_devices(main_device_id)
-            main_sr = int(main_info.get('default_samplerate', sample_rate))
-            self.log(f"Main device '{main_info['name']}' (ID: {main_device_id}) default SR: {main_sr}", "DEBUG")
-        except Exception:
-            main_sr = sample_rate
-            self.log(f"Failed to query main device {main_device_id}, using synthesized sample rate {sample_rate}", "WARNING")
-            
-        try:
-            listen_info = sd.query_devices(listen_device_id)
-            listen_sr = int(listen_info.get('default_samplerate', sample_rate))
-            self.log(f"Listen device '{listen_info['name']}' (ID: {listen_device_id}) default SR: {listen_sr}", "DEBUG")
-        except Exception:
-            listen_sr = sample_rate
-            self.log(f"Failed to query listen device {listen_device_id}, using synthesized sample rate {sample_rate}", "WARNING")
-        
-        streams_to_play = []
-        threads = []
+    def _play_audio(self, samples, sample_rate, text, is_preview, final=True, resamplers=None, cancelled=None,
+                    timeline=None):
+        self.log(f"_play_audio called. Samples shape: {samples.shape}, SR: {sample_rate}, is_preview: {is_preview}", "DEBUG")
+        self.log(f"DEBUG: Applying TTS volume: {self.tts_volume}, Listen volume: {self.listen_volume}", "DEBUG")
+
+        writes = []
+        converted = {}  # device_sr -> 已重採樣的樣本
 
         try:
-            # Resample for main stream if necessary
-            resampled_samples_main = samples_main
-            if play_to_main and sample_rate != main_sr:
-                self.log(f"Resampling main stream from {sample_rate} Hz to {main_sr} Hz.", "DEBUG")
-                num_samples_resampled = int(len(samples_main) * main_sr / sample_rate)
-                resampled_samples_main = resample(samples_main, num_samples_resampled)
-                
-            # Resample for listen stream if necessary
-            resampled_samples_listen = samples_listen
-            if play_to_listen and sample_rate != listen_sr:
-                self.log(f"Resampling listen stream from {sample_rate} Hz to {listen_sr} Hz.", "DEBUG")
-                num_samples_resampled = int(len(samples_listen) * listen_sr / sample_rate)
-                resampled_samples_listen = resample(samples_listen, num_samples_resampled)
-
-            if play_to_main:
-                self.log(f"Preparing main audio stream to device {main_device_id} at SR {main_sr}", "DEBUG")
-                main_stream = sd.OutputStream(
-                    samplerate=main_sr,
-                    channels=1,
-                    dtype=resampled_samples_main.dtype,
-                    device=main_device_id
-                )
-                streams_to_play.append({'stream': main_stream, 'data': resampled_samples_main, 'name': f"Main ({main_device_id})"})
-            
-            if play_to_listen:
-                self.log(f"Preparing listen audio stream to device {listen_device_id} at SR {listen_sr}", "DEBUG")
-                listen_stream = sd.OutputStream(
-                    samplerate=listen_sr,
-                    channels=1,
-                    dtype=resampled_samples_listen.dtype,
-                    device=listen_device_id
-                )
-                streams_to_play.append({'stream': listen_stream, 'data': resampled_samples_listen, 'name': f"Listen ({listen_device_id})"})
-
-            if not streams_to_play:
+            targets = self._playback_targets(is_preview, sample_rate)
+            for role, device_id, device_sr, gain in targets:
+                out = self._get_output(role, device_id, device_sr, timeline)
+                # 音量增益在 callback 中套用，不再額外複製一份樣本
+                out.gain = gain
+                out.feeding = True
+                writes.append((out, self._resample_for(samples, sample_rate, device_sr, resamplers, converted, timeline)))
+            if not any(role == "listen" for role, *_ in targets):
+                self._close_output("listen")
+
+            if not writes:
                 self.log("No audio streams to play.", "DEBUG")
                 return
 
-            for s_info in streams_to_play:
-                thread = threading.Thread(target=self._play_stream_threaded, args=(s_info['stream'], s_info['data'], s_info['name']))
-                threads.append(thread)
-                thread.start()
-
-            for thread in threads:
-                thread.join()
+            write_blocking(writes, should_stop=cancelled.is_set if cancelled is not None else None,
+                           on_first_write=(lambda: self._on_first_write(timeline)) if timeline is not None else None)
 
         except Exception as e:
             self.log(f"Error during audio playback setup: {e}", "ERROR")
@@ -673,15 +1730,19 @@ class AudioEngine:
             self.audio_status_queue.put(("PLAY", "[❌]", f"播放時發生錯誤: {e}"))
             return
 
-        self.audio_status_queue.put(("PLAY", "[✔]", f"播放完畢: {text[:20]}..."))
+        if final:
+            self._report_finished(text, cancelled)
+
+    @staticmethod
+    def _on_first_write(timeline):
+        if "first_write" in timeline.marks:
+            return
+        timeline.mark("first_write")
+        if timeline.trace_id is not None:
+            tracer.instant("first_audio", timeline.trace_id)
+            tracer.end("hotkey_to_audio", timeline.trace_id, result="played")
 
     @staticmethod
     def _audiosegment_to_float32_numpy(audio_segment):
-        samples = np.array(audio_segment.get_array_of_samples()).astype(np.float32)
-        if audio_segment.channels == 2:
-            samples = samples.reshape((-1, 2))
-        else:
-            samples = samples.reshape((-1,))
-        max_val = float(2 ** (8 * audio_segment.sample_width - 1))
-        samples = samples / max_val
-        return samples
+        # 直接以 raw_data 建立 view 並轉為 float32 單聲道，不經過 array.array 與 float64
+        return pcm.int_to_float32(audio_segment.raw_data, audio_segment.sample_width, audio_segment.channels)
@@ -23,6 +23,20 @@ class ConfigManager:
         "rate": 175,
         "volume": 1.0,
         "hotkey": "<shift>+z",
+        "cancel_hotkey": "<ctrl>+<shift>+x", # 中斷目前播放並清空待播放佇列的快捷鍵，留空為停用
+        "play_queue_max_depth": 8, # 待播放佇列的項目上限，已滿時優先權較低的項目會被略過
+        "quick_phrase_deadline_sec": 5, # 快捷語音等待超過此秒數仍未開始播放就略過，0 為不限
+        "typed_text_deadline_sec": 60, # 輸入的文字等待超過此秒數仍未開始播放就略過，0 為不限
+        "duplicate_coalesce_sec": 1.5, # 同一段文字在此秒數內重複送出只播放一次
+        "latency_log_each": False, # 每句播放完都在日誌面板顯示延遲時間軸摘要
+        "latency_report_interval": 20, # 每 N 句在日誌面板顯示一次各引擎的首段音訊延遲 p50/p95/p99，0 為停用
+        "metrics_port": 0, # 本機指標端點的連接埠 (http://127.0.0.1:<port>/metrics 與 /metrics.json)，0 為停用
+        "profiling_enabled": False, # 取樣式效能分析 (也可設定環境變數 JUMOUTH_PROFILE=1)，結果輸出到 profiles 資料夾
+        "profiling_interval_ms": 10, # 效能分析的取樣間隔 (毫秒)，越大額外負擔越低
+        "profiling_max_files": 100, # profiles 資料夾保留的最新檔案數
+        "ui_stall_threshold_ms": 50, # 介面 (Qt 事件迴圈) 凍結超過此毫秒數時記錄主執行緒的堆疊，0 為停用
+        "ui_stall_summary_minutes": 10, # 每隔幾分鐘在日誌面板顯示一次介面凍結摘要 (個別凍結只記錄在 DEBUG)
+        "trace_enabled": False, # 記錄快捷鍵到播放的跨執行緒追蹤，Ctrl+Shift+T 或關閉程式時匯出到 traces 資料夾
         "quick_phrases": [],
         "quick_input_position": "bottom-right",
         "local_output_device_name": "Default", # 新增此行
@@ -37,6 +51,20 @@ class ConfigManager:
         "custom_voices": [], # 新增: 儲存自訂語音
         "visible_voices": [], # 新增: 儲存要在主視窗顯示的語音
         "model_settings": {}, # NEW: 儲存模型專屬的設定，例如語速和音量
+        "audio_cache_max_mb": 64, # 記憶體內音訊快取的容量上限 (MB)
+        "enable_disk_cache": True, # 將合成結果保存到 audio_cache 資料夾，重啟後可直接使用
+        "disk_cache_max_mb": 256, # 磁碟音訊快取的容量上限 (MB)
+        "synthesis_workers": 2, # 合成階段的工作執行緒數量，讓下一句的合成與目前的播放重疊
+        "detect_device_changes": True, # 收到系統的音訊設備變更通知 (熱插拔) 時重新掃描設備
+        "model_pool_max_models": 3, # 同時常駐記憶體的 Sherpa-ONNX 模型數量上限
+        "model_pool_max_mb": 1024, # 常駐模型的記憶體預算 (MB，以模型檔案大小估算)
+        "model_pool_idle_minutes": 15, # 非使用中的模型閒置超過此時間 (分鐘) 即釋放，0 為不釋放
+        "pin_default_model": True, # 啟動時選用的模型永遠常駐，不會被淘汰
+        "onnx_num_threads": 0, # Sherpa-ONNX 執行緒數，0 為使用本機效能測試的結果
+        "onnx_max_num_sentences": 0, # Sherpa-ONNX 每批合成的句子數，0 為使用本機效能測試的結果
+        "auto_tune_models": False, # 模型在本機沒有效能測試結果時，於播放閒置時自動測試 (測試期間會佔用 CPU)
+        "sherpa_parallel_sessions": 1, # 長文字分句並行合成的工作階段數 (每個各載入一份模型)，1 為停用
+        "synthesis_process_workers": 0, # Sherpa-ONNX/pyttsx3 的合成子程序數量 (各自載入引擎)，0 為在本程序內合成
     }
 
     def __init__(self, log_func):
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+# 檔案: device_registry.py
+# 功用: 音訊輸出設備的能力快取 (預設採樣率、支援的採樣率、聲道數)。
+#      - 播放路徑只讀取快取，不再每次呼叫 sd.query_devices()。
+#      - 收到設備變更通知 (系統的音訊設備變更信號，或開啟輸出串流失敗) 時，由背景執行緒重新初始化 PortAudio
+#        以看到熱插拔的設備 (USB 耳機、重新安裝 VB-CABLE 等)，比對前後差異，有變動時通知上層更新 UI。
+#      - PortAudio 重新初始化會讓所有已開啟的串流失效，因此不定期執行，且只在播放閒置時進行 (由 reinit_guard 決定)；
+#        正在播放時稍後再試。
+
+import threading
+import sounddevice as sd
+
+# 設備變更通知常會連續觸發數次，等待這段時間後合併為一次更新
+CHANGE_SETTLE_SEC = 0.5
+# 正在播放而無法重新初始化時，隔多久再試一次
+BUSY_RETRY_SEC = 1.0
+# 探測支援採樣率時使用的候選值
+PROBE_SAMPLE_RATES = (8000, 16000, 22050, 24000, 32000, 44100, 48000, 88200, 96000)
+
+
+class DeviceRegistry:
+    def __init__(self, log, on_refresh=None, reinit_guard=None):
+        """
+        on_refresh(added, removed, changed): 每次更新後呼叫 (PortAudio 重新初始化後設備索引可能改變)，
+            參數為新增/移除/能力變更的設備名稱 list，皆為空代表清單沒有變動。
+        reinit_guard: 回傳 context manager 的函式；進入時回傳 False 代表目前不適合重新初始化 PortAudio。
+        """
+        self.log = log
+        self.on_refresh = on_refresh
+        self.reinit_guard = reinit_guard
+        self._devices = {}      # index -> 設備資訊 dict
+        self._by_name = {}      # 輸出設備名稱 -> 設備資訊 dict
+        self._probe_cache = {}  # (name, hostapi, default_samplerate) -> 支援的採樣率 tuple
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._change_event = threading.Event()
+        self._thread = None
+
+    # ---------- 讀取 (播放路徑使用，不呼叫 PortAudio) ----------
+    def get(self, device_id):
+        with self._lock:
+            return self._devices.get(device_id)
+
+    def default_samplerate(self, device_id, fallback):
+        info = self.get(device_id)
+        if info is None or not info["default_samplerate"]:
+            return fallback
+        return info["default_samplerate"]
+
+    def output_devices(self):
+        """回傳輸出設備資訊的 list (依 PortAudio 的索引排序)。"""
+        with self._lock:
+            return [d for _, d in sorted(self._devices.items()) if d["max_output_channels"] > 0]
+
+    def all_device_names(self):
+        with self._lock:
+            return [d["name"] for _, d in sorted(self._devices.items())]
+
+    # ---------- 更新 ----------
+    def _probe_rates(self, dev):
+        key = (dev["name"], dev["hostapi"], dev["default_samplerate"])
+        rates = self._probe_cache.get(key)
+        if rates is None:
+            supported = []
+            for rate in PROBE_SAMPLE_RATES:
+                try:
+                    sd.check_output_settings(device=dev["index"], samplerate=rate, channels=1, dtype="float32")
+                    supported.append(rate)
+                except Exception:
+                    pass
+            rates = tuple(supported)
+            self._probe_cache[key] = rates
+        return rates
+
+    def _snapshot(self):
+        devices = {}
+        for d in sd.query_devices():
+            info = {
+                "index": d["index"],
+                "name": d["name"],
+                "hostapi": d["hostapi"],
+                "max_output_channels": d["max_output_channels"],
+                "max_input_channels": d["max_input_channels"],
+                "default_samplerate": int(d.get("default_samplerate") or 0),
+                "supported_samplerates": (),
+            }
+            if info["max_output_channels"] > 0:
+                info["supported_samplerates"] = self._probe_rates(info)
+            devices[info["index"]] = info
+        return devices
+
+    @staticmethod
+    def _capabilities(info):
+        return (info["max_output_channels"], info["default_samplerate"], info["supported_samplerates"])
+
+    def refresh(self, reinit=False) -> bool:
+        """
+        重新讀取設備清單。reinit=True 時先重新初始化 PortAudio (否則看不到熱插拔)，
+        若 reinit_guard 表示目前正在播放則略過本次更新。回傳是否實際完成更新。
+        """
+        if reinit:
+            if self.reinit_guard is None:
+                return False
+            with self.reinit_guard() as allowed:
+                if not allowed:
+                    return False
+                try:
+                    sd._terminate()
+                    sd._initialize()
+                except Exception as e:
+                    self.log(f"重新初始化 PortAudio 失敗: {e}", "WARN")
+                devices = self._snapshot()
+        else:
+            devices = self._snapshot()
+
+        new_by_name = {d["name"]: d for d in devices.values() if d["max_output_channels"] > 0}
+        with self._lock:
+            old_by_name = self._by_name
+            first_load = not self._devices
+            self._devices = devices
+            self._by_name = new_by_name
+
+        added = [n for n in new_by_name if n not in old_by_name]
+        removed = [n for n in old_by_name if n not in new_by_name]
+        changed = [n for n in new_by_name if n in old_by_name
+                   and self._capabilities(new_by_name[n]) != self._capabilities(old_by_name[n])]
+        if first_load:
+            added, removed, changed = [], [], []
+        elif added or removed or changed:
+            self.log(f"偵測到音訊設備變更: 新增 {added}，移除 {removed}，能力變更 {changed}", "DEBUG")
+        if self.on_refresh:
+            try:
+                self.on_refresh(added, removed, changed)
+            except Exception as e:
+                self.log(f"處理設備變更時發生錯誤: {e}", "ERROR")
+        return True
+
+    # ---------- 背景更新 ----------
+    def start(self):
+        if self._thread is not None:
+            return
+        # 每個背景執行緒各用一個停止事件，避免 stop() 後立即 start() 時舊執行緒沒有結束
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._refresh_loop, args=(self._stop_event,),
+                                        name="device-registry", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._change_event.set()
+        self._thread = None
+
+    def request_refresh(self):
+        """通知設備可能已變動 (可從任何執行緒呼叫)，由背景執行緒重新初始化 PortAudio 並更新清單。"""
+        self._change_event.set()
+
+    def _refresh_loop(self, stop_event):
+        while True:
+            self._change_event.wait()
+            if stop_event.wait(CHANGE_SETTLE_SEC):
+                return
+            self._change_event.clear()
+            while True:
+                try:
+                    done = self.refresh(reinit=True)
+                except Exception as e:
+                    self.log(f"更新音訊設備清單失敗: {e}", "WARN")
+                    done = True
+                if done:
+                    break
+                if stop_event.wait(BUSY_RETRY_SEC):
+                    return
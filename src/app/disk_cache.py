@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+# 檔案: disk_cache.py
+# 功用: 以內容定址的合成音訊磁碟快取 (存放於 CACHE_DIR)，讓重新啟動後不必重新合成。
+#      - 每筆快取以快取鍵 (md5) 命名，存成 float32 的 .npy 檔，讀取時以 mmap 方式延遲載入。
+#      - index.json 記錄採樣率、所屬引擎、大小與最後使用時間，用於 LRU 回收與依模型清除。
+#      - 總大小超過配額時，依最後使用時間由舊到新刪除。
+#      - 索引的變更只標記為 dirty，由計時器在 FLUSH_DELAY_SEC 秒後 (或關閉時的 flush()) 一次寫回，
+#        快捷語音預先合成等連續寫入時不會每筆都重寫整個 index.json。
+
+import os
+import json
+import time
+import threading
+import numpy as np
+
+from ..utils.deps import ensure_dir
+
+DEFAULT_DISK_CACHE_BYTES = 256 * 1024 * 1024
+INDEX_FILE_NAME = "index.json"
+FLUSH_DELAY_SEC = 5.0
+
+
+class DiskAudioCache:
+    def __init__(self, cache_dir: str, max_bytes=DEFAULT_DISK_CACHE_BYTES, log=None):
+        self.cache_dir = cache_dir
+        self.max_bytes = int(max_bytes)
+        self.log = log or (lambda msg, level="INFO": None)
+        self._index = None  # key -> {"sr", "engine", "bytes", "atime"}；第一次使用時才載入
+        self._total_bytes = 0
+        self._dirty = False
+        self._flush_timer = None
+        self._lock = threading.Lock()
+
+    # ---------- 索引 ----------
+    def _index_path(self):
+        return os.path.join(self.cache_dir, INDEX_FILE_NAME)
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.npy")
+
+    def _ensure_index_locked(self):
+        if self._index is not None:
+            return
+        self._index = {}
+        path = self._index_path()
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self._index = json.load(f)
+            except (json.JSONDecodeError, IOError) as e:
+                self.log(f"音訊磁碟快取索引損壞，將重建: {e}", "WARN")
+                self._index = {}
+        # 清除索引中不存在的檔案，以及沒有索引的孤兒檔案 (例如上次刪除時檔案仍被映射)
+        self._index = {k: v for k, v in self._index.items() if os.path.exists(self._entry_path(k))}
+        if os.path.isdir(self.cache_dir):
+            for fname in os.listdir(self.cache_dir):
+                if fname.endswith(".npy") and fname[:-4] not in self._index:
+                    self._remove_file(os.path.join(self.cache_dir, fname))
+        self._total_bytes = sum(meta["bytes"] for meta in self._index.values())
+
+    def _mark_dirty_locked(self):
+        self._dirty = True
+        if self._flush_timer is None:
+            self._flush_timer = threading.Timer(FLUSH_DELAY_SEC, self.flush)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    def _save_index_locked(self):
+        ensure_dir(self.cache_dir)
+        tmp_path = self._index_path() + ".tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._index, f)
+            os.replace(tmp_path, self._index_path())
+            self._dirty = False
+        except IOError as e:
+            self.log(f"儲存音訊磁碟快取索引失敗: {e}", "ERROR")
+
+    def _remove_file(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            # Windows 上仍被 mmap 的檔案無法刪除，留待下次啟動時清理
+            pass
+
+    # ---------- 存取 ----------
+    def get(self, key):
+        """讀取快取項目，回傳 (samples, sample_rate)；samples 為唯讀的 mmap 陣列。"""
+        with self._lock:
+            self._ensure_index_locked()
+            meta = self._index.get(key)
+            if meta is None:
+                return None
+            try:
+                samples = np.load(self._entry_path(key), mmap_mode='r')
+            except (OSError, ValueError) as e:
+                self.log(f"讀取音訊磁碟快取失敗，將移除該項目: {e}", "WARN")
+                self._index.pop(key, None)
+                self._total_bytes -= meta["bytes"]
+                self._mark_dirty_locked()
+                return None
+            meta["atime"] = time.time()
+            self._mark_dirty_locked()
+            return samples, meta["sr"]
+
+    def put(self, key, samples, sample_rate, engine=""):
+        samples = np.ascontiguousarray(samples, dtype=np.float32)
+        with self._lock:
+            self._ensure_index_locked()
+            ensure_dir(self.cache_dir)
+            path = self._entry_path(key)
+            tmp_path = path + ".tmp"
+            try:
+                with open(tmp_path, 'wb') as f:
+                    np.save(f, samples)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                self.log(f"寫入音訊磁碟快取失敗: {e}", "ERROR")
+                self._remove_file(tmp_path)
+                return False
+            old = self._index.get(key)
+            if old is not None:
+                self._total_bytes -= old["bytes"]
+            self._index[key] = {
+                "sr": int(sample_rate),
+                "engine": engine,
+                "bytes": os.path.getsize(path),
+                "atime": time.time(),
+            }
+            self._total_bytes += self._index[key]["bytes"]
+            self._gc_locked()
+            self._mark_dirty_locked()
+            return True
+
+    def _gc_locked(self):
+        if self._total_bytes <= self.max_bytes:
+            return
+        for key, meta in sorted(self._index.items(), key=lambda kv: kv[1]["atime"]):
+            if self._total_bytes <= self.max_bytes:
+                break
+            self._index.pop(key)
+            self._remove_file(self._entry_path(key))
+            self._total_bytes -= meta["bytes"]
+        self._dirty = True
+
+    def purge_engine(self, engine: str) -> int:
+        """刪除某個引擎 (模型) 的所有快取項目，回傳刪除的數量。"""
+        with self._lock:
+            self._ensure_index_locked()
+            keys = [k for k, meta in self._index.items() if meta.get("engine") == engine]
+            for key in keys:
+                self._total_bytes -= self._index.pop(key)["bytes"]
+                self._remove_file(self._entry_path(key))
+            if keys:
+                self._mark_dirty_locked()
+            return len(keys)
+
+    def set_max_bytes(self, max_bytes):
+        with self._lock:
+            self.max_bytes = int(max_bytes)
+            if self._index is not None:
+                self._gc_locked()
+                if self._dirty:
+                    self._mark_dirty_locked()
+
+    def flush(self):
+        """將尚未寫回的索引變更 (新項目、最後使用時間、刪除) 寫回索引檔；關閉時必須呼叫。"""
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if self._index is not None and self._dirty:
+                self._save_index_locked()
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._ensure_index_locked()
+            return {
+                "entries": len(self._index),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
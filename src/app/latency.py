@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+# 檔案: latency.py
+# 功用: 每筆播放請求的延遲時間軸，以及依引擎彙整的延遲統計。
+#      - LatencyTimeline: 記錄一筆請求從 play_text() 到聲音送進輸出設備的各個時間點
+#        (送出、取出、快取查詢、合成開始/首段/結束、開啟串流、首個區塊寫入、播放完畢)，
+#        以及重採樣等會重複發生的階段的累計耗時。
+#      - LatencyStats: 保留最近的時間軸，依引擎計算首段音訊延遲 (time-to-first-audio) 與各階段的 p50/p95/p99。
+#        快取命中的請求歸在 "cache"，不會拉低引擎本身的統計。
+
+import time
+import threading
+from collections import deque, defaultdict
+
+DEFAULT_STATS_WINDOW = 200  # 每個引擎保留的最近樣本數
+DEFAULT_RECENT_TIMELINES = 50
+PERCENTILES = (50, 95, 99)
+
+# 時間點依發生順序排列 (summary() 與 to_dict() 使用)
+MARKS = ("enqueue", "dequeue", "cache_lookup", "synth_start", "first_chunk", "synth_end",
+         "stream_open", "first_write", "drained")
+
+# 統計的區間: 名稱 -> (起點, 終點)
+INTERVALS = {
+    "ttfa": ("enqueue", "first_write"),
+    "queue_wait": ("enqueue", "dequeue"),
+    "synth_first_chunk": ("synth_start", "first_chunk"),
+    "synth_total": ("synth_start", "synth_end"),
+    "total": ("enqueue", "drained"),
+}
+
+_INTERVAL_LABELS = {
+    "ttfa": "首段音訊",
+    "queue_wait": "佇列等待",
+    "synth_first_chunk": "首段合成",
+    "synth_total": "合成總計",
+    "total": "總計",
+}
+
+
+class LatencyTimeline:
+    """一筆請求的時間軸。時間以 time.perf_counter() 取得，記錄為相對於送出時間的秒數。"""
+    def __init__(self, text="", origin=None, trace_id=None):
+        self.text = text
+        self.origin = origin if origin is not None else time.perf_counter()
+        self.trace_id = trace_id  # 由快捷鍵觸發時的追蹤 ID (見 tracing.py)
+        self.engine = None
+        self.cache_hit = False
+        self.cancelled = False
+        self.marks = {"enqueue": 0.0}
+        self.durations = defaultdict(float)  # 重複發生的階段 (例如 resample、stream_open) 的累計秒數
+
+    def mark(self, name, when=None):
+        """記錄時間點；同一名稱只保留第一次 (例如 first_write)。"""
+        if name not in self.marks:
+            self.marks[name] = (when if when is not None else time.perf_counter()) - self.origin
+
+    def add_duration(self, name, seconds):
+        self.durations[name] += seconds
+
+    def interval(self, name):
+        """INTERVALS 中區間的秒數；缺少任一端點時回傳 None。"""
+        start, end = INTERVALS[name]
+        if start in self.marks and end in self.marks:
+            return self.marks[end] - self.marks[start]
+        return None
+
+    @property
+    def ttfa(self):
+        return self.interval("ttfa")
+
+    def to_dict(self) -> dict:
+        return {
+            "text": self.text,
+            "trace_id": self.trace_id,
+            "engine": self.engine,
+            "cache_hit": self.cache_hit,
+            "cancelled": self.cancelled,
+            "marks_ms": {name: round(self.marks[name] * 1000, 1) for name in MARKS if name in self.marks},
+            "durations_ms": {name: round(sec * 1000, 1) for name, sec in self.durations.items()},
+        }
+
+    def summary(self) -> str:
+        parts = []
+        for name in ("queue_wait", "synth_first_chunk"):
+            value = self.interval(name)
+            if value is not None:
+                parts.append(f"{_INTERVAL_LABELS[name]} {value * 1000:.0f}")
+        for name, label in (("resample", "重採樣"), ("stream_open", "開啟串流")):
+            if name in self.durations:
+                parts.append(f"{label} {self.durations[name] * 1000:.0f}")
+        ttfa = self.ttfa
+        head = f"首段音訊 {ttfa * 1000:.0f} ms" if ttfa is not None else "首段音訊 -"
+        source = "快取" if self.cache_hit else (self.engine or "?")
+        detail = f" ({' / '.join(parts)} ms)" if parts else ""
+        return f"[{source}] {head}{detail}: {self.text[:20]}"
+
+
+def _percentile(sorted_values, pct):
+    """最近排名法 (nearest-rank) 的百分位數。"""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[min(len(sorted_values), int(rank)) - 1]
+
+
+class LatencyStats:
+    """依引擎彙整最近的時間軸。record() 可從任何執行緒呼叫。"""
+    def __init__(self, window=DEFAULT_STATS_WINDOW, recent=DEFAULT_RECENT_TIMELINES):
+        self.window = int(window)
+        self._samples = defaultdict(lambda: defaultdict(lambda: deque(maxlen=self.window)))  # 引擎 -> 區間 -> 秒數
+        self._recent = deque(maxlen=int(recent))
+        self._lock = threading.Lock()
+        self.recorded = 0
+
+    @staticmethod
+    def key_for(timeline) -> str:
+        return "cache" if timeline.cache_hit else (timeline.engine or "unknown")
+
+    def record(self, timeline):
+        """加入一筆已完成的時間軸；被中斷的請求只保留在 recent()，不計入百分位數。"""
+        with self._lock:
+            self._recent.append(timeline)
+            if timeline.cancelled:
+                return
+            per_engine = self._samples[self.key_for(timeline)]
+            for name in INTERVALS:
+                value = timeline.interval(name)
+                if value is not None:
+                    per_engine[name].append(value)
+            self.recorded += 1
+
+    def percentiles(self, engine=None, interval="ttfa") -> dict:
+        """
+        回傳 {引擎: {"count": n, "p50": ms, "p95": ms, "p99": ms}}；指定 engine 時只回傳該引擎的結果 (無資料時為 None)。
+        interval 為 INTERVALS 中的名稱，預設為首段音訊延遲。
+        """
+        with self._lock:
+            engines = [engine] if engine is not None else list(self._samples)
+            result = {}
+            for name in engines:
+                values = sorted(self._samples.get(name, {}).get(interval, ()))
+                if not values:
+                    result[name] = None
+                    continue
+                entry = {"count": len(values)}
+                for pct in PERCENTILES:
+                    entry[f"p{pct}"] = round(_percentile(values, pct) * 1000, 1)
+                result[name] = entry
+        return result[engine] if engine is not None else result
+
+    def recent(self, count=None) -> list:
+        """最近的時間軸 (舊到新)，以 dict 表示。"""
+        with self._lock:
+            timelines = list(self._recent)
+        if count is not None:
+            timelines = timelines[-count:]
+        return [t.to_dict() for t in timelines]
+
+    def summary_lines(self, interval="ttfa") -> list:
+        lines = []
+        for engine, entry in sorted(self.percentiles(interval=interval).items()):
+            if entry is None:
+                continue
+            lines.append(f"{engine}: {_INTERVAL_LABELS.get(interval, interval)} p50 {entry['p50']:.0f} / "
+                         f"p95 {entry['p95']:.0f} / p99 {entry['p99']:.0f} ms (n={entry['count']})")
+        return lines
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._recent.clear()
+            self.recorded = 0
@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+# 檔案: metrics.py
+# 功用: 執行期指標與選用的本機 HTTP 端點，供無人看管的直播主機從外部監看。
+#      - Counter: 累加型指標。每個執行緒寫入自己的計數格 (只有單一寫入者)，累加時不需要鎖；
+#        讀取時才把各執行緒的計數格加總，因此可以留在音訊 callback 與合成路徑上。
+#        執行緒結束時其計數格併入基準值後移除，短命的執行緒 (批次合成、模型載入等) 不會讓計數格越來越多。
+#      - 收集器 (collector): 在讀取時才呼叫的函式，回傳佇列深度、快取統計等即時數值，平時沒有任何成本。
+#      - MetricsServer: 只綁定 127.0.0.1 的 HTTP 伺服器，
+#        /metrics 為 Prometheus 文字格式，/metrics.json 為 JSON。
+
+import json
+import time
+import weakref
+import threading
+from collections import defaultdict
+
+DEFAULT_METRICS_HOST = "127.0.0.1"
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class _ThreadToken:
+    """存放在 threading.local 中，執行緒結束時隨之被回收，用來觸發計數格的合併。"""
+    __slots__ = ("__weakref__",)
+
+
+class Counter:
+    def __init__(self, name, help_text, label=None):
+        self.name = name
+        self.help = help_text
+        self.label = label  # 標籤名稱 (例如 "engine")；None 代表沒有標籤
+        self._local = threading.local()
+        self._cells = []
+        self._base = defaultdict(float)  # 已結束執行緒的累計值
+        self._cells_lock = threading.Lock()  # 只在執行緒第一次寫入、執行緒結束與讀取時使用
+
+    def inc(self, value=1.0, label_value=""):
+        cell = getattr(self._local, "cell", None)
+        if cell is None:
+            cell = self._local.cell = defaultdict(float)
+            token = self._local.token = _ThreadToken()
+            with self._cells_lock:
+                self._cells.append(cell)
+            weakref.finalize(token, self._retire, cell)
+        cell[label_value] += value
+
+    def _retire(self, cell):
+        """執行緒已結束 (不會再寫入)，把它的計數格併入基準值。"""
+        with self._cells_lock:
+            for key, value in cell.items():
+                self._base[key] += value
+            self._cells.remove(cell)
+
+    def values(self) -> dict:
+        """標籤值 -> 各執行緒加總後的數值。"""
+        with self._cells_lock:
+            totals = defaultdict(float, self._base)
+            for cell in self._cells:
+                for key, value in list(cell.items()):
+                    totals[key] += value
+        return dict(totals)
+
+
+class Sample:
+    """收集器回傳的單一數值。"""
+    __slots__ = ("name", "kind", "help", "labels", "value")
+
+    def __init__(self, name, value, help_text="", kind="gauge", labels=None):
+        self.name = name
+        self.value = value
+        self.help = help_text
+        self.kind = kind
+        self.labels = labels or {}
+
+
+class MetricsRegistry:
+    def __init__(self, prefix="tts_"):
+        self.prefix = prefix
+        self._counters = []
+        self._collectors = []
+        self.started = time.time()
+
+    def counter(self, name, help_text, label=None) -> Counter:
+        counter = Counter(self.prefix + name, help_text, label)
+        self._counters.append(counter)
+        return counter
+
+    def register_collector(self, collector):
+        """collector() 回傳 Sample 的 list，只在讀取指標時呼叫。"""
+        self._collectors.append(collector)
+
+    def unregister_collector(self, collector):
+        if collector in self._collectors:
+            self._collectors.remove(collector)
+
+    def collect(self) -> list:
+        samples = []
+        for counter in self._counters:
+            values = counter.values()
+            if not values and not counter.label:
+                values = {"": 0.0}
+            for label_value, value in values.items():
+                labels = {counter.label: label_value} if counter.label else {}
+                samples.append(Sample(counter.name, value, counter.help, "counter", labels))
+        for collector in list(self._collectors):
+            try:
+                for sample in collector():
+                    sample.name = self.prefix + sample.name
+                    samples.append(sample)
+            except Exception:
+                # 讀取指標不應影響程式運作；收集失敗時略過該收集器
+                continue
+        samples.append(Sample(self.prefix + "uptime_seconds", time.time() - self.started, "程式執行時間"))
+        return samples
+
+    # ---------- 輸出格式 ----------
+    def to_prometheus(self) -> str:
+        lines = []
+        described = set()
+        for sample in self.collect():
+            if sample.value is None:
+                continue
+            if sample.name not in described:
+                described.add(sample.name)
+                if sample.help:
+                    lines.append(f"# HELP {sample.name} {sample.help}")
+                lines.append(f"# TYPE {sample.name} {sample.kind}")
+            lines.append(f"{sample.name}{_format_labels(sample.labels)} {_format_value(sample.value)}")
+        return "\n".join(lines) + "\n"
+
+    def to_json(self) -> dict:
+        result = {}
+        for sample in self.collect():
+            name = sample.name[len(self.prefix):] if sample.name.startswith(self.prefix) else sample.name
+            if sample.labels:
+                node = result.setdefault(name, {})
+                keys = [str(v) for v in sample.labels.values()]
+                for key in keys[:-1]:
+                    node = node.setdefault(key, {})
+                node[keys[-1]] = sample.value
+            else:
+                result[name] = sample.value
+        return result
+
+
+def _format_labels(labels) -> str:
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels.items():
+        escaped = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{key}="{escaped}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _format_value(value) -> str:
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+class MetricsServer:
+    """在背景執行緒中提供 /metrics 與 /metrics.json，只接受本機連線。"""
+    def __init__(self, registry, port, host=DEFAULT_METRICS_HOST, log=None):
+        self.registry = registry
+        self.port = int(port)
+        self.host = host
+        self.log = log or (lambda msg, level="INFO": None)
+        self._server = None
+        self._thread = None
+
+    def start(self) -> bool:
+        from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split("?", 1)[0]
+                if path == "/metrics":
+                    body, content_type = registry.to_prometheus().encode("utf-8"), PROMETHEUS_CONTENT_TYPE
+                elif path == "/metrics.json":
+                    body = json.dumps(registry.to_json(), ensure_ascii=False).encode("utf-8")
+                    content_type = "application/json; charset=utf-8"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        try:
+            self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        except OSError as e:
+            self.log(f"無法啟動指標端點 {self.host}:{self.port}: {e}", "WARN")
+            self._server = None
+            return False
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True)
+        self._thread.start()
+        self.log(f"指標端點已啟動: http://{self.host}:{self.port}/metrics")
+        return True
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            self._thread = None
+
+
+# 全程式共用的指標
+registry = MetricsRegistry()
+synthesis_requests = registry.counter("synthesis_requests_total", "合成次數", label="engine")
+synthesis_seconds = registry.counter("synthesis_seconds_total", "合成耗時 (秒)", label="engine")
+synthesis_audio_seconds = registry.counter("synthesis_audio_seconds_total", "合成產生的音訊長度 (秒)", label="engine")
+model_loads = registry.counter("model_loads_total", "Sherpa-ONNX 模型載入次數", label="model")
+model_load_seconds = registry.counter("model_load_seconds_total", "Sherpa-ONNX 模型載入耗時 (秒)", label="model")
+download_bytes = registry.counter("download_bytes_total", "下載的位元組數")
+download_seconds = registry.counter("download_seconds_total", "下載耗時 (秒)")
+playback_underruns = registry.counter("playback_underruns_total", "播放中輸出緩衝區耗盡的次數", label="output")
+device_underflows = registry.counter("device_underflows_total", "PortAudio 回報的輸出 underflow 次數", label="output")
+
+
+def _collect_derived():
+    samples = []
+    seconds = download_seconds.values().get("", 0.0)
+    if seconds > 0:
+        samples.append(Sample("download_throughput_bytes_per_second", download_bytes.values().get("", 0.0) / seconds,
+                              "平均下載速度"))
+    return samples
+
+
+registry.register_collector(_collect_derived)
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+# 檔案: model_pool.py
+# 功用: 常駐多個已載入的 Sherpa-ONNX OfflineTts 實例，切回最近用過的模型時不必重新載入 ONNX 與 FST。
+#      - 數量上限與記憶體預算 (以模型檔案大小估算)，超過時依 LRU 淘汰。
+#      - 閒置超過 idle_timeout 的模型會被釋放。
+#      - 可釘選 (例如預設模型)；釘選的模型、目前使用中的模型，以及背景載入完成但尚未切換的模型不會被淘汰。
+
+import time
+import threading
+from collections import OrderedDict
+
+DEFAULT_POOL_MAX_MODELS = 3
+DEFAULT_POOL_MAX_BYTES = 1024 * 1024 * 1024
+DEFAULT_POOL_IDLE_TIMEOUT_SEC = 15 * 60
+# 背景檢查閒置模型的間隔
+IDLE_CHECK_INTERVAL_SEC = 60.0
+
+
+class _PooledModel:
+    def __init__(self, tts, est_bytes):
+        self.tts = tts
+        self.est_bytes = int(est_bytes)
+        self.last_used = time.monotonic()
+
+
+class SherpaModelPool:
+    def __init__(self, log, max_models=DEFAULT_POOL_MAX_MODELS, max_bytes=DEFAULT_POOL_MAX_BYTES,
+                 idle_timeout=DEFAULT_POOL_IDLE_TIMEOUT_SEC):
+        self.log = log
+        self.max_models = int(max_models)
+        self.max_bytes = int(max_bytes)
+        self.idle_timeout = float(idle_timeout)
+        self.active_id = None  # 目前使用中的模型，不會被淘汰
+        self._models = OrderedDict()  # model_id -> _PooledModel，最近使用的在最後
+        self._pinned = set()
+        self._protected = set()  # 背景載入完成、等待切換的模型
+        self._lock = threading.Lock()
+        self._reaper = None
+
+    def get(self, model_id):
+        """取得已載入的 OfflineTts 並標記為最近使用；不存在時回傳 None。"""
+        with self._lock:
+            entry = self._models.get(model_id)
+            if entry is None:
+                return None
+            entry.last_used = time.monotonic()
+            self._models.move_to_end(model_id)
+            return entry.tts
+
+    def __contains__(self, model_id):
+        with self._lock:
+            return model_id in self._models
+
+    def put(self, model_id, tts, est_bytes=0, protect=False):
+        with self._lock:
+            self._models.pop(model_id, None)
+            self._models[model_id] = _PooledModel(tts, est_bytes)
+            if protect:
+                self._protected.add(model_id)
+            self._evict_locked()
+        self._ensure_reaper()
+
+    def unprotect(self, model_id):
+        with self._lock:
+            self._protected.discard(model_id)
+            self._evict_locked()
+
+    def remove(self, model_id):
+        with self._lock:
+            self._pinned.discard(model_id)
+            self._protected.discard(model_id)
+            return self._models.pop(model_id, None) is not None
+
+    def pin(self, model_id):
+        with self._lock:
+            self._pinned = {model_id} if model_id else set()
+
+    def configure(self, max_models=None, max_bytes=None, idle_timeout=None):
+        with self._lock:
+            if max_models is not None:
+                self.max_models = max(1, int(max_models))
+            if max_bytes is not None:
+                self.max_bytes = int(max_bytes)
+            if idle_timeout is not None:
+                self.idle_timeout = float(idle_timeout)
+            self._evict_locked()
+
+    def _evictable_locked(self):
+        return [mid for mid in self._models
+                if mid not in self._pinned and mid not in self._protected and mid != self.active_id]
+
+    def _evict_locked(self):
+        total = sum(e.est_bytes for e in self._models.values())
+        for model_id in self._evictable_locked():
+            if len(self._models) <= self.max_models and total <= self.max_bytes:
+                break
+            entry = self._models.pop(model_id)
+            total -= entry.est_bytes
+            self.log(f"模型池已釋放 '{model_id}' (LRU)。", "DEBUG")
+
+    def evict_idle(self):
+        """釋放閒置超過 idle_timeout 的模型 (釘選與使用中的除外)。"""
+        if self.idle_timeout <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            for model_id in self._evictable_locked():
+                if now - self._models[model_id].last_used >= self.idle_timeout:
+                    self._models.pop(model_id)
+                    self.log(f"模型池已釋放閒置的 '{model_id}'。", "DEBUG")
+
+    def _ensure_reaper(self):
+        if self._reaper is not None:
+            return
+        self._reaper = threading.Thread(target=self._reap_loop, name="model-pool-reaper", daemon=True)
+        self._reaper.start()
+
+    def _reap_loop(self):
+        while True:
+            time.sleep(IDLE_CHECK_INTERVAL_SEC)
+            try:
+                self.evict_idle()
+            except Exception as e:
+                self.log(f"模型池閒置檢查失敗: {e}", "WARN")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "models": list(self._models.keys()),
+                "pinned": sorted(self._pinned),
+                "est_bytes": sum(e.est_bytes for e in self._models.values()),
+                "max_models": self.max_models,
+                "max_bytes": self.max_bytes,
+            }
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+# 檔案: model_staging.py
+# 功用: 為 Sherpa-ONNX 模型提供只含 ASCII 字元的路徑 (其 C++ 端無法開啟含中文等字元的路徑)。
+#      - 模型目錄本身就是 ASCII 路徑時直接使用，不做任何處理。
+#      - 否則在 ASCII 的常駐暫存區 (ProgramData 或系統暫存目錄) 建立一份「鏡像」，
+#        以模型 ID + 檔案指紋 (大小、修改時間) 命名；檔案用硬連結，目錄用 junction/符號連結，
+#        都不可行時才複製。完成後寫入標記檔，之後載入只需檢查檔案的中繼資料。
+
+import os
+import re
+import sys
+import json
+import stat
+import shutil
+import hashlib
+import tempfile
+from pathlib import Path
+
+STAGE_MARKER = ".stage_ok.json"
+STAGE_DIR_NAME = os.path.join("JuMouth", "model_stage")
+
+
+def _is_ascii(path) -> bool:
+    try:
+        str(path).encode("ascii")
+        return True
+    except UnicodeEncodeError:
+        return False
+
+
+def _stage_root():
+    """回傳第一個路徑為 ASCII 的暫存區根目錄；都不是 ASCII 時回傳 None。"""
+    candidates = []
+    if sys.platform.startswith("win"):
+        candidates.append(os.environ.get("PROGRAMDATA") or "C:\\ProgramData")
+        candidates.append(os.environ.get("PUBLIC") or "C:\\Users\\Public")
+    candidates.append(tempfile.gettempdir())
+    for base in candidates:
+        if base and _is_ascii(base):
+            return Path(base) / STAGE_DIR_NAME
+    return None
+
+
+def _fingerprint(source_dir: Path, file_names) -> str:
+    """以檔案的相對路徑、大小與修改時間計算指紋；目錄會遞迴列入其中所有檔案。"""
+    h = hashlib.sha1()
+    for fname in sorted(file_names):
+        path = source_dir / fname
+        if path.is_dir():
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for f in sorted(files):
+                    st = os.stat(os.path.join(root, f))
+                    rel = os.path.relpath(os.path.join(root, f), source_dir)
+                    h.update(f"{rel}|{st.st_size}|{st.st_mtime_ns}\n".encode("utf-8"))
+        else:
+            st = path.stat()
+            h.update(f"{fname}|{st.st_size}|{st.st_mtime_ns}\n".encode("utf-8"))
+    return h.hexdigest()[:16]
+
+
+def _stage_dirs(root: Path, model_id: str):
+    """列出某個模型的鏡像目錄 (精確比對，避免 ID 為其他模型前綴時誤刪)。"""
+    pattern = re.compile(re.escape(model_id) + r"-[0-9a-f]{16}")
+    return [p for p in root.iterdir() if pattern.fullmatch(p.name)]
+
+
+def _is_link(path) -> bool:
+    """符號連結或 Windows junction (刪除時不能遞迴進入，否則會刪到原始檔案)。"""
+    path = str(path)
+    if os.path.islink(path):
+        return True
+    isjunction = getattr(os.path, "isjunction", None)  # Python 3.12+
+    if isjunction is not None:
+        return isjunction(path)
+    try:
+        attrs = getattr(os.lstat(path), "st_file_attributes", 0)
+    except OSError:
+        return False
+    return bool(attrs & getattr(stat, "FILE_ATTRIBUTE_REPARSE_POINT", 0))
+
+
+def _remove_stage(path: Path):
+    """刪除暫存的鏡像目錄；連結只移除連結本身。"""
+    if not os.path.isdir(path) or _is_link(path):
+        return
+    for entry in os.scandir(path):
+        try:
+            if _is_link(entry.path):
+                try:
+                    os.unlink(entry.path)
+                except OSError:
+                    os.rmdir(entry.path)  # junction 要用 rmdir 移除
+            elif entry.is_dir(follow_symlinks=False):
+                shutil.rmtree(entry.path)
+            else:
+                os.remove(entry.path)
+        except OSError:
+            pass
+    try:
+        os.rmdir(path)
+    except OSError:
+        pass
+
+
+def _link_or_copy_file(src, dst):
+    try:
+        os.link(src, dst)
+        return "hardlink"
+    except OSError:
+        shutil.copy2(src, dst)
+        return "copy"
+
+
+def _link_or_copy_tree_file(src, dst):
+    _link_or_copy_file(src, dst)
+    return dst
+
+
+def _link_or_copy_dir(src, dst):
+    if sys.platform.startswith("win"):
+        try:
+            import _winapi
+            _winapi.CreateJunction(str(src), str(dst))
+            return "junction"
+        except (ImportError, OSError):
+            pass
+    try:
+        os.symlink(src, dst, target_is_directory=True)
+        return "symlink"
+    except (OSError, NotImplementedError):
+        pass
+    shutil.copytree(src, dst, copy_function=_link_or_copy_tree_file)
+    return "copytree"
+
+
+def stage_model(model_id: str, source_dir, file_names, log=None) -> Path:
+    """
+    回傳可交給 Sherpa-ONNX 的模型目錄 (ASCII 路徑)。
+    source_dir 已是 ASCII 時直接回傳；否則建立或重用暫存區中的鏡像。
+    """
+    log = log or (lambda msg, level="INFO": None)
+    source_dir = Path(source_dir)
+    if _is_ascii(source_dir):
+        return source_dir
+
+    root = _stage_root()
+    if root is None:
+        log("找不到 ASCII 路徑的暫存區，直接使用原始模型路徑。", "WARN")
+        return source_dir
+
+    fingerprint = _fingerprint(source_dir, file_names)
+    stage_dir = root / f"{model_id}-{fingerprint}"
+    marker = stage_dir / STAGE_MARKER
+    if marker.exists() and all((stage_dir / f).exists() for f in file_names):
+        log(f"DEBUG: 重用模型暫存目錄: {stage_dir}", "DEBUG")
+        return stage_dir
+
+    # 模型檔案有變動 (或上次建立失敗)，移除同一模型的舊鏡像後重建
+    os.makedirs(root, exist_ok=True)
+    for old in _stage_dirs(root, model_id):
+        _remove_stage(old)
+
+    tmp_dir = root / f".{model_id}-{fingerprint}.{os.getpid()}.tmp"
+    _remove_stage(tmp_dir)
+    os.makedirs(tmp_dir)
+    methods = {}
+    try:
+        for fname in file_names:
+            src = source_dir / fname
+            dst = tmp_dir / fname
+            os.makedirs(dst.parent, exist_ok=True)
+            methods[fname] = _link_or_copy_dir(src, dst) if src.is_dir() else _link_or_copy_file(src, dst)
+        with open(tmp_dir / STAGE_MARKER, "w", encoding="utf-8") as f:
+            json.dump({"model_id": model_id, "fingerprint": fingerprint, "methods": methods}, f)
+        os.replace(tmp_dir, stage_dir)
+    except Exception:
+        _remove_stage(tmp_dir)
+        raise
+    log(f"DEBUG: 已建立模型暫存目錄 {stage_dir} ({', '.join(f'{k}: {v}' for k, v in methods.items())})", "DEBUG")
+    return stage_dir
+
+
+def remove_staged_model(model_id: str):
+    """刪除某個模型的所有暫存鏡像 (例如模型被刪除時)。"""
+    root = _stage_root()
+    if root is None or not root.is_dir():
+        return
+    for old in _stage_dirs(root, model_id):
+        _remove_stage(old)
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+# 檔案: mp3_decoder.py
+# 功用: 在程序內逐塊解碼 MP3 串流 (Edge-TTS 的輸出)，不經過暫存檔與 ffmpeg 子程序。
+#      - StreamingMp3Decoder: 使用 PyAV (av) 的解碼器，每收到一段網路資料就解出 PCM。
+#      - BufferedMp3Decoder: 未安裝 PyAV 時的備援，於記憶體中累積資料，結束時以 pydub 一次解碼。
+#      兩者皆輸出 mono float32 的 numpy 陣列，並合併成至少 min_block_seconds 長的區塊。
+
+import io
+import numpy as np
+
+from .pcm import int_to_float32
+
+av = None
+
+
+def _lazy_import_av():
+    global av
+    if av is None:
+        try:
+            import av as _av
+            av = _av
+        except ImportError:
+            return False
+    return True
+
+
+def _frame_to_mono_float32(frame):
+    """將 PyAV 的 AudioFrame 轉為 mono float32 陣列。"""
+    arr = frame.to_ndarray()
+    channels = len(frame.layout.channels)
+    if frame.format.is_planar:
+        mono = arr[0] if arr.shape[0] == 1 else arr.mean(axis=0)
+    else:
+        arr = arr.reshape(-1, channels)
+        mono = arr[:, 0] if channels == 1 else arr.mean(axis=1)
+    if mono.dtype.kind == 'i':
+        return int_to_float32(mono)
+    return mono.astype(np.float32, copy=False)
+
+
+class _BlockCoalescer:
+    """將細碎的解碼結果合併為較大的區塊，減少下游播放與重採樣的呼叫次數。"""
+    def __init__(self, min_block_seconds):
+        self.min_block_seconds = min_block_seconds
+        self._parts = []
+        self._count = 0
+        self.sample_rate = None
+
+    def add(self, samples, sample_rate):
+        if self.sample_rate is not None and sample_rate != self.sample_rate:
+            yield from self.drain()
+        self.sample_rate = sample_rate
+        self._parts.append(samples)
+        self._count += len(samples)
+        if self._count >= self.min_block_seconds * sample_rate:
+            yield from self.drain()
+
+    def drain(self):
+        if self._parts:
+            block = self._parts[0] if len(self._parts) == 1 else np.concatenate(self._parts)
+            self._parts = []
+            self._count = 0
+            yield block, self.sample_rate
+
+
+class StreamingMp3Decoder:
+    def __init__(self, min_block_seconds=0.25):
+        self._codec = av.CodecContext.create("mp3", "r")
+        self._blocks = _BlockCoalescer(min_block_seconds)
+
+    def _decode(self, packet, out):
+        try:
+            frames = self._codec.decode(packet)
+        except av.error.InvalidDataError:
+            # 非音訊框架 (例如 ID3 標籤) 或損壞的封包，略過即可
+            return
+        for frame in frames:
+            out.extend(self._blocks.add(_frame_to_mono_float32(frame), frame.sample_rate))
+
+    def feed(self, data: bytes):
+        """送入一段 MP3 位元組，回傳已解出的 [(samples, sample_rate), ...]。"""
+        out = []
+        for packet in self._codec.parse(data):
+            self._decode(packet, out)
+        return out
+
+    def flush(self):
+        out = []
+        for packet in self._codec.parse(b""):
+            self._decode(packet, out)
+        try:
+            self._decode(None, out)
+        except av.error.FFmpegError:
+            pass
+        out.extend(self._blocks.drain())
+        return out
+
+
+class BufferedMp3Decoder:
+    def __init__(self, to_float32):
+        self._buf = io.BytesIO()
+        self._to_float32 = to_float32
+
+    def feed(self, data: bytes):
+        self._buf.write(data)
+        return []
+
+    def flush(self):
+        if not self._buf.tell():
+            return []
+        from pydub import AudioSegment
+        self._buf.seek(0)
+        audio = AudioSegment.from_file(self._buf, format="mp3")
+        return [(self._to_float32(audio), audio.frame_rate)]
+
+
+def create_mp3_decoder(to_float32, log=None):
+    """優先使用 PyAV 的串流解碼器，缺少時退回記憶體內的 pydub 解碼。"""
+    if _lazy_import_av():
+        return StreamingMp3Decoder()
+    if log:
+        log("未安裝 'av' 模組，Edge-TTS 將在下載完成後才解碼 (無法邊下載邊播放)。", "DEBUG")
+    return BufferedMp3Decoder(to_float32)
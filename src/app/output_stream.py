@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+# 檔案: output_stream.py
+# 功用: 提供常駐的音訊輸出串流，避免每次播放都重新開啟/關閉 PortAudio 串流。
+#      - DeviceOutput: 每個輸出設備一個長駐的 callback 式 sd.OutputStream，
+#        由工作執行緒推入 PCM (經由 ring_buffer.RingBuffer)，callback 取出並在原地套用音量增益。
+#      - 中斷播放: cancel() 讓下一個 callback 把已排入的樣本淡出並清空緩衝區，之後持續丟棄寫入的資料，
+#        直到播放端呼叫 resume()。
+#      - 指標: 播放中 (feeding) 緩衝區被讀空時記一次 underrun，PortAudio 回報的 underflow 另外計數 (見 metrics.py)。
+
+import time
+import numpy as np
+import sounddevice as sd
+
+from . import metrics
+from .ring_buffer import RingBuffer
+
+DEFAULT_BUFFER_SECONDS = 4.0
+DEFAULT_BLOCKSIZE = 512
+DEFAULT_CANCEL_FADE_MS = 8.0
+
+
+class DeviceOutput:
+    """單一輸出設備上常駐的 callback 串流。"""
+    def __init__(self, device, samplerate: int, log, name="", buffer_seconds=DEFAULT_BUFFER_SECONDS,
+                 blocksize=DEFAULT_BLOCKSIZE):
+        self.device = device
+        self.samplerate = int(samplerate)
+        self.name = name or str(device)
+        self.log = log
+        self.gain = 1.0  # 由 callback 讀取，在輸出緩衝區上原地套用
+        self._discarding = False  # cancel() 後為 True: callback 丟棄緩衝區內容並輸出靜音
+        self._fade_ramp = None  # cancel() 設定的淡出曲線，由下一個 callback 取用一次
+        self.feeding = False  # 播放端仍有資料要寫入時為 True；此時緩衝區被讀空才算 underrun
+        self._had_audio = False  # 上一個 callback 是否輸出了完整的區塊 (只由 callback 修改)
+        self.ring = RingBuffer(int(self.samplerate * buffer_seconds))
+        self._stream = sd.OutputStream(
+            samplerate=self.samplerate,
+            channels=1,
+            dtype="float32",
+            device=device,
+            blocksize=blocksize,
+            callback=self._callback,
+        )
+        self._stream.start()
+        self.log(f"Opened persistent output stream {self.name} (device {device}, SR {self.samplerate}).", "DEBUG")
+
+    @property
+    def active(self) -> bool:
+        return self._stream.active
+
+    def _callback(self, outdata, frames, time_info, status):
+        out = outdata[:, 0]
+        if self._discarding:
+            self._discard_callback(out)
+            return
+        if status and status.output_underflow:
+            metrics.device_underflows.inc(label_value=self.name)
+        n = self.ring.read_into(out)
+        if n < frames:
+            out[n:] = 0.0
+            if self.feeding and self._had_audio:
+                metrics.playback_underruns.inc(label_value=self.name)
+        self._had_audio = n == frames
+        gain = self.gain
+        if n and gain != 1.0:
+            np.multiply(out[:n], gain, out=out[:n])
+
+    def _discard_callback(self, out):
+        ramp, self._fade_ramp = self._fade_ramp, None
+        n = 0
+        if ramp is not None:
+            # 取消後的第一個區塊: 以短暫的淡出結束目前的聲音，避免直接截斷產生爆音
+            n = self.ring.read_into(out[:min(len(out), len(ramp))])
+            if n:
+                np.multiply(out[:n], ramp[:n], out=out[:n])
+                if self.gain != 1.0:
+                    np.multiply(out[:n], self.gain, out=out[:n])
+        out[n:] = 0.0
+        self.ring.discard()
+
+    def cancel(self, fade_ms=DEFAULT_CANCEL_FADE_MS):
+        """中斷播放: 在下一個音訊區塊內淡出並清空緩衝區，之後寫入的資料都會被丟棄直到 resume()。"""
+        fade = max(1, int(self.samplerate * fade_ms / 1000.0))
+        self._fade_ramp = np.linspace(1.0, 0.0, fade, dtype=np.float32)
+        self._discarding = True
+
+    def resume(self, timeout=0.1, poll_interval=0.002):
+        """cancel() 之後重新接受資料；先等 callback 丟棄取消前殘留的樣本。"""
+        if not self._discarding:
+            return
+        deadline = time.monotonic() + timeout
+        while self.ring.available() and self.active and time.monotonic() < deadline:
+            time.sleep(poll_interval)
+        self._fade_ramp = None
+        self._discarding = False
+
+    def write(self, data) -> int:
+        """非阻塞寫入，回傳實際推入緩衝區的樣本數。"""
+        return self.ring.write(data)
+
+    def is_drained(self) -> bool:
+        return self.ring.available() == 0
+
+    def close(self):
+        try:
+            self._stream.stop()
+            self._stream.close()
+        except Exception as e:
+            self.log(f"Error closing output stream {self.name}: {e}", "WARNING")
+        self.log(f"Closed output stream {self.name}.", "DEBUG")
+
+
+def write_blocking(outputs_and_data, poll_interval=0.005, should_stop=None, on_first_write=None):
+    """
+    將各自的資料完整推入對應的 DeviceOutput；緩衝區滿時等待 callback 消化。
+    outputs_and_data: [(DeviceOutput, np.ndarray), ...]
+    should_stop() 回傳 True 時 (例如播放被中斷) 立即放棄剩餘的資料。
+    on_first_write() 在第一批資料推入緩衝區後呼叫一次 (延遲量測用)。
+    """
+    pending = [[out, data, 0] for out, data in outputs_and_data]
+    while pending:
+        if should_stop is not None and should_stop():
+            return
+        progressed = False
+        for entry in pending:
+            out, data, pos = entry
+            n = out.write(data[pos:])
+            if n:
+                entry[2] = pos + n
+                progressed = True
+        if progressed and on_first_write is not None:
+            on_first_write()
+            on_first_write = None
+        # 串流若已停止 (例如設備被移除)，callback 不會再消化資料，直接放棄以免卡死
+        pending = [e for e in pending if e[2] < len(e[1]) and e[0].active]
+        if pending and not progressed:
+            time.sleep(poll_interval)
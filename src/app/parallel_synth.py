@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+# 檔案: parallel_synth.py
+# 功用: 同一個 Sherpa-ONNX 模型的多個 OfflineTts 工作階段，讓一段長文字的各句同時合成。
+#      - SherpaSessionPool: N 個獨立的 OfflineTts (各自分配 CPU 核心數 / N 個執行緒)，
+#        各句交給執行緒池合成，結果依原順序產生 (先完成的後句會等待前句)。
+#      - CrossfadeJoiner: 在各句的接縫處做短暫的交叉淡化，避免分開合成的句子在接點產生爆音。
+#      注意: 每個工作階段都會各自載入一份模型權重，記憶體用量約為 N 倍。
+
+import queue
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+DEFAULT_CROSSFADE_MS = 8.0
+
+
+class SherpaSessionPool:
+    def __init__(self, model_id, sessions):
+        self.model_id = model_id
+        self.size = len(sessions)
+        self._idle = queue.Queue()
+        for tts in sessions:
+            self._idle.put(tts)
+        self._executor = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix="sherpa-par")
+
+    @contextlib.contextmanager
+    def session(self):
+        tts = self._idle.get()
+        try:
+            yield tts
+        finally:
+            self._idle.put(tts)
+
+    def map_ordered(self, fn, items):
+        """以 fn(tts, item) 並行處理各項目，依原順序逐一產生結果 (例外以 exception 物件回傳)。"""
+        def run(item):
+            with self.session() as tts:
+                return fn(tts, item)
+
+        futures = [self._executor.submit(run, item) for item in items]
+        try:
+            for future in futures:
+                try:
+                    yield future.result()
+                except Exception as e:
+                    yield e
+        finally:
+            # 呼叫端提前結束 (例如合成失敗) 時，取消尚未開始的工作
+            for future in futures:
+                future.cancel()
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+
+class CrossfadeJoiner:
+    """
+    依序接收各句的樣本，在相鄰兩句之間做 fade_samples 長的線性交叉淡化。
+    每句的尾端會保留到下一句到達 (或 flush) 時才送出，因此輸出總長度會比輸入少 (句數 - 1) * fade_samples。
+    """
+    def __init__(self, fade_samples: int):
+        self.fade_samples = max(0, int(fade_samples))
+        self._tail = None
+        if self.fade_samples:
+            ramp = np.linspace(0.0, 1.0, self.fade_samples, dtype=np.float32)
+            self._fade_in = ramp
+            self._fade_out = ramp[::-1].copy()
+
+    def push(self, samples):
+        samples = np.asarray(samples, dtype=np.float32)
+        n = self.fade_samples
+        if not n or len(samples) < 2 * n:
+            # 太短的句子不做淡化，先送出前一句保留的尾端
+            out = samples if self._tail is None else np.concatenate([self._tail, samples])
+            self._tail = None
+            return out
+        if self._tail is None:
+            head = samples[:-n]
+        else:
+            joint = self._tail * self._fade_out + samples[:n] * self._fade_in
+            head = np.concatenate([joint, samples[n:-n]])
+        self._tail = samples[-n:].copy()
+        return head
+
+    def flush(self):
+        tail, self._tail = self._tail, None
+        return tail if tail is not None else np.zeros(0, dtype=np.float32)
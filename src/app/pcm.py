@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+# 檔案: pcm.py
+# 功用: 音訊樣本緩衝區的共用工具，讓「引擎輸出 → 快取 → 重採樣 → 輸出串流」全程維持 float32，並減少整段複製。
+#      - from_engine_samples: 引擎輸出的樣本 (ndarray、支援 buffer protocol 的物件或 list) 轉為 float32 陣列，
+#        可共用記憶體時直接建立 view，list 則以 np.fromiter 一次轉換，不經過 float64 的中間陣列。
+#      - int_to_float32: 整數 PCM (bytes 或 ndarray) 轉為 float32 單聲道，只配置輸出陣列一次，縮放在原地進行。
+#      - BufferPool / scratch: 執行緒區域、只會變大的暫存緩衝區，供重採樣等每個區塊都需要的暫存陣列重複使用。
+#
+#      每句話的陣列配置次數 (穩定狀態，不含引擎內部):
+#      - Sherpa-ONNX: 1 (引擎 list → float32)。透過合成子程序時再加 1 (從共享記憶體複製)。
+#      - pyttsx3: 2 (wave 讀出的 bytes、float32 輸出)。
+#      - Edge-TTS: 每個 MP3 框架 1 (PyAV 解碼)，每個 0.25 秒區塊 1 (合併)，寫入快取時整句 1 (合併)。
+#      - 播放: 採樣率與設備相同時 0 (直接寫入預先配置的環形緩衝區，音量在 callback 中原地套用)；
+#        需要重採樣時每個區塊 2 (輸出陣列與 arange 索引)，其餘暫存陣列來自 scratch。
+
+import threading
+import numpy as np
+
+_INT_DTYPES = {1: np.uint8, 2: np.int16, 4: np.int32}
+# 小於 1 的最大 float32；int32 的滿刻度值轉成 float32 時會進位成 1.0
+_FLOAT32_BELOW_ONE = np.nextafter(np.float32(1.0), np.float32(0.0))
+
+
+def from_engine_samples(samples) -> np.ndarray:
+    """將引擎輸出的樣本轉為一維 float32 陣列；已是 float32 的 ndarray 或 buffer 不複製。"""
+    if isinstance(samples, np.ndarray):
+        return samples.astype(np.float32, copy=False).reshape(-1)
+    if isinstance(samples, (list, tuple)):
+        return np.fromiter(samples, dtype=np.float32, count=len(samples))
+    try:
+        view = memoryview(samples)
+    except TypeError:
+        return np.fromiter(samples, dtype=np.float32)
+    if view.format == 'f':
+        return np.frombuffer(view, dtype=np.float32)
+    return np.asarray(view).astype(np.float32, copy=False).reshape(-1)
+
+
+def int_to_float32(data, sample_width=None, channels=1) -> np.ndarray:
+    """
+    整數 PCM 轉為 [-1, 1) 的 float32 單聲道。
+    data 可為 bytes (需提供 sample_width: 1/2/4) 或整數 ndarray；多聲道 (交錯排列) 時取平均。
+    """
+    if isinstance(data, np.ndarray):
+        ints = data.reshape(-1)
+    else:
+        dtype = _INT_DTYPES.get(sample_width)
+        if dtype is None:
+            raise ValueError(f"不支援的取樣寬度: {sample_width}")
+        ints = np.frombuffer(data, dtype=dtype)
+
+    if ints.dtype == np.uint8:
+        offset, scale = -128.0, 1.0 / 128.0
+    else:
+        offset, scale = 0.0, 1.0 / float(np.iinfo(ints.dtype).max + 1)
+
+    channels = max(1, int(channels))
+    if channels > 1:
+        out = np.sum(ints.reshape(-1, channels), axis=1, dtype=np.float32)
+        offset *= channels
+        scale /= channels
+    else:
+        out = ints.astype(np.float32)
+    if offset:
+        out += offset
+    out *= scale
+    if ints.dtype.itemsize >= 4:
+        np.minimum(out, _FLOAT32_BELOW_ONE, out=out)
+    return out
+
+
+class BufferPool:
+    """
+    執行緒區域的暫存緩衝區: 每個 (名稱, dtype) 保留一塊只會變大的記憶體，get() 回傳所需形狀的 view。
+    取得的 view 只在同一執行緒下次以相同名稱呼叫 get() 之前有效，呼叫端不可保存或回傳給外部。
+    """
+    def __init__(self):
+        self._local = threading.local()
+        self.requests = 0
+        self.allocations = 0
+
+    def get(self, name, shape, dtype=np.float32):
+        buffers = getattr(self._local, "buffers", None)
+        if buffers is None:
+            buffers = self._local.buffers = {}
+        dtype = np.dtype(dtype)
+        size = int(np.prod(shape))
+        key = (name, dtype.str)
+        buf = buffers.get(key)
+        self.requests += 1
+        if buf is None or buf.size < size:
+            # 多配置一些，避免長度逐漸增加時每次都重新配置
+            buf = np.empty(max(size, int(buf.size * 1.5) if buf is not None else 0), dtype=dtype)
+            buffers[key] = buf
+            self.allocations += 1
+        return buf[:size].reshape(shape)
+
+    def stats(self) -> dict:
+        return {"requests": self.requests, "allocations": self.allocations}
+
+
+# 播放與重採樣路徑共用的暫存緩衝區
+scratch = BufferPool()
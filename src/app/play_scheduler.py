@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+# 檔案: play_scheduler.py
+# 功用: 取代無上限的 FIFO play_queue，決定下一句要合成/播放的文字。
+#      - 優先權: 快捷語音優先於輸入的文字；同一優先權內依送出順序。
+#      - 深度上限 (背壓): 佇列已滿時，新項目的優先權較高則擠掉優先權最低、最新送出的項目，否則拒絕新項目。
+#      - 期限: 每個項目等待超過期限仍未開始就直接丟棄 (例如連按快捷鍵累積的舊語音)。
+#      - 合併: 同一段文字在 coalesce_window 秒內重複送出時只保留一次。
+#      - 查詢與取消: pending() 列出等待中的項目，cancel(item_id) 取消指定項目。
+
+import time
+import heapq
+import itertools
+import threading
+
+PRIORITY_QUICK_PHRASE = 0
+PRIORITY_TYPED = 1
+
+DEFAULT_MAX_DEPTH = 8
+DEFAULT_COALESCE_WINDOW_SEC = 1.5
+DEFAULT_DEADLINES_SEC = {PRIORITY_QUICK_PHRASE: 5.0, PRIORITY_TYPED: 60.0}
+
+
+class PlayItem:
+    def __init__(self, item_id, text, priority, deadline_sec, source, trace_id=None):
+        self.id = item_id
+        self.text = text
+        self.priority = priority
+        self.source = source
+        self.submitted = time.monotonic()
+        self.enqueued = time.perf_counter()  # 延遲時間軸的起點 (見 latency.py)
+        self.deadline = self.submitted + deadline_sec if deadline_sec and deadline_sec > 0 else None
+        self.cancelled = False
+        self.trace_id = trace_id  # 追蹤的關聯 ID (見 tracing.py)
+
+    def expired(self, now=None) -> bool:
+        return self.deadline is not None and (now or time.monotonic()) > self.deadline
+
+    def info(self, now=None) -> dict:
+        now = now or time.monotonic()
+        return {
+            "id": self.id,
+            "text": self.text,
+            "priority": self.priority,
+            "source": self.source,
+            "waiting_sec": round(now - self.submitted, 3),
+            "expires_in_sec": None if self.deadline is None else round(self.deadline - now, 3),
+        }
+
+
+class PlayScheduler:
+    def __init__(self, max_depth=DEFAULT_MAX_DEPTH, coalesce_window=DEFAULT_COALESCE_WINDOW_SEC,
+                 deadlines=None, on_drop=None):
+        """on_drop(item, reason): 項目因逾時、背壓或取消而被丟棄時呼叫 (reason 為 "expired"/"overflow"/"cancelled")。"""
+        self.max_depth = int(max_depth)
+        self.coalesce_window = float(coalesce_window)
+        self.deadlines = {**DEFAULT_DEADLINES_SEC, **(deadlines or {})}
+        self.on_drop = on_drop
+        self._heap = []  # (priority, 送出序號, PlayItem)；取消的項目留在 heap 中，取出時略過
+        self._items = {}  # item_id -> 等待中的 PlayItem
+        self._recent = {}  # (text, priority) -> (item_id, 送出時間)，用於合併重複送出
+        self._ids = itertools.count(1)
+        self._order = itertools.count()
+        self._stops = 0  # 待送出的停止信號 (每個消費者一個)
+        self._cond = threading.Condition()
+        self.stats = {"submitted": 0, "coalesced": 0, "expired": 0, "overflow": 0, "cancelled": 0}
+
+    def configure(self, max_depth=None, coalesce_window=None, deadlines=None):
+        with self._cond:
+            if max_depth is not None:
+                self.max_depth = max(1, int(max_depth))
+            if coalesce_window is not None:
+                self.coalesce_window = float(coalesce_window)
+            if deadlines:
+                self.deadlines.update(deadlines)
+
+    # ---------- 送出 ----------
+    def submit(self, text, priority=PRIORITY_TYPED, deadline_sec=None, source=None, trace_id=None):
+        """
+        加入一段文字，回傳項目 ID；與最近送出的相同文字合併時回傳原本的 ID，被背壓拒絕時回傳 None。
+        deadline_sec 為 None 時使用該優先權的預設期限，0 代表不會逾時。
+        """
+        dropped = []
+        with self._cond:
+            now = time.monotonic()
+            key = (text, priority)
+            recent = self._recent.get(key)
+            if recent is not None and now - recent[1] <= self.coalesce_window:
+                self.stats["coalesced"] += 1
+                return recent[0]
+
+            if deadline_sec is None:
+                deadline_sec = self.deadlines.get(priority, 0)
+            item = PlayItem(next(self._ids), text, priority, deadline_sec, source or "", trace_id)
+
+            dropped.extend(self._purge_expired_locked(now))
+            if len(self._items) >= self.max_depth:
+                # 項目 ID 依送出順序遞增；不用 submitted 比較，連續送出時 monotonic() 可能相同 (Windows 的解析度約 15 ms)
+                victim = max(self._items.values(), key=lambda it: (it.priority, it.id))
+                if victim.priority <= priority:
+                    self.stats["overflow"] += 1
+                    dropped.append((item, "overflow"))
+                    item = None
+                else:
+                    self._remove_locked(victim)
+                    self.stats["overflow"] += 1
+                    dropped.append((victim, "overflow"))
+
+            if item is not None:
+                self._items[item.id] = item
+                heapq.heappush(self._heap, (item.priority, next(self._order), item))
+                self._recent[key] = (item.id, now)
+                self._prune_recent_locked(now)
+                self.stats["submitted"] += 1
+                self._cond.notify()
+        self._notify_dropped(dropped)
+        return item.id if item is not None else None
+
+    def put_stop(self):
+        """讓一個消費者的 get() 回傳 None (停止信號，優先於所有項目)。"""
+        with self._cond:
+            self._stops += 1
+            self._cond.notify()
+
+    # ---------- 取出 ----------
+    def get(self):
+        """阻塞直到有可處理的項目，回傳 PlayItem；收到停止信號時回傳 None。逾時的項目會被丟棄。"""
+        while True:
+            dropped = []
+            with self._cond:
+                while not self._stops and not self._items:
+                    self._cond.wait()
+                if self._stops:
+                    self._stops -= 1
+                    return None
+                item = self._pop_locked()
+                if item is not None and item.expired():
+                    self.stats["expired"] += 1
+                    dropped.append((item, "expired"))
+                    item = None
+            self._notify_dropped(dropped)
+            if item is not None:
+                return item
+
+    def _pop_locked(self):
+        while self._heap:
+            _, _, item = heapq.heappop(self._heap)
+            if self._items.pop(item.id, None) is not None:
+                return item
+        return None
+
+    # ---------- 查詢與取消 ----------
+    def empty(self) -> bool:
+        with self._cond:
+            return not self._items
+
+    def __len__(self):
+        with self._cond:
+            return len(self._items)
+
+    def pending(self):
+        """等待中項目的資訊 (依將被取出的順序)。"""
+        with self._cond:
+            now = time.monotonic()
+            items = sorted(self._items.values(), key=lambda it: (it.priority, it.id))
+            return [it.info(now) for it in items]
+
+    def cancel(self, item_id) -> bool:
+        with self._cond:
+            item = self._items.get(item_id)
+            if item is None:
+                return False
+            self._remove_locked(item)
+            self.stats["cancelled"] += 1
+        self._notify_dropped([(item, "cancelled")])
+        return True
+
+    def clear(self) -> int:
+        """取消所有等待中的項目 (停止信號保留)，回傳取消的數量。"""
+        with self._cond:
+            items = list(self._items.values())
+            for item in items:
+                self._remove_locked(item)
+            self.stats["cancelled"] += len(items)
+        self._notify_dropped([(item, "cancelled") for item in items])
+        return len(items)
+
+    # ---------- 內部 ----------
+    def _remove_locked(self, item):
+        item.cancelled = True
+        self._items.pop(item.id, None)
+        key = (item.text, item.priority)
+        if self._recent.get(key, (None,))[0] == item.id:
+            # 被取消或擠掉的項目不應讓之後的相同文字被合併掉
+            del self._recent[key]
+
+    def _purge_expired_locked(self, now):
+        expired = [it for it in self._items.values() if it.expired(now)]
+        for item in expired:
+            self._remove_locked(item)
+        self.stats["expired"] += len(expired)
+        return [(item, "expired") for item in expired]
+
+    def _prune_recent_locked(self, now):
+        if len(self._recent) > 64:
+            self._recent = {k: v for k, v in self._recent.items() if now - v[1] <= self.coalesce_window}
+
+    def _notify_dropped(self, dropped):
+        if self.on_drop:
+            for item, reason in dropped:
+                try:
+                    self.on_drop(item, reason)
+                except Exception:
+                    pass
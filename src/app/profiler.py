@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+# 檔案: profiler.py
+# 功用: 選用的取樣式效能分析 (statistical profiling)，用於診斷使用者電腦上合成變慢等問題。
+#      - 以單一取樣執行緒每隔 interval 秒讀取 sys._current_frames()，只記錄正在分析區段 (phase) 中的執行緒，
+#        其他執行緒與未啟用時都沒有額外成本；堆疊深度有上限，每次取樣只保存 code 物件的 tuple，寫檔時才轉成文字。
+#      - 每個區段 (一句話的合成與播放、依賴檢查流程、模型載入) 結束後輸出一個 collapsed-stack 檔
+#        ("執行緒;模組:函式;... 次數"，可直接交給 flamegraph.pl 或 speedscope)。
+#      - 輸出目錄只保留最新的 max_files 個檔案，較舊的自動刪除。
+
+import os
+import re
+import sys
+import time
+import queue
+import itertools
+import threading
+import contextlib
+from collections import Counter as _Counter
+from datetime import datetime
+
+DEFAULT_INTERVAL_SEC = 0.01
+DEFAULT_MAX_FILES = 100
+DEFAULT_MAX_DEPTH = 64
+MIN_SAMPLES_TO_WRITE = 3  # 少於此取樣數的區段 (執行時間極短) 不輸出
+IDLE_SLEEP_SEC = 0.05
+
+
+class ProfilePhase:
+    """一個分析區段，可由多個執行緒加入 (例如同一句話的合成與播放執行緒)。"""
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.started = time.time()
+        self.samples = _Counter()  # (執行緒名稱, code 物件 tuple) -> 次數，只由取樣執行緒修改
+        self._refs = 1  # start_phase() 的呼叫端持有一個參照，由 finish() 釋放
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def attach(self):
+        """目前執行緒在此區塊內的堆疊計入此區段。"""
+        with self._lock:
+            self._refs += 1
+        ident = threading.get_ident()
+        self.profiler._add_thread(ident, self)
+        try:
+            yield self
+        finally:
+            self.profiler._remove_thread(ident, self)
+            self._release()
+
+    def finish(self):
+        self._release()
+
+    def _release(self):
+        with self._lock:
+            self._refs -= 1
+            done = self._refs == 0
+        if done:
+            self.profiler._finished.put(self)
+
+
+class SamplingProfiler:
+    def __init__(self):
+        self.enabled = False
+        self.out_dir = None
+        self.interval = DEFAULT_INTERVAL_SEC
+        self.max_files = DEFAULT_MAX_FILES
+        self.max_depth = DEFAULT_MAX_DEPTH
+        self.log = lambda msg, level="INFO": None
+        self._threads = {}  # 執行緒 ident -> [ProfilePhase, ...]
+        self._threads_lock = threading.Lock()
+        self._finished = queue.Queue()
+        self._sampler = None
+        self._file_ids = itertools.count(1)
+        self.sample_seconds = 0.0  # 取樣本身花費的時間 (用於確認額外負擔)
+        self.sample_count = 0
+
+    def configure(self, enabled=None, out_dir=None, interval_ms=None, max_files=None, log=None):
+        if out_dir is not None:
+            self.out_dir = out_dir
+        if interval_ms is not None:
+            self.interval = max(0.001, float(interval_ms) / 1000.0)
+        if max_files is not None:
+            self.max_files = max(1, int(max_files))
+        if log is not None:
+            self.log = log
+        if enabled is not None:
+            self.enabled = bool(enabled) and self.out_dir is not None
+            if self.enabled:
+                self._ensure_sampler()
+
+    # ---------- 區段 ----------
+    def start_phase(self, name):
+        """建立可跨執行緒的區段，呼叫端負責 finish()；未啟用時回傳 None。"""
+        if not self.enabled:
+            return None
+        return ProfilePhase(self, name)
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """目前執行緒上的單一區段。"""
+        phase = self.start_phase(name)
+        if phase is None:
+            yield None
+            return
+        try:
+            with phase.attach():
+                yield phase
+        finally:
+            phase.finish()
+
+    @staticmethod
+    def attach(phase):
+        """phase.attach() 的簡寫，phase 為 None (未啟用) 時不做任何事。"""
+        return phase.attach() if phase is not None else contextlib.nullcontext()
+
+    def wrap(self, name, func):
+        """回傳在分析區段中執行 func 的函式 (用於執行緒的 target)。"""
+        def run(*args, **kwargs):
+            with self.phase(name):
+                return func(*args, **kwargs)
+        return run
+
+    def _add_thread(self, ident, phase):
+        with self._threads_lock:
+            self._threads.setdefault(ident, []).append(phase)
+
+    def _remove_thread(self, ident, phase):
+        with self._threads_lock:
+            phases = self._threads.get(ident)
+            if phases and phase in phases:
+                phases.remove(phase)
+                if not phases:
+                    del self._threads[ident]
+
+    # ---------- 取樣 ----------
+    def _ensure_sampler(self):
+        if self._sampler is None or not self._sampler.is_alive():
+            self._sampler = threading.Thread(target=self._run, name="profiler-sampler", daemon=True)
+            self._sampler.start()
+
+    def _run(self):
+        while self.enabled:
+            with self._threads_lock:
+                targets = {ident: list(phases) for ident, phases in self._threads.items()}
+            if targets:
+                start = time.perf_counter()
+                self._sample(targets)
+                self.sample_seconds += time.perf_counter() - start
+                self.sample_count += 1
+            self._write_finished()
+            time.sleep(self.interval if targets else IDLE_SLEEP_SEC)
+        self._write_finished()
+
+    def _sample(self, targets):
+        frames = sys._current_frames()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, phases in targets.items():
+            frame = frames.get(ident)
+            if frame is None:
+                continue
+            codes = []
+            while frame is not None and len(codes) < self.max_depth:
+                codes.append(frame.f_code)
+                frame = frame.f_back
+            key = (names.get(ident, str(ident)), tuple(reversed(codes)))
+            for phase in phases:
+                phase.samples[key] += 1
+
+    # ---------- 輸出 ----------
+    def _write_finished(self):
+        wrote = False
+        while True:
+            try:
+                phase = self._finished.get_nowait()
+            except queue.Empty:
+                break
+            if sum(phase.samples.values()) < MIN_SAMPLES_TO_WRITE:
+                continue
+            try:
+                self._write(phase)
+                wrote = True
+            except OSError as e:
+                self.log(f"寫入效能分析檔失敗: {e}", "WARN")
+        if wrote:
+            self._rotate()
+
+    def _write(self, phase):
+        os.makedirs(self.out_dir, exist_ok=True)
+        safe_name = re.sub(r"[^\w.-]+", "_", phase.name)[:60]
+        stamp = datetime.fromtimestamp(phase.started).strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(self.out_dir, f"{stamp}-{next(self._file_ids):04d}-{safe_name}.folded")
+        lines = _Counter()
+        for (thread_name, codes), count in phase.samples.items():
+            frames = [thread_name] + [f"{_module_name(code.co_filename)}:{code.co_name}" for code in codes]
+            lines[";".join(frames)] += count
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in lines.most_common():
+                f.write(f"{stack} {count}\n")
+        self.log(f"DEBUG: 已輸出效能分析 {os.path.basename(path)} ({sum(lines.values())} 次取樣)", "DEBUG")
+
+    def _rotate(self):
+        try:
+            files = [os.path.join(self.out_dir, f) for f in os.listdir(self.out_dir) if f.endswith(".folded")]
+        except OSError:
+            return
+        files.sort(key=lambda p: os.path.getmtime(p))
+        for path in files[:-self.max_files]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        return {
+            "samples": self.sample_count,
+            "sample_seconds": round(self.sample_seconds, 4),
+            "avg_sample_ms": round(self.sample_seconds / self.sample_count * 1000, 4) if self.sample_count else 0.0,
+        }
+
+
+def _module_name(filename):
+    """以 src 以下的相對路徑或檔名表示模組，讓不同電腦輸出的堆疊一致。"""
+    normalized = filename.replace("\\", "/")
+    marker = normalized.rfind("/src/")
+    if marker >= 0:
+        return normalized[marker + 1:]
+    return os.path.basename(normalized)
+
+
+# 全程式共用的效能分析器
+profiler = SamplingProfiler()
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+# 檔案: pyttsx3_engine.py
+# 功用: 常駐的 pyttsx3 合成執行緒，避免每句都重新 pyttsx3.init() (初始化 SAPI 驅動是短句的主要成本)。
+#      - 引擎只在專屬執行緒上建立與使用 (SAPI 的 COM 物件不能跨執行緒)，請求依序處理。
+#      - 語速、音量與聲音只在值改變時才重新設定。
+#      - 輸出的 WAV 以 wave 模組直接讀成 float32 PCM，不經過 pydub 與 ffmpeg 子程序。
+#        pyttsx3 只能輸出到檔案，因此重複使用暫存目錄中的同一個檔案，不會每句建立新檔。
+
+import os
+import wave
+import queue
+import shutil
+import tempfile
+import threading
+
+from .pcm import int_to_float32
+
+DEFAULT_RENDER_TIMEOUT_SEC = 60.0
+
+
+def read_wav_float32(path):
+    """以 wave 讀取 PCM WAV，回傳 (float32 單聲道 samples, sample_rate)。"""
+    with wave.open(path, 'rb') as wf:
+        channels = wf.getnchannels()
+        width = wf.getsampwidth()
+        sample_rate = wf.getframerate()
+        data = wf.readframes(wf.getnframes())
+    return int_to_float32(data, width, channels), sample_rate
+
+
+class _RenderRequest:
+    def __init__(self, text, rate, volume, voice_id):
+        self.text = text
+        self.props = {"rate": rate, "volume": volume, "voice": voice_id}
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class Pyttsx3Renderer:
+    def __init__(self, log=None):
+        self.log = log or (lambda msg, level="INFO": None)
+        self._requests = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def render(self, text, rate, volume, voice_id=None, timeout=DEFAULT_RENDER_TIMEOUT_SEC):
+        """合成一段文字，回傳 (samples, sample_rate)；失敗時拋出例外。"""
+        self._ensure_thread()
+        request = _RenderRequest(text, rate, volume, voice_id)
+        self._requests.put(request)
+        if not request.done.wait(timeout):
+            raise TimeoutError(f"pyttsx3 在 {timeout:.0f} 秒內沒有完成合成")
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def close(self):
+        if self._thread is not None:
+            self._requests.put(None)
+            self._thread = None
+
+    def _ensure_thread(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="pyttsx3-engine", daemon=True)
+                self._thread.start()
+
+    @staticmethod
+    def _init_com():
+        if os.name != 'nt':
+            return
+        try:
+            import comtypes
+            comtypes.CoInitialize()
+        except Exception:
+            pass
+
+    def _run(self):
+        import pyttsx3
+        self._init_com()
+        work_dir = tempfile.mkdtemp(prefix="jumouth-pyttsx3-")
+        wav_path = os.path.join(work_dir, "render.wav")
+        engine = None
+        applied = {}
+        try:
+            while True:
+                request = self._requests.get()
+                if request is None:
+                    break
+                try:
+                    if engine is None:
+                        engine = pyttsx3.init()
+                        applied = {}
+                        self.log("DEBUG: pyttsx3 engine initialized.", "DEBUG")
+                    for name, value in request.props.items():
+                        if value is None or applied.get(name) == value:
+                            continue
+                        engine.setProperty(name, value)
+                        applied[name] = value
+                    engine.save_to_file(request.text, wav_path)
+                    engine.runAndWait()
+                    request.result = read_wav_float32(wav_path)
+                except Exception as e:
+                    request.error = e
+                    # 引擎狀態不明，下一筆請求重新初始化
+                    if engine is not None:
+                        try:
+                            engine.stop()
+                        except Exception:
+                            pass
+                    engine = None
+                finally:
+                    request.done.set()
+        finally:
+            if engine is not None:
+                try:
+                    engine.stop()
+                except Exception:
+                    pass
+            shutil.rmtree(work_dir, ignore_errors=True)
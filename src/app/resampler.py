@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+# 檔案: resampler.py
+# 功用: 有理數比例的多相 (polyphase) 重採樣器，取代每次對整段音訊做 FFT 的 scipy.signal.resample。
+#      - 濾波器係數依 (src_rate, dst_rate) 快取，只設計一次；以 numpy 直接設計 Kaiser 視窗 FIR，不需要載入 scipy。
+#        開啟輸出串流時即以 prepare() 為已知的合成/設備採樣率組合預先設計，不佔用第一句話的播放時間。
+#      - 以區塊為單位處理並保存濾波器狀態，可用於串流中的音訊片段。
+#      - 全程使用 float32，不會升級為 float64。
+#      - 每個區塊的暫存陣列 (歷史+輸入、gather 索引與係數) 取自 pcm.scratch，只有輸出陣列是新配置的。
+
+import math
+import functools
+import numpy as np
+
+from .pcm import scratch
+
+TAPS_PER_PHASE = 24
+KAISER_BETA = 6.0
+# 單次計算的最大輸入長度，限制 gather 產生的暫存矩陣大小
+_MAX_CHUNK = 8192
+
+
+def _filter_delay(up: int, down: int, taps_per_phase: int = TAPS_PER_PHASE) -> int:
+    """濾波器的群延遲 (以輸出樣本計)。濾波器中心對齊到 down 的整數倍，延遲才會是整數個輸出樣本。"""
+    return int(round((taps_per_phase * up - 1) / 2.0 / down))
+
+
+@functools.lru_cache(maxsize=16)
+def _design_polyphase_filter(up: int, down: int, taps_per_phase: int = TAPS_PER_PHASE):
+    """設計 Kaiser 視窗的低通 FIR，並拆成 up 個相位，回傳 shape (up, taps_per_phase) 的 float32 陣列。"""
+    num_taps = taps_per_phase * up
+    # 截止頻率 (相對於 Nyquist) 為 1 / max(up, down)，與 scipy.signal.firwin 的設計相同
+    cutoff = 1.0 / max(up, down)
+    half = (num_taps - 1) / 2.0
+    n = np.arange(num_taps, dtype=np.float64) - _filter_delay(up, down, taps_per_phase) * down
+    # Kaiser 視窗跟著中心平移 (最多 down / 2 個上取樣樣本)，超出視窗寬度的係數為 0
+    window = np.i0(KAISER_BETA * np.sqrt(np.clip(1.0 - (n / half) ** 2, 0.0, None))) / np.i0(KAISER_BETA)
+    h = cutoff * np.sinc(cutoff * n) * window
+    h = h / h.sum() * up
+    # 第 p 個相位使用 h[p], h[p + up], h[p + 2*up], ...
+    phases = h.reshape(taps_per_phase, up).T
+    # 各相位的直流增益正規化為 1，避免相位間增益差異造成的週期性失真
+    phases = phases / phases.sum(axis=1, keepdims=True)
+    return np.ascontiguousarray(phases, dtype=np.float32)
+
+
+def rational_ratio(src_rate: int, dst_rate: int):
+    g = math.gcd(int(src_rate), int(dst_rate))
+    return int(dst_rate) // g, int(src_rate) // g
+
+
+def prepare(src_rate: int, dst_rate: int):
+    """預先設計 src_rate -> dst_rate 的濾波器 (已快取時不做任何事)。"""
+    if int(src_rate) != int(dst_rate):
+        _design_polyphase_filter(*rational_ratio(src_rate, dst_rate))
+
+
+class StreamResampler:
+    """保存狀態的串流重採樣器；依序呼叫 process()，最後呼叫 flush() 取得尾端樣本。"""
+    def __init__(self, src_rate: int, dst_rate: int):
+        self.src_rate = int(src_rate)
+        self.dst_rate = int(dst_rate)
+        self.up, self.down = rational_ratio(src_rate, dst_rate)
+        self._h = _design_polyphase_filter(self.up, self.down)
+        self._taps = self._h.shape[1]
+        self._hist = np.zeros(self._taps - 1, dtype=np.float32)
+        self._tap_offsets = np.arange(self._taps, dtype=np.int64)
+        self._n_in = 0        # 已輸入的樣本數 (不含 flush 補的零)
+        self._n_fed = 0       # 實際送入濾波器的樣本數
+        self._m = 0           # 下一個要計算的輸出樣本序號 (含延遲)
+        self._n_out = 0       # 已回傳的輸出樣本數
+        # 線性相位濾波器的群延遲 (以輸出樣本計)，開頭需略過
+        self._skip = _filter_delay(self.up, self.down, self._taps)
+
+    def _run(self, x):
+        keep = self._taps - 1
+        buf = scratch.get("resampler_in", (keep + len(x),))
+        buf[:keep] = self._hist
+        buf[keep:] = x
+        base = self._n_fed - keep   # buf[0] 對應的輸入序號
+        self._n_fed += len(x)
+        m_end = (self._n_fed * self.up - 1) // self.down + 1
+        self._hist[:] = buf[len(buf) - keep:]
+        if m_end <= self._m:
+            return np.zeros(0, dtype=np.float32)
+        m = np.arange(self._m, m_end, dtype=np.int64)
+        self._m = m_end
+        t = m * self.down
+        shape = (len(m), self._taps)
+        idx = scratch.get("resampler_idx", shape, np.int64)
+        np.subtract((t // self.up - base)[:, None], self._tap_offsets[None, :], out=idx)
+        frames = np.take(buf, idx, out=scratch.get("resampler_frames", shape))
+        coeffs = np.take(self._h, t % self.up, axis=0, out=scratch.get("resampler_coeffs", shape))
+        y = np.einsum("nk,nk->n", frames, coeffs)
+        # 丟掉群延遲造成的前導樣本
+        if self._skip:
+            drop = min(self._skip, len(y))
+            self._skip -= drop
+            y = y[drop:]
+        return y
+
+    def process(self, samples):
+        x = np.asarray(samples, dtype=np.float32)
+        self._n_in += len(x)
+        if len(x) <= _MAX_CHUNK:
+            out = self._run(x)
+        else:
+            out = np.concatenate([self._run(x[i:i + _MAX_CHUNK]) for i in range(0, len(x), _MAX_CHUNK)])
+        self._n_out += len(out)
+        return out
+
+    def flush(self):
+        """送入足夠的零以取出延遲中的樣本，並將總長度修正為 輸入長度 * dst / src。"""
+        expected = int(round(self._n_in * self.up / self.down))
+        remaining = expected - self._n_out
+        if remaining <= 0:
+            return np.zeros(0, dtype=np.float32)
+        pad = np.zeros(self._taps, dtype=np.float32)
+        parts = []
+        produced = 0
+        while produced < remaining:
+            y = self._run(pad)
+            parts.append(y)
+            produced += len(y)
+        out = np.concatenate(parts)[:remaining]
+        self._n_out += len(out)
+        return out
+
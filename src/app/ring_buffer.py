@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+# 檔案: ring_buffer.py
+# 功用: 單一生產者/單一消費者的無鎖環形緩衝區 (float32)，供 output_stream.DeviceOutput 的 callback 串流使用。
+#      - 只依賴 numpy，與 PortAudio/sounddevice 無關。
+
+import numpy as np
+
+
+class RingBuffer:
+    """
+    單一生產者/單一消費者的環形緩衝區。
+    讀寫位置為單調遞增的整數，各自只由一方修改，因此不需要鎖。
+    """
+    def __init__(self, capacity: int, dtype=np.float32):
+        self._buf = np.zeros(int(capacity), dtype=dtype)
+        self.capacity = int(capacity)
+        self._read_pos = 0  # 只由消費者 (callback) 修改
+        self._write_pos = 0  # 只由生產者 (工作執行緒) 修改
+
+    def available(self) -> int:
+        """可讀取的樣本數。"""
+        return self._write_pos - self._read_pos
+
+    def free(self) -> int:
+        """可寫入的樣本數。"""
+        return self.capacity - self.available()
+
+    def write(self, data) -> int:
+        """寫入盡可能多的樣本，回傳實際寫入的數量。"""
+        n = min(len(data), self.free())
+        if n <= 0:
+            return 0
+        start = self._write_pos % self.capacity
+        first = min(n, self.capacity - start)
+        self._buf[start:start + first] = data[:first]
+        if n > first:
+            self._buf[:n - first] = data[first:n]
+        self._write_pos += n
+        return n
+
+    def read_into(self, out) -> int:
+        """將最多 len(out) 個樣本讀入 out，回傳實際讀取的數量。"""
+        n = min(len(out), self.available())
+        if n <= 0:
+            return 0
+        start = self._read_pos % self.capacity
+        first = min(n, self.capacity - start)
+        out[:first] = self._buf[start:start + first]
+        if n > first:
+            out[first:n] = self._buf[:n - first]
+        self._read_pos += n
+        return n
+
+    def discard(self):
+        """丟棄所有尚未讀取的樣本 (只能由消費者呼叫)。"""
+        self._read_pos = self._write_pos
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+# 檔案: sherpa_loader.py
+# 功用: 依 PREDEFINED_MODELS 的設定建立 Sherpa-ONNX 的 OfflineTts 實例。
+#      - 檢查模型檔案、取得 ASCII 暫存路徑、組合 OfflineTtsConfig。
+#      - 不依賴 AudioEngine，主程序與合成子程序 (synth_service.py) 共用同一份載入邏輯。
+
+import os
+from pathlib import Path
+
+from ..utils.deps import TTS_MODELS_DIR
+from .model_manager import PREDEFINED_MODELS
+from .model_staging import stage_model
+
+
+def build_sherpa_tts(model_id: str, num_threads: int, max_num_sentences: int, log=None):
+    """建立模型的 OfflineTts 實例，回傳 (tts, 估計的記憶體用量)；檔案不完整時回傳 None。"""
+    import sherpa_onnx
+    log = log or (lambda msg, level="INFO": None)
+    model_config = PREDEFINED_MODELS[model_id]
+    original_model_dir = Path(TTS_MODELS_DIR) / model_id
+
+    # 檢查所有模型檔案是否存在 (原始位置)
+    required_files_original = [original_model_dir / fname for fname in model_config["file_names"]]
+    for f in required_files_original:
+        if not f.exists():
+            log(f"模型 '{model_id}' 缺少以下檔案：{str(f)}", "WARNING")
+            log(f"模型 '{model_id}' 檔案不完整。", "WARNING")
+            return None
+
+    # Sherpa-ONNX 需要 ASCII 路徑；非 ASCII 時使用常駐的暫存鏡像 (硬連結/junction)，只在模型變動時重建
+    model_dir = stage_model(model_id, original_model_dir, model_config["file_names"], log=log)
+    log(f"DEBUG: 模型目錄: {model_dir}", "DEBUG")
+
+    # Dynamically find the .onnx file from model_config["file_names"]
+    onnx_filename = ""
+    for fname in model_config["file_names"]:
+        if fname.endswith(".onnx"):
+            onnx_filename = fname
+            break
+    if not onnx_filename:
+        log(f"模型 '{model_id}' 的配置中未找到 .onnx 檔案。", "ERROR")
+        return None
+    vits_model = str(model_dir / onnx_filename)
+
+    glados_data_dir = "" # Initialize data_dir for glados model
+    # Special handling for glados model, which requires data_dir
+    if model_id == "vits-piper-en_US-glados":
+        glados_data_dir = str(model_dir / "espeak-ng-data")
+
+    lexicon_file = model_dir / "lexicon.txt"
+    lexicon = str(lexicon_file) if lexicon_file.exists() else "" # Make lexicon optional
+    tokens = str(model_dir / "tokens.txt")
+
+    # 找到所有 rule FST 檔案
+    rules_files = [str(f) for f in model_dir.glob("*.fst")]
+
+    log(f"DEBUG: Sherpa-ONNX 載入參數 - model_id: {model_id}", "DEBUG")
+    log(f"DEBUG: vits_model: {vits_model}", "DEBUG")
+    log(f"DEBUG: lexicon: {lexicon}", "DEBUG")
+    log(f"DEBUG: tokens: {tokens}", "DEBUG")
+    log(f"DEBUG: glados_data_dir: {glados_data_dir}", "DEBUG")
+    log(f"DEBUG: rules_files: {rules_files}", "DEBUG")
+    log(f"DEBUG: num_threads: {num_threads}, max_num_sentences: {max_num_sentences}", "DEBUG")
+
+    tts_config = sherpa_onnx.OfflineTtsConfig(
+        model=sherpa_onnx.OfflineTtsModelConfig(
+            vits=sherpa_onnx.OfflineTtsVitsModelConfig(
+                model=vits_model,
+                lexicon=lexicon,
+                tokens=tokens,
+                data_dir=glados_data_dir # Pass data_dir for glados
+            ),
+            num_threads=num_threads,
+            provider="cpu",
+        ),
+        rule_fsts=','.join(rules_files) if rules_files else "",
+        max_num_sentences=max_num_sentences,
+    )
+    log(f"DEBUG: tts_config constructed. Attempting to instantiate sherpa_onnx.OfflineTts...", "DEBUG")
+    tts = sherpa_onnx.OfflineTts(tts_config)
+    log(f"DEBUG: sherpa_onnx.OfflineTts instantiated successfully.", "DEBUG")
+
+    # 以模型、詞典與 FST 檔案的大小估計常駐記憶體用量 (espeak-ng-data 等目錄不計)
+    est_bytes = sum(os.path.getsize(f) for f in [vits_model, lexicon, tokens, *rules_files] if f and os.path.isfile(f))
+    return tts, est_bytes
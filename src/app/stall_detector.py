@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+# 檔案: stall_detector.py
+# 功用: 偵測 Qt 事件迴圈 (GUI 執行緒) 被阻塞的情況，並記錄當時主執行緒正在執行的 Python 堆疊。
+#      - 心跳: GUI 執行緒上的 QTimer 每隔 interval 更新一次時間戳記，觸發延遲即為事件迴圈的延遲 (lag)。
+#      - 監看執行緒: 心跳停止超過門檻時以 sys._current_frames() 擷取主執行緒的堆疊 (凍結越久會再擷取，最多數次)；
+#        心跳恢復後記錄這次凍結的持續時間與堆疊 (DEBUG) 並計入指標 (見 metrics.py)。
+#      - 日誌面板只定期顯示摘要 (這段期間的凍結次數與最主要的呼叫位置)，對話框、重新填入下拉選單等
+#        正常的短暫凍結不會洗版。
+#      - hotspots() 依呼叫位置彙整累計凍結時間，用於找出需要移出 GUI 執行緒的處理。
+
+import sys
+import time
+import threading
+import traceback
+from collections import deque, defaultdict
+
+from PyQt6.QtCore import QTimer, Qt
+
+from . import metrics
+
+DEFAULT_THRESHOLD_MS = 50
+DEFAULT_HEARTBEAT_MS = 20
+MAX_STACKS_PER_STALL = 4  # 同一次凍結最多擷取的堆疊數 (門檻的 1、2、4、8 倍時)
+MAX_STACK_DEPTH = 40
+DEFAULT_RECENT_STALLS = 50
+DEFAULT_SUMMARY_INTERVAL_SEC = 600.0
+SUMMARY_TOP_LOCATIONS = 3
+
+ui_stalls = metrics.registry.counter("ui_stalls_total", "GUI 事件迴圈凍結超過門檻的次數")
+ui_stall_seconds = metrics.registry.counter("ui_stall_seconds_total", "GUI 事件迴圈凍結的累計時間 (秒)")
+
+
+class Stall:
+    def __init__(self, started):
+        self.started = started  # perf_counter()
+        self.wall_time = time.time()
+        self.duration = None
+        self.stacks = []  # [(凍結開始後的秒數, [FrameSummary, ...]), ...]
+
+    def location(self) -> str:
+        """最先擷取到的堆疊中，最內層屬於本專案的呼叫位置 (找不到時為最內層)。"""
+        if not self.stacks:
+            return "?"
+        frames = self.stacks[0][1]
+        for frame in reversed(frames):
+            path = frame.filename.replace("\\", "/")
+            if "/src/" in path:
+                return f"{path[path.rfind('/src/') + 1:]}:{frame.lineno} {frame.name}"
+        top = frames[-1]
+        return f"{top.filename}:{top.lineno} {top.name}"
+
+    def to_dict(self) -> dict:
+        return {
+            "time": self.wall_time,
+            "duration_ms": round((self.duration or 0.0) * 1000, 1),
+            "location": self.location(),
+            "stacks": [{"at_ms": round(at * 1000, 1), "stack": traceback.format_list(frames)}
+                       for at, frames in self.stacks],
+        }
+
+
+class StallDetector:
+    def __init__(self, log, threshold_ms=DEFAULT_THRESHOLD_MS, heartbeat_ms=DEFAULT_HEARTBEAT_MS,
+                 recent=DEFAULT_RECENT_STALLS, summary_interval=DEFAULT_SUMMARY_INTERVAL_SEC):
+        """必須在 GUI 執行緒上建立與 start()。"""
+        self.log = log
+        self.threshold = threshold_ms / 1000.0
+        self.heartbeat = heartbeat_ms / 1000.0
+        self._main_ident = threading.get_ident()
+        self._timer = None
+        self._watchdog = None
+        self._running = False
+        self._last_beat = time.perf_counter()  # 只由 GUI 執行緒寫入
+        self._current = None  # 監看執行緒偵測到、尚未結束的凍結
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=int(recent))
+        self._hotspots = defaultdict(lambda: [0, 0.0])  # 呼叫位置 -> [次數, 累計秒數]
+        self._window = defaultdict(lambda: [0, 0.0])  # 上次摘要之後的凍結，格式同 _hotspots
+        self.summary_interval = float(summary_interval)
+        self._last_summary = time.perf_counter()
+        self.max_lag = 0.0
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._last_beat = time.perf_counter()
+        self._timer = QTimer()
+        self._timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self._timer.setInterval(max(1, int(self.heartbeat * 1000)))
+        self._timer.timeout.connect(self._beat)
+        self._timer.start()
+        self._watchdog = threading.Thread(target=self._watch, name="ui-stall-watchdog", daemon=True)
+        self._watchdog.start()
+
+    def stop(self):
+        self._running = False
+        if self._timer is not None:
+            self._timer.stop()
+            self._timer = None
+
+    # ---------- GUI 執行緒 ----------
+    def _beat(self):
+        now = time.perf_counter()
+        lag = now - self._last_beat - self.heartbeat
+        self._last_beat = now
+        self.max_lag = max(self.max_lag, lag)
+        with self._lock:
+            stall, self._current = self._current, None
+        if self._window and now - self._last_summary >= self.summary_interval:
+            self._log_summary(now)
+        if lag < self.threshold:
+            return
+        if stall is None:
+            # 監看執行緒還來不及擷取堆疊 (凍結剛好在兩次檢查之間結束)，仍記錄持續時間
+            stall = Stall(now - lag)
+        stall.duration = lag
+        self._record(stall)
+
+    def _record(self, stall):
+        self._recent.append(stall)
+        location = stall.location()
+        for spots in (self._hotspots, self._window):
+            spot = spots[location]
+            spot[0] += 1
+            spot[1] += stall.duration
+        ui_stalls.inc()
+        ui_stall_seconds.inc(stall.duration)
+        self.log(f"DEBUG: 介面凍結 {stall.duration * 1000:.0f} ms: {location}", "DEBUG")
+        if stall.stacks:
+            self.log("DEBUG: 凍結時的主執行緒堆疊:\n" + "".join(traceback.format_list(stall.stacks[0][1])), "DEBUG")
+
+    def _log_summary(self, now):
+        count = sum(c for c, _ in self._window.values())
+        total = sum(t for _, t in self._window.values())
+        top = sorted(self._window.items(), key=lambda item: item[1][1], reverse=True)[:SUMMARY_TOP_LOCATIONS]
+        places = "；".join(f"{loc} ({c} 次，{t * 1000:.0f} ms)" for loc, (c, t) in top)
+        self.log(f"介面凍結摘要: 最近 {max(1, round((now - self._last_summary) / 60))} 分鐘內 {count} 次，累計 {total * 1000:.0f} ms。"
+                 f"主要位置: {places}")
+        self._window.clear()
+        self._last_summary = now
+
+    # ---------- 監看執行緒 ----------
+    def _watch(self):
+        poll = max(0.005, min(self.heartbeat, self.threshold) / 2)
+        while self._running:
+            time.sleep(poll)
+            since_beat = time.perf_counter() - self._last_beat - self.heartbeat
+            if since_beat < self.threshold:
+                continue
+            with self._lock:
+                stall = self._current
+                if stall is None:
+                    stall = self._current = Stall(self._last_beat + self.heartbeat)
+            # 在門檻的 1、2、4、8 倍時各擷取一次，顯示長時間凍結中的進展
+            if len(stall.stacks) < MAX_STACKS_PER_STALL and since_beat >= self.threshold * (2 ** len(stall.stacks)):
+                frames = self._capture_main_stack()
+                if frames:
+                    stall.stacks.append((since_beat, frames))
+
+    def _capture_main_stack(self):
+        frame = sys._current_frames().get(self._main_ident)
+        if frame is None:
+            return None
+        return traceback.extract_stack(frame, limit=MAX_STACK_DEPTH)
+
+    # ---------- 查詢 ----------
+    def recent(self, count=None) -> list:
+        stalls = list(self._recent)
+        if count is not None:
+            stalls = stalls[-count:]
+        return [s.to_dict() for s in stalls]
+
+    def hotspots(self) -> list:
+        """[(呼叫位置, 次數, 累計毫秒)]，依累計凍結時間排序。"""
+        spots = [(loc, count, round(total * 1000, 1)) for loc, (count, total) in list(self._hotspots.items())]
+        return sorted(spots, key=lambda s: s[2], reverse=True)
+
+    def collect_metrics(self):
+        return [metrics.Sample("ui_event_loop_max_lag_ms", round(self.max_lag * 1000, 1), "GUI 事件迴圈的最大延遲")]
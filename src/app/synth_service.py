@@ -0,0 +1,403 @@
+# -*- coding: utf-8 -*-
+# 檔案: synth_service.py
+# 功用: 程序外的合成服務，讓 Sherpa-ONNX 與 pyttsx3 (SAPI) 在獨立的子程序中執行，不佔用主程序的 CPU 與 GIL。
+#      - 每個子程序各自載入引擎 (Sherpa 模型依 (model_id, num_threads, max_num_sentences) 快取)，一次處理一筆請求。
+#      - 合成結果 (float32 PCM) 寫入子程序持有的共享記憶體，主程序只收到名稱與長度後直接複製，不經過 pickle。
+#      - 監控執行緒定期 ping 閒置的子程序；無回應或已結束的子程序會被終止並重新啟動。
+#      - 請求失敗 (子程序當掉、逾時) 時拋出 SynthesisServiceError，由呼叫端改回程序內合成。
+#      - 呼叫端的 cancelled 事件被設定時送出中止訊息，子程序的接收執行緒收到後讓進行中的 Sherpa 合成提前結束
+#        (pyttsx3 無法中止，結果直接丟棄)；被中斷的請求回傳 None。
+#      注意: 子程序以 spawn 啟動，只匯入本模組與 sherpa_loader，不載入 PyQt 與 AudioEngine。
+
+import os
+import sys
+import time
+import queue
+import itertools
+import threading
+import multiprocessing
+from collections import OrderedDict
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .pcm import from_engine_samples
+
+MAX_SERVICE_WORKERS = 4
+HEALTH_CHECK_INTERVAL_SEC = 2.0
+PING_TIMEOUT_SEC = 5.0
+DEFAULT_REQUEST_TIMEOUT_SEC = 60.0
+# 子程序同時保留的 Sherpa 模型數量 (切換模型後舊模型很快會被釋放)
+WORKER_MAX_MODELS = 2
+# 等待回覆時檢查呼叫端是否已中斷的間隔
+CANCEL_POLL_SEC = 0.02
+
+
+class SynthesisServiceError(RuntimeError):
+    pass
+
+
+# ---------- 子程序端 ----------
+def _lower_process_priority():
+    """子程序以較低的優先權執行，重度合成時 UI 與熱鍵仍能即時回應。"""
+    try:
+        if os.name == 'nt':
+            import ctypes
+            BELOW_NORMAL_PRIORITY_CLASS = 0x4000
+            kernel32 = ctypes.windll.kernel32
+            kernel32.SetPriorityClass(kernel32.GetCurrentProcess(), BELOW_NORMAL_PRIORITY_CLASS)
+        else:
+            os.nice(5)
+    except Exception:
+        pass
+
+
+class _Worker:
+    """子程序內的合成狀態。"""
+    def __init__(self, conn):
+        self.conn = conn
+        self.models = OrderedDict()  # (model_id, num_threads, max_num_sentences) -> OfflineTts
+        self.shm = None
+        self.pyttsx3 = None  # 常駐的 pyttsx3 合成執行緒 (第一次請求時建立)
+        self.inbox = queue.Queue()
+        self._abort_id = None  # 主程序要求中止的請求 ID (由接收執行緒設定)
+
+    def _read_loop(self):
+        """在另一個執行緒接收請求；中止訊息直接設定旗標，讓正在合成的請求可以提前結束。"""
+        while True:
+            try:
+                msg = self.conn.recv()
+            except (EOFError, OSError):
+                self.inbox.put(None)
+                return
+            if msg.get("op") == "abort":
+                self._abort_id = msg.get("target")
+                continue
+            self.inbox.put(msg)
+            if msg.get("op") == "stop":
+                return
+
+    def _aborted(self, msg):
+        return self._abort_id is not None and self._abort_id == msg.get("id")
+
+    def _sherpa_model(self, model_id, num_threads, max_num_sentences):
+        from .sherpa_loader import build_sherpa_tts
+        key = (model_id, int(num_threads), int(max_num_sentences))
+        tts = self.models.get(key)
+        if tts is None:
+            built = build_sherpa_tts(model_id, key[1], key[2])
+            if built is None:
+                raise RuntimeError(f"模型 '{model_id}' 檔案不完整")
+            tts = built[0]
+            self.models[key] = tts
+            while len(self.models) > WORKER_MAX_MODELS:
+                self.models.popitem(last=False)
+        self.models.move_to_end(key)
+        return tts
+
+    def _synth_sherpa(self, msg):
+        tts = self._sherpa_model(msg["model_id"], msg["num_threads"], msg["max_num_sentences"])
+
+        def on_progress(samples, progress):
+            return 0 if self._aborted(msg) else 1
+
+        try:
+            audio = tts.generate(msg["text"], sid=msg["sid"], speed=msg["speed"], callback=on_progress)
+        except TypeError:
+            # 舊版 sherpa-onnx 的 generate() 不支援 callback
+            audio = tts.generate(msg["text"], sid=msg["sid"], speed=msg["speed"])
+        return from_engine_samples(audio.samples), audio.sample_rate
+
+    def _synth_pyttsx3(self, msg):
+        if self.pyttsx3 is None:
+            from .pyttsx3_engine import Pyttsx3Renderer
+            self.pyttsx3 = Pyttsx3Renderer()
+        return self.pyttsx3.render(msg["text"], msg["rate"], msg["volume"], msg.get("voice_id"))
+
+    def _write_pcm(self, samples):
+        """把 samples 寫入共享記憶體 (不夠大時以 1.5 倍重新配置)，回傳共享記憶體名稱。"""
+        nbytes = samples.nbytes
+        if self.shm is None or self.shm.size < nbytes:
+            old, self.shm = self.shm, shared_memory.SharedMemory(create=True, size=max(int(nbytes * 1.5), 1 << 20))
+            if old is not None:
+                old.close()
+                old.unlink()
+        np.ndarray(samples.shape, dtype=np.float32, buffer=self.shm.buf)[:] = samples
+        return self.shm.name
+
+    def run(self):
+        threading.Thread(target=self._read_loop, name="synth-proc-reader", daemon=True).start()
+        while True:
+            msg = self.inbox.get()
+            if msg is None:
+                break
+            op = msg.get("op")
+            if op == "stop":
+                break
+            reply = {"id": msg.get("id"), "ok": True}
+            try:
+                if op == "preload":
+                    self._sherpa_model(msg["model_id"], msg["num_threads"], msg["max_num_sentences"])
+                elif op in ("sherpa", "pyttsx3"):
+                    samples, sample_rate = (None, None) if self._aborted(msg) else \
+                        (self._synth_sherpa(msg) if op == "sherpa" else self._synth_pyttsx3(msg))
+                    if self._aborted(msg):
+                        reply = {"id": msg.get("id"), "ok": False, "aborted": True}
+                    else:
+                        reply.update(shm=self._write_pcm(samples), n=len(samples), sr=int(sample_rate))
+                elif op != "ping":
+                    raise ValueError(f"未知的請求: {op}")
+            except Exception as e:
+                reply = {"id": msg.get("id"), "ok": False, "error": f"{type(e).__name__}: {e}"}
+            try:
+                self.conn.send(reply)
+            except (EOFError, OSError):
+                break
+        if self.pyttsx3 is not None:
+            self.pyttsx3.close()
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+
+
+def _worker_main(conn):
+    _lower_process_priority()
+    _Worker(conn).run()
+
+
+# ---------- 主程序端 ----------
+def _attach_shm(name):
+    shm = shared_memory.SharedMemory(name=name)
+    if sys.version_info < (3, 13) and os.name != 'nt':
+        # 共享記憶體由子程序負責釋放；POSIX 上附加時會被登記到 resource_tracker，需取消登記以免被重複釋放
+        try:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+    return shm
+
+
+class _WorkerHandle:
+    def __init__(self, ctx, index):
+        self.index = index
+        parent_conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child_conn,),
+                                   name=f"tts-synth-proc-{index}", daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.conn = parent_conn
+        self.lock = threading.Lock()  # 一次只送一筆請求 (含健康檢查)
+        self.dead = False
+        self._shm = None
+        self._ids = itertools.count()
+
+    def call(self, msg, timeout, cancelled=None):
+        """送出請求並等待回覆；等待期間 cancelled 被設定時通知子程序中止這筆請求。"""
+        msg = dict(msg, id=next(self._ids))
+        try:
+            self.conn.send(msg)
+            deadline = time.monotonic() + timeout
+            abort_sent = False
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise SynthesisServiceError(f"子程序 {self.index} 在 {timeout:.0f} 秒內沒有回應")
+                if not self.conn.poll(min(remaining, CANCEL_POLL_SEC) if cancelled is not None else remaining):
+                    if cancelled is not None and cancelled.is_set() and not abort_sent:
+                        self.conn.send({"op": "abort", "target": msg["id"]})
+                        abort_sent = True
+                    continue
+                reply = self.conn.recv()
+                if reply.get("id") == msg["id"]:
+                    return reply
+                # 之前逾時的請求遲到的回覆，略過
+        except (EOFError, OSError, BrokenPipeError) as e:
+            raise SynthesisServiceError(f"子程序 {self.index} 已中斷: {e}")
+
+    def read_pcm(self, reply):
+        """從子程序的共享記憶體複製出 samples (子程序在下一筆請求前不會覆寫)。"""
+        if self._shm is None or self._shm.name.lstrip("/") != reply["shm"].lstrip("/"):
+            if self._shm is not None:
+                self._shm.close()
+            self._shm = _attach_shm(reply["shm"])
+        return np.ndarray((reply["n"],), dtype=np.float32, buffer=self._shm.buf).copy()
+
+    def kill(self):
+        self.dead = True
+        if self._shm is not None:
+            try:
+                self._shm.close()
+            except Exception:
+                pass
+            self._shm = None
+        try:
+            self.conn.close()
+        except Exception:
+            pass
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(timeout=1.0)
+
+
+class SynthesisService:
+    def __init__(self, workers, log=None):
+        self.log = log or (lambda msg, level="INFO": None)
+        self.size = max(1, min(MAX_SERVICE_WORKERS, int(workers)))
+        self._ctx = multiprocessing.get_context("spawn")  # 不 fork 帶有 Qt 與音訊執行緒的主程序
+        self._workers = []
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._preload = None  # 最近要求預先載入的 (model_id, num_threads, max_num_sentences)，重啟子程序後補載
+        self._closed = False
+        self._stop_event = threading.Event()
+        self._monitor = None
+        self.restarts = 0
+
+    def start(self):
+        for i in range(self.size):
+            handle = _WorkerHandle(self._ctx, i)
+            self._workers.append(handle)
+            self._idle.put(handle)
+        self._monitor = threading.Thread(target=self._monitor_loop, name="synth-service-monitor", daemon=True)
+        self._monitor.start()
+        self.log(f"已啟動 {self.size} 個合成子程序。", "DEBUG")
+
+    def close(self):
+        self._closed = True
+        self._stop_event.set()
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for handle in workers:
+            try:
+                handle.conn.send({"op": "stop"})
+            except Exception:
+                pass
+        for handle in workers:
+            handle.process.join(timeout=1.0)
+            handle.kill()
+
+    # ---------- 請求 ----------
+    def _acquire(self, timeout):
+        deadline = time.monotonic() + timeout
+        while not self._closed:
+            try:
+                handle = self._idle.get(timeout=max(0.01, deadline - time.monotonic()))
+            except queue.Empty:
+                raise SynthesisServiceError("沒有可用的合成子程序")
+            if not handle.dead:
+                handle.lock.acquire()
+                if not handle.dead:
+                    return handle
+                handle.lock.release()
+        raise SynthesisServiceError("合成服務已關閉")
+
+    def _release(self, handle):
+        handle.lock.release()
+        if not handle.dead:
+            self._idle.put(handle)
+
+    def _request(self, msg, timeout, cancelled=None):
+        """回傳 (samples, sample_rate)；沒有音訊的請求或被中斷的請求回傳 None。"""
+        if cancelled is not None and cancelled.is_set():
+            return None
+        handle = self._acquire(timeout)
+        try:
+            reply = handle.call(msg, timeout, cancelled)
+            if reply.get("aborted") or (cancelled is not None and cancelled.is_set()):
+                return None  # 被中斷: 丟棄結果
+            if not reply.get("ok"):
+                raise RuntimeError(reply.get("error", "未知的錯誤"))
+            if "shm" not in reply:
+                return None
+            return handle.read_pcm(reply), reply["sr"]
+        except SynthesisServiceError:
+            # 子程序已中斷或卡住: 結束它並重新啟動，這筆請求交由呼叫端改回程序內合成
+            self._respawn(handle)
+            raise
+        finally:
+            self._release(handle)
+
+    def synthesize_sherpa(self, model_id, text, sid, speed, num_threads, max_num_sentences,
+                          timeout=DEFAULT_REQUEST_TIMEOUT_SEC, cancelled=None):
+        return self._request({"op": "sherpa", "model_id": model_id, "text": text, "sid": int(sid),
+                              "speed": float(speed), "num_threads": int(num_threads),
+                              "max_num_sentences": int(max_num_sentences)}, timeout, cancelled)
+
+    def synthesize_pyttsx3(self, text, rate, volume, voice_id=None, timeout=DEFAULT_REQUEST_TIMEOUT_SEC,
+                           cancelled=None):
+        return self._request({"op": "pyttsx3", "text": text, "rate": rate, "volume": volume,
+                              "voice_id": voice_id}, timeout, cancelled)
+
+    def preload(self, model_id, num_threads, max_num_sentences):
+        """在背景讓每個子程序載入模型 (之後的請求不必等待載入)。"""
+        self._preload = (model_id, int(num_threads), int(max_num_sentences))
+        with self._lock:
+            workers = list(self._workers)
+        for handle in workers:
+            threading.Thread(target=self._preload_worker, args=(handle, self._preload),
+                             name="synth-service-preload", daemon=True).start()
+
+    def _preload_worker(self, handle, params):
+        model_id, num_threads, max_num_sentences = params
+        with handle.lock:
+            if handle.dead:
+                return
+            try:
+                reply = handle.call({"op": "preload", "model_id": model_id, "num_threads": num_threads,
+                                     "max_num_sentences": max_num_sentences}, DEFAULT_REQUEST_TIMEOUT_SEC)
+                if not reply.get("ok"):
+                    self.log(f"合成子程序載入模型 '{model_id}' 失敗: {reply.get('error')}", "WARN")
+            except SynthesisServiceError as e:
+                self.log(f"合成子程序載入模型失敗: {e}", "WARN")
+                self._respawn(handle)
+
+    # ---------- 健康檢查 ----------
+    def _respawn(self, handle):
+        handle.kill()
+        if self._closed:
+            return
+        with self._lock:
+            if handle not in self._workers:
+                return
+            replacement = _WorkerHandle(self._ctx, handle.index)
+            self._workers[self._workers.index(handle)] = replacement
+            self.restarts += 1
+        self.log(f"合成子程序 {handle.index} 無回應，已重新啟動 (累計 {self.restarts} 次)。", "WARN")
+        self._idle.put(replacement)
+        if self._preload:
+            threading.Thread(target=self._preload_worker, args=(replacement, self._preload),
+                             name="synth-service-preload", daemon=True).start()
+
+    def _check(self, handle):
+        # 正在處理請求的子程序由請求本身的逾時與中斷偵測 (管線 EOF) 負責，這裡只檢查閒置的子程序
+        if not handle.lock.acquire(blocking=False):
+            return
+        try:
+            if handle.dead:
+                return
+            healthy = handle.process.is_alive()
+            if healthy:
+                try:
+                    healthy = handle.call({"op": "ping"}, PING_TIMEOUT_SEC).get("ok", False)
+                except SynthesisServiceError:
+                    healthy = False
+            if not healthy:
+                self._respawn(handle)
+        finally:
+            handle.lock.release()
+
+    def _monitor_loop(self):
+        while not self._stop_event.wait(HEALTH_CHECK_INTERVAL_SEC):
+            with self._lock:
+                workers = list(self._workers)
+            for handle in workers:
+                try:
+                    self._check(handle)
+                except Exception as e:
+                    self.log(f"合成子程序健康檢查失敗: {e}", "WARN")
+
+    def stats(self) -> dict:
+        with self._lock:
+            alive = sum(1 for h in self._workers if h.process.is_alive())
+        return {"workers": self.size, "alive": alive, "restarts": self.restarts}
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+# 檔案: text_segmenter.py
+# 功用: 將輸入文字切分為適合逐句合成的片段，讓播放可以在整段文字合成完成前開始。
+#      - 依中日文全形標點 (。！？；…) 與英文句末標點 (. ! ? ;) 分句。
+#      - 過長的句子會在逗號等子句標點處再切分，限制單一片段的合成時間；沒有任何斷點時直接在長度上限處切開。
+#      - 第一個片段可以額外限制長度 (自適應首段)，以縮短首個聲音輸出的等待時間。
+
+_CJK_TERMINATORS = "。！？；…\n"
+_LATIN_TERMINATORS = ".!?;"
+_CLOSERS = "」』”’）)]\"'"
+_CLAUSE_BREAKS = "，、,：:—"
+# 句點後接空白也不斷句的常見英文縮寫 (小寫、不含最後的句點)
+_ABBREVIATIONS = frozenset({
+    "mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "mt", "vs", "fig",
+    "e.g", "i.e", "cf", "approx", "dept",
+})
+
+DEFAULT_MAX_SEGMENT_CHARS = 120
+
+
+def split_sentences(text: str):
+    """依句末標點將文字切分為句子列表，保留標點於句尾。"""
+    sentences = []
+    buf = []
+    i, n = 0, len(text)
+    while i < n:
+        ch = text[i]
+        buf.append(ch)
+        i += 1
+        is_cjk_end = ch in _CJK_TERMINATORS
+        is_latin_end = ch in _LATIN_TERMINATORS
+        if not (is_cjk_end or is_latin_end):
+            continue
+        # 吸收連續的標點與右引號/括號，例如 "好！！」" 或 'done?!"'
+        while i < n and (text[i] in _CJK_TERMINATORS or text[i] in _LATIN_TERMINATORS or text[i] in _CLOSERS):
+            buf.append(text[i])
+            i += 1
+        # 英文句點需要後接空白或結尾才算斷句，避免切開 "3.14"；"e.g. this"、"Mr. Smith" 等縮寫也不斷句
+        if is_latin_end and not is_cjk_end and i < n and not text[i].isspace():
+            continue
+        if ch == "." and i < n and _is_abbreviation(buf):
+            continue
+        sentences.append("".join(buf))
+        buf = []
+    if buf:
+        sentences.append("".join(buf))
+
+    result = []
+    for s in sentences:
+        s = s.strip()
+        if not s:
+            continue
+        # 只有標點的片段併入前一句，避免合成空白音訊
+        if result and not any(c.isalnum() for c in s):
+            result[-1] += s
+        else:
+            result.append(s)
+    return result
+
+
+def _is_abbreviation(buf) -> bool:
+    """buf 以句點結尾，判斷句點前的單字是否為縮寫或單一字母的名字縮寫 (例如 "J.")。"""
+    j = len(buf) - 1
+    while j > 0 and (buf[j - 1].isalpha() or buf[j - 1] == ".") and buf[j - 1].isascii():
+        j -= 1
+    word = "".join(buf[j:-1])
+    if not word:
+        return False
+    return word.lower() in _ABBREVIATIONS or (len(word) == 1 and word.isupper())
+
+
+def _split_at_break(sentence: str, max_chars: int, allow_overflow=False, hard_cut=False):
+    """
+    在 max_chars 以內最後一個子句標點 (或英文空白) 處切開句子，找不到時回傳 None。
+    allow_overflow 為 True 時，若上限內沒有斷點，改用上限之後的第一個子句標點。
+    hard_cut 為 True 時，若上限內沒有斷點，改在上限內最後一個空白處切開，連空白都沒有 (中日文) 時直接在上限處切開。
+    """
+    if len(sentence) <= max_chars:
+        return None
+    window = sentence[:max_chars]
+    cut = max(window.rfind(c) for c in _CLAUSE_BREAKS)
+    if cut <= 0:
+        # 英文沒有子句標點時退而求其次在空白處切開，但避免切出過短的片段
+        space = window.rfind(" ")
+        cut = space if space >= max_chars // 2 else -1
+    if cut <= 0 and allow_overflow:
+        found = [pos for pos in (sentence.find(c, max_chars) for c in _CLAUSE_BREAKS) if pos > 0]
+        cut = min(found) if found else -1
+    if cut <= 0 and hard_cut:
+        space = window.rfind(" ")
+        cut = space if space > 0 else max_chars - 1
+    if cut <= 0:
+        return None
+    head, tail = sentence[:cut + 1].strip(), sentence[cut + 1:].strip()
+    if not head or not tail:
+        return None
+    return head, tail
+
+
+def segment_text(text: str, first_chunk_chars=None, max_chars=DEFAULT_MAX_SEGMENT_CHARS):
+    """
+    將文字切分為合成片段。
+    - max_chars: 單一片段的長度上限，超過時在子句標點處切開 (沒有子句標點時強制切開)。
+    - first_chunk_chars: 第一個片段的長度上限 (通常小於 max_chars)，為 None 時不另外限制。
+    """
+    segments = []
+    for sentence in split_sentences(text):
+        while True:
+            parts = _split_at_break(sentence, max_chars, hard_cut=True)
+            if parts is None:
+                segments.append(sentence)
+                break
+            segments.append(parts[0])
+            sentence = parts[1]
+
+    if first_chunk_chars and segments:
+        parts = _split_at_break(segments[0], first_chunk_chars, allow_overflow=True)
+        if parts is not None:
+            segments[0:1] = list(parts)
+    return segments
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+# 檔案: tracing.py
+# 功用: 跨執行緒的追蹤 (trace)，從快捷鍵觸發一路記錄到聲音送進輸出設備，可匯出為 Chrome trace-event JSON
+#      (在 chrome://tracing 或 https://ui.perfetto.dev 開啟)。
+#      - 每次快捷鍵觸發以 new_trace() 取得一個關聯 ID (trace_id)，隨信號、輸入框與播放請求一路傳遞。
+#      - span()/complete(): 在同一執行緒內的區段 (例如顯示輸入框、合成)，匯出為該執行緒上的完整事件 ("X")。
+#      - begin()/end(): 跨執行緒的區段 (例如 Qt 信號排隊、等待合成執行緒取出)，
+#        匯出為以 trace_id 分組的非同步事件 ("b"/"e")，在檢視器中同一 ID 的事件會排在同一條軌道上。
+#      - 預設停用；停用時所有方法都直接返回，不影響效能。
+
+import os
+import json
+import time
+import itertools
+import threading
+import contextlib
+from collections import deque
+
+DEFAULT_MAX_EVENTS = 20000
+
+
+def _now_us():
+    return time.perf_counter() * 1e6
+
+
+class Tracer:
+    def __init__(self, max_events=DEFAULT_MAX_EVENTS):
+        self.enabled = False
+        self._events = deque(maxlen=int(max_events))  # deque.append 為原子操作，各執行緒可直接寫入
+        self._ids = itertools.count(1)
+        self._thread_names = {}
+        self._pid = os.getpid()
+
+    def configure(self, enabled=None, max_events=None):
+        if enabled is not None:
+            self.enabled = bool(enabled)
+        if max_events is not None:
+            self._events = deque(self._events, maxlen=int(max_events))
+
+    # ---------- 記錄 ----------
+    def new_trace(self, name, ts=None, **args):
+        """開始一次新的追蹤 (例如一次快捷鍵觸發)，回傳 trace_id；停用時回傳 None。ts 為 perf_counter() 秒數。"""
+        if not self.enabled:
+            return None
+        trace_id = next(self._ids)
+        self.instant(name, trace_id, ts=ts, **args)
+        return trace_id
+
+    def instant(self, name, trace_id=None, ts=None, **args):
+        if not self.enabled:
+            return
+        self._add("i", name, trace_id, ts * 1e6 if ts is not None else _now_us(), args, s="t")
+
+    def begin(self, name, trace_id, ts=None, **args):
+        """跨執行緒區段的開始，由 end() 以相同的 name 與 trace_id 結束 (可在另一個執行緒呼叫)。"""
+        if not self.enabled or trace_id is None:
+            return
+        self._add("b", name, trace_id, ts * 1e6 if ts is not None else _now_us(), args)
+
+    def end(self, name, trace_id, ts=None, **args):
+        if not self.enabled or trace_id is None:
+            return
+        self._add("e", name, trace_id, ts * 1e6 if ts is not None else _now_us(), args)
+
+    @contextlib.contextmanager
+    def span(self, name, trace_id=None, **args):
+        """同一執行緒內的區段。"""
+        if not self.enabled:
+            yield
+            return
+        start = _now_us()
+        try:
+            yield
+        finally:
+            self._add("X", name, trace_id, start, args, dur=_now_us() - start)
+
+    def complete(self, name, trace_id, start, **args):
+        """記錄從 start (perf_counter() 秒數) 到現在、在目前執行緒上的區段。"""
+        if not self.enabled:
+            return
+        start_us = start * 1e6
+        self._add("X", name, trace_id, start_us, args, dur=_now_us() - start_us)
+
+    def _add(self, ph, name, trace_id, ts, args, **extra):
+        thread = threading.current_thread()
+        tid = thread.ident
+        if tid not in self._thread_names:
+            self._thread_names[tid] = thread.name
+        event = {"ph": ph, "name": name, "cat": "tts", "ts": round(ts, 1), "pid": self._pid, "tid": tid}
+        if trace_id is not None:
+            args = dict(args, trace_id=trace_id)
+            if ph in ("b", "e"):
+                event["id"] = trace_id
+        if args:
+            event["args"] = args
+        if "dur" in extra:
+            extra["dur"] = round(extra["dur"], 1)
+        event.update(extra)
+        self._events.append(event)
+
+    # ---------- 匯出 ----------
+    def __len__(self):
+        return len(self._events)
+
+    def clear(self):
+        self._events.clear()
+
+    def events(self) -> list:
+        """目前保留的事件，加上執行緒名稱的中繼資料。"""
+        events = list(self._events)
+        meta = [{"ph": "M", "name": "thread_name", "pid": self._pid, "tid": tid, "args": {"name": name}}
+                for tid, name in list(self._thread_names.items())]
+        meta.append({"ph": "M", "name": "process_name", "pid": self._pid, "args": {"name": "TTS"}})
+        return meta + events
+
+    def export_chrome_trace(self, path) -> int:
+        """寫入 Chrome trace-event JSON 檔，回傳事件數。"""
+        events = self.events()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        return len(events)
+
+
+# 全程式共用的追蹤器
+tracer = Tracer()
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+# 檔案: tuning.py
+# 功用: Sherpa-ONNX 執行參數 (num_threads、max_num_sentences) 的自動調校。
+#      - 以固定的參考文字，對每個模型測試不同的執行緒數與句子批次大小，取即時率 (RTF) 最低的組合。
+#      - 結果依 (模型, 機器指紋) 存放在 config.json 旁的 tuning_profiles.json，載入模型時自動套用。
+#      - 預設從設定視窗手動測試；啟用 auto_tune_models 時，模型第一次在本機使用後由 audio_engine 在播放閒置時自動測試。
+#      - 機器指紋由 CPU 架構/型號、邏輯核心數與 sherpa-onnx 版本組成，換機器或升級後會重新測試。
+
+import os
+import json
+import time
+import hashlib
+import platform
+import threading
+
+from ..utils.deps import TUNING_FILE
+
+DEFAULT_NUM_THREADS = 2
+DEFAULT_MAX_NUM_SENTENCES = 1
+SENTENCE_BATCH_CANDIDATES = (1, 2, 4)
+BENCHMARK_REPEATS = 2
+
+REFERENCE_TEXTS = {
+    "Chinese": "今天天氣很好，我們一起去公園散步吧。路上車子很多，請大家注意安全。到了之後先找個地方休息一下。",
+    "English": "The weather is nice today, so let's take a walk in the park. There is a lot of traffic on the way. "
+               "When we get there, we can rest for a while.",
+}
+
+
+def machine_fingerprint() -> str:
+    try:
+        import sherpa_onnx
+        sherpa_version = getattr(sherpa_onnx, "__version__", "")
+    except ImportError:
+        sherpa_version = ""
+    parts = [platform.system(), platform.machine(), platform.processor(), str(os.cpu_count()), sherpa_version]
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()[:12]
+
+
+def thread_count_candidates(cpu_count=None):
+    """1、2、4、8... 直到邏輯核心數，另外加入核心數的一半 (通常為實體核心數) 與核心數本身。"""
+    cpu_count = cpu_count or os.cpu_count() or 2
+    candidates = set()
+    n = 1
+    while n <= cpu_count:
+        candidates.add(n)
+        n *= 2
+    candidates.add(max(1, cpu_count // 2))
+    candidates.add(cpu_count)
+    return sorted(candidates)
+
+
+def reference_text(language: str) -> str:
+    return REFERENCE_TEXTS.get(language, REFERENCE_TEXTS["English"])
+
+
+def benchmark_model(build_tts, text, thread_counts=None, sentence_batches=SENTENCE_BATCH_CANDIDATES,
+                    repeats=BENCHMARK_REPEATS, progress=None, should_stop=None):
+    """
+    build_tts(num_threads, max_num_sentences) 回傳一個 OfflineTts。
+    回傳 (best, results)；best 為 RTF 最低的 {"num_threads", "max_num_sentences", "rtf"}，results 為所有組合的結果。
+    should_stop() 中途要求停止時 best 為 None (只測了部分組合，結果不可靠)。
+    """
+    thread_counts = thread_counts or thread_count_candidates()
+    combos = [(nt, ms) for nt in thread_counts for ms in sentence_batches]
+    results = []
+    for i, (num_threads, max_num_sentences) in enumerate(combos, 1):
+        if should_stop and should_stop():
+            return None, results
+        if progress:
+            progress(i, len(combos), num_threads, max_num_sentences)
+        tts = build_tts(num_threads, max_num_sentences)
+        tts.generate(text[:10])  # 預熱 (首次執行含記憶體配置等一次性成本)
+        elapsed = 0.0
+        audio_seconds = 0.0
+        for _ in range(repeats):
+            # 每次合成前都檢查，避免新的播放請求等待整個組合測完
+            if should_stop and should_stop():
+                return None, results
+            start = time.perf_counter()
+            audio = tts.generate(text)
+            elapsed += time.perf_counter() - start
+            audio_seconds += len(audio.samples) / float(audio.sample_rate)
+        del tts
+        rtf = elapsed / audio_seconds if audio_seconds else float("inf")
+        results.append({"num_threads": num_threads, "max_num_sentences": max_num_sentences, "rtf": round(rtf, 4)})
+    best = min(results, key=lambda r: r["rtf"]) if results else None
+    return best, results
+
+
+class TuningStore:
+    """tuning_profiles.json 的讀寫: {機器指紋: {model_id: {"num_threads", "max_num_sentences", "rtf", ...}}}"""
+    def __init__(self, path=TUNING_FILE, log=None):
+        self.path = path
+        self.log = log or (lambda msg, level="INFO": None)
+        self.fingerprint = machine_fingerprint()
+        self._profiles = None
+        self._lock = threading.Lock()
+
+    def _load_locked(self):
+        if self._profiles is not None:
+            return
+        self._profiles = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self._profiles = json.load(f)
+            except (json.JSONDecodeError, IOError) as e:
+                self.log(f"讀取效能調校設定失敗，將重新測試: {e}", "WARN")
+
+    def get(self, model_id):
+        with self._lock:
+            self._load_locked()
+            return self._profiles.get(self.fingerprint, {}).get(model_id)
+
+    def set(self, model_id, profile: dict):
+        with self._lock:
+            self._load_locked()
+            self._profiles.setdefault(self.fingerprint, {})[model_id] = dict(profile, benchmarked_at=int(time.time()))
+            try:
+                tmp_path = self.path + ".tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(self._profiles, f, indent=4, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+            except IOError as e:
+                self.log(f"儲存效能調校設定失敗: {e}", "ERROR")
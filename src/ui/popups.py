@@ -13,6 +13,8 @@ from PyQt6.QtGui import QFont, QIcon, QColor
 
 from ..utils.deps import APP_VERSION, check_model_downloaded
 from ..app.model_manager import PREDEFINED_MODELS
+from ..app import tuning
+from ..app.tracing import tracer
 
 
 class BaseDialog(QWidget):
@@ -295,7 +297,7 @@ class BaseDialog(QWidget):
 
 class SettingsWindow(BaseDialog):
     def __init__(self, parent, app_controller):
-        super().__init__(parent, "其它設定", 450, 550)
+        super().__init__(parent, "其它設定", 450, 680)
         self.app = app_controller
         self.audio = app_controller.audio
         
@@ -360,6 +362,31 @@ class SettingsWindow(BaseDialog):
         listen_layout.addLayout(volume_layout)
         self.main_layout.addWidget(listen_card)
 
+        # --- 效能調校 (Sherpa-ONNX) ---
+        tuning_card, tuning_layout = self._create_card("效能調校 (Sherpa-ONNX)")
+        tuning_grid = QGridLayout()
+        tuning_grid.addWidget(QLabel("執行緒數:"), 0, 0)
+        self.num_threads_combo = QComboBox()
+        self.num_threads_combo.addItem("自動", 0)
+        for n in tuning.thread_count_candidates():
+            self.num_threads_combo.addItem(str(n), n)
+        self._select_combo_data(self.num_threads_combo, self.app.config.get("onnx_num_threads", 0))
+        self.num_threads_combo.currentIndexChanged.connect(self._on_onnx_override_change)
+        tuning_grid.addWidget(self.num_threads_combo, 0, 1)
+        tuning_grid.addWidget(QLabel("句子批次:"), 0, 2)
+        self.max_sentences_combo = QComboBox()
+        self.max_sentences_combo.addItem("自動", 0)
+        for n in tuning.SENTENCE_BATCH_CANDIDATES:
+            self.max_sentences_combo.addItem(str(n), n)
+        self._select_combo_data(self.max_sentences_combo, self.app.config.get("onnx_max_num_sentences", 0))
+        self.max_sentences_combo.currentIndexChanged.connect(self._on_onnx_override_change)
+        tuning_grid.addWidget(self.max_sentences_combo, 0, 3)
+        tuning_layout.addLayout(tuning_grid)
+        benchmark_button = QPushButton("執行效能測試 (自動選擇最佳設定)")
+        benchmark_button.clicked.connect(self.app.run_onnx_tuning)
+        tuning_layout.addWidget(benchmark_button)
+        self.main_layout.addWidget(tuning_card)
+
         # --- 檢查更新 ---
         update_button = QPushButton("檢查更新")
         update_button.clicked.connect(lambda: self.app.updater.check_for_updates(silent=False))
@@ -393,11 +420,34 @@ class SettingsWindow(BaseDialog):
         self.listen_device_combo.setEnabled(is_enabled)
         self.listen_volume_slider.setEnabled(is_enabled)
 
+    def refresh_listen_devices(self):
+        """設備清單變動時重新填入聆聽設備選單。"""
+        self.listen_device_combo.blockSignals(True)
+        try:
+            self.listen_device_combo.clear()
+            self.listen_device_combo.addItems(self.audio.get_listen_device_names())
+            self.listen_device_combo.setCurrentText(self.audio.listen_device_name)
+        finally:
+            self.listen_device_combo.blockSignals(False)
+
     def _on_listen_device_change(self, choice):
         self.audio.listen_device_name = choice
         self.app.log_message(f"聆聽設備已設定為: {self.audio.listen_device_name}")
         self.app.config.set("listen_device_name", self.audio.listen_device_name)
 
+    @staticmethod
+    def _select_combo_data(combo, value):
+        index = combo.findData(value)
+        combo.setCurrentIndex(index if index >= 0 else 0)
+
+    def _on_onnx_override_change(self, _):
+        num_threads = self.num_threads_combo.currentData()
+        max_num_sentences = self.max_sentences_combo.currentData()
+        self.app.config.set("onnx_num_threads", num_threads)
+        self.app.config.set("onnx_max_num_sentences", max_num_sentences)
+        self.audio.set_onnx_overrides(num_threads, max_num_sentences)
+        self.app.log_message(f"Sherpa-ONNX 執行參數已設定為: 執行緒 {num_threads or '自動'}，句子批次 {max_num_sentences or '自動'}")
+
     def _on_listen_volume_change(self, value):
         self.audio.listen_volume = round(value / 100.0, 2)
         self.listen_volume_label.setText(f"{value}%")
@@ -408,6 +458,7 @@ class QuickInputWindow(QWidget):
         super().__init__()
         self.app = app_controller
         self.history_index = -1
+        self.trace_id = None # 開啟此輸入框的快捷鍵追蹤 ID (見 tracing.py)
 
         self.setWindowFlags(Qt.WindowType.FramelessWindowHint | Qt.WindowType.WindowStaysOnTopHint | Qt.WindowType.Tool)
         self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground)
@@ -455,7 +506,26 @@ class QuickInputWindow(QWidget):
         self.entry.setFocus()
         self.entry.selectAll()
 
+    def set_trace(self, trace_id):
+        """開始等待使用者輸入的追蹤區段；輸入框已開啟時，前一次的追蹤視為被取代。"""
+        if self.trace_id is not None and trace_id is not None:
+            self._end_trace("superseded")
+        if trace_id is not None:
+            self.trace_id = trace_id
+            tracer.begin("typing", trace_id)
+
+    def take_trace(self):
+        """送出文字時取出追蹤 ID，之後的區段由播放請求接續。"""
+        trace_id, self.trace_id = self.trace_id, None
+        tracer.end("typing", trace_id)
+        return trace_id
+
+    def _end_trace(self, result):
+        trace_id = self.take_trace()
+        tracer.end("hotkey_to_audio", trace_id, result=result)
+
     def closeEvent(self, event):
+        self._end_trace("closed")
         if self.app and self.app.quick_input_window:
              self.app.quick_input_window = None
         super().closeEvent(event)
@@ -1013,10 +1083,7 @@ class QuickPhrasesWindow(BaseDialog):
             self.app._start_hotkey_listener()
         
         # --- 快取邏輯: 觸發背景快取生成 ---
-        self.app.log_message("開始在背景更新快捷語音快取...", "DEBUG")
-        for phrase in self.app.quick_phrases:
-            if phrase.get("text") and phrase.get("hotkey"):
-                self.app.audio.cache_phrase(phrase)
+        self.app._schedule_phrase_warmup()
 
         self.main_window.hide_overlay()
 
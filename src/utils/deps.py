@@ -39,6 +39,9 @@ def get_base_path():
 BASE_DIR = get_base_path()
 CONFIG_FILE = os.path.join(BASE_DIR, "config.json")
 CACHE_DIR = os.path.join(BASE_DIR, "audio_cache")
+TUNING_FILE = os.path.join(BASE_DIR, "tuning_profiles.json")
+TRACE_DIR = os.path.join(BASE_DIR, "traces")
+PROFILE_DIR = os.path.join(BASE_DIR, "profiles")
 
 TTS_MODELS_DIR = os.path.join(BASE_DIR, "tts_models")
 
@@ -148,6 +151,9 @@ def download_with_progress(url: str, dst: str, progress_cb=None):
                         progress_cb(min(0.8, pct * 0.8), text)
                         last_report = now
                         last_bytes = downloaded
+        from ..app import metrics
+        metrics.download_bytes.inc(downloaded)
+        metrics.download_seconds.inc(time.time() - start)
         if progress_cb:
             progress_cb(0.8, "下載完成，準備解壓…")
 
@@ -317,8 +323,8 @@ class DependencyManager:
         try:
             TTS_MODELS_DIR.encode('ascii')
         except UnicodeEncodeError:
-            self.log(f"警告：模型存放路徑 '{TTS_MODELS_DIR}' 包含非 ASCII 字元。這可能導致 Sherpa-ONNX 模型載入失敗。", "WARN")
-            self.log("建議將應用程式移動到路徑不含中文或其他非英文字元的資料夾。", "WARN")
+            # Sherpa-ONNX 無法開啟非 ASCII 路徑，載入時會改用 ASCII 暫存區中的模型鏡像 (見 model_staging.py)
+            self.log(f"模型存放路徑 '{TTS_MODELS_DIR}' 包含非 ASCII 字元，將透過 ASCII 暫存鏡像載入 Sherpa-ONNX 模型。", "DEBUG")
 
 
     # ---- ffmpeg ----
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+from src.app.audio_cache import AudioCache
+
+
+def _samples(n):
+    return np.zeros(n, dtype=np.float32)  # 每個樣本 4 bytes
+
+
+def test_evicts_least_recently_used_over_budget():
+    cache = AudioCache(max_bytes=400)
+    cache.put("a", _samples(40), 16000)
+    cache.put("b", _samples(40), 16000)
+    assert cache.get("a") is not None  # a 變成最近使用
+    cache.put("c", _samples(40), 16000)
+    assert "b" not in cache
+    assert "a" in cache and "c" in cache
+    stats = cache.stats()
+    assert stats["bytes"] == 320
+    assert stats["evictions"] == 1
+
+
+def test_byte_budget_is_respected_and_oversized_entries_rejected():
+    cache = AudioCache(max_bytes=1000)
+    for i in range(10):
+        cache.put(i, _samples(100), 16000)
+    assert cache.stats()["bytes"] <= 1000
+    assert len(cache) == 2
+    assert cache.put("huge", _samples(1000), 16000) is False
+    assert "huge" not in cache
+
+
+def test_replacing_a_key_updates_byte_count():
+    cache = AudioCache(max_bytes=1000)
+    cache.put("a", _samples(100), 16000)
+    cache.put("a", _samples(50), 22050)
+    assert cache.stats()["bytes"] == 200
+    assert cache.get("a")[1] == 22050
+
+
+def test_pinned_entries_survive_eviction_until_unpinned():
+    cache = AudioCache(max_bytes=400)
+    cache.put("phrase", _samples(80), 16000, pinned=True)
+    cache.put("x", _samples(40), 16000)
+    cache.put("y", _samples(40), 16000)
+    assert "phrase" in cache
+    assert "x" not in cache
+    cache.unpin_all()
+    cache.put("z", _samples(40), 16000)
+    assert "phrase" not in cache
+
+
+def test_shrinking_budget_evicts_and_hit_ratio():
+    cache = AudioCache(max_bytes=1000)
+    cache.put("a", _samples(100), 16000)
+    cache.put("b", _samples(100), 16000)
+    cache.set_max_bytes(500)
+    assert len(cache) == 1 and "b" in cache
+    assert cache.get("a") is None
+    assert cache.get("b") is not None
+    assert cache.stats()["hit_ratio"] == 0.5
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+import io
+import os
+import json
+
+import numpy as np
+import pytest
+
+from src.app import disk_cache
+from src.app.disk_cache import DiskAudioCache, INDEX_FILE_NAME
+
+
+def _samples(n, value=0.0):
+    return np.full(n, value, dtype=np.float32)
+
+
+def _npy_size(n):
+    buf = io.BytesIO()
+    np.save(buf, _samples(n))
+    return buf.tell()
+
+
+@pytest.fixture(autouse=True)
+def no_flush_timer(monkeypatch):
+    # 測試中由 flush() 明確寫回索引，不讓計時器在背景寫檔
+    monkeypatch.setattr(disk_cache, "FLUSH_DELAY_SEC", 3600.0)
+
+
+def _open(path, max_bytes=10 * 1024 * 1024):
+    return DiskAudioCache(str(path), max_bytes=max_bytes)
+
+
+def test_hit_and_miss_after_reopen(tmp_path):
+    cache = _open(tmp_path)
+    assert cache.put("a", _samples(100, 0.5), 22050, engine="edge")
+    assert cache.get("missing") is None
+    cache.flush()
+
+    reopened = _open(tmp_path)
+    samples, sr = reopened.get("a")
+    assert sr == 22050
+    assert samples.dtype == np.float32 and np.all(samples == 0.5)
+    assert reopened.get("b") is None
+    assert reopened.stats()["entries"] == 1
+
+
+def test_put_does_not_rewrite_index_until_flush(tmp_path):
+    cache = _open(tmp_path)
+    for i in range(5):
+        cache.put(f"k{i}", _samples(10), 16000)
+    assert not os.path.exists(tmp_path / INDEX_FILE_NAME)
+    cache.flush()
+    with open(tmp_path / INDEX_FILE_NAME, encoding="utf-8") as f:
+        assert sorted(json.load(f)) == [f"k{i}" for i in range(5)]
+
+
+def test_byte_budget_removes_least_recently_used(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(disk_cache.time, "time", lambda: now[0])
+    size = _npy_size(100)
+    cache = _open(tmp_path, max_bytes=size * 3)
+    for key in ("a", "b", "c"):
+        cache.put(key, _samples(100), 16000)
+        now[0] += 1
+    assert cache.get("a") is not None  # a 變成最近使用
+    now[0] += 1
+    cache.put("d", _samples(100), 16000)
+    assert cache.get("b") is None
+    assert not os.path.exists(tmp_path / "b.npy")
+    for key in ("a", "c", "d"):
+        assert cache.get(key) is not None
+    assert cache.stats()["bytes"] == size * 3
+
+    cache.set_max_bytes(size)
+    assert cache.stats()["entries"] == 1
+    assert cache.get("d") is not None
+
+
+def test_replacing_entry_keeps_byte_total(tmp_path):
+    cache = _open(tmp_path)
+    cache.put("a", _samples(100), 16000)
+    cache.put("a", _samples(50), 16000)
+    assert cache.stats() == {"entries": 1, "bytes": _npy_size(50), "max_bytes": cache.max_bytes}
+
+
+def test_purge_engine(tmp_path):
+    cache = _open(tmp_path)
+    cache.put("a", _samples(10), 16000, engine="model-1")
+    cache.put("b", _samples(10), 16000, engine="model-2")
+    cache.put("c", _samples(10), 16000, engine="model-1")
+    assert cache.purge_engine("model-1") == 2
+    assert cache.purge_engine("model-1") == 0
+    cache.flush()
+    reopened = _open(tmp_path)
+    assert reopened.get("a") is None and reopened.get("c") is None
+    assert reopened.get("b") is not None
+    assert sorted(f for f in os.listdir(tmp_path) if f.endswith(".npy")) == ["b.npy"]
+
+
+def test_orphan_files_removed_and_missing_files_dropped(tmp_path):
+    cache = _open(tmp_path)
+    cache.put("kept", _samples(10), 16000)
+    cache.put("gone", _samples(10), 16000)
+    cache.flush()
+    np.save(tmp_path / "orphan.npy", _samples(10))  # 沒有索引的檔案
+    os.remove(tmp_path / "gone.npy")  # 索引中有、檔案已不存在
+
+    reopened = _open(tmp_path)
+    assert reopened.stats()["entries"] == 1
+    assert reopened.get("kept") is not None
+    assert reopened.get("gone") is None
+    assert not os.path.exists(tmp_path / "orphan.npy")
+
+
+def test_timer_writes_index_back(tmp_path, monkeypatch):
+    monkeypatch.setattr(disk_cache, "FLUSH_DELAY_SEC", 0.05)
+    cache = _open(tmp_path)
+    cache.put("a", _samples(10), 16000)
+    cache._flush_timer.join(timeout=5)
+    assert os.path.exists(tmp_path / INDEX_FILE_NAME)
+    assert cache._flush_timer is None
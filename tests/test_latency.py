@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+from src.app.latency import LatencyStats, LatencyTimeline, _percentile
+
+
+def _timeline(engine, ttfa_ms, cache_hit=False, cancelled=False):
+    t = LatencyTimeline("text", origin=0.0)
+    t.engine = engine
+    t.cache_hit = cache_hit
+    t.cancelled = cancelled
+    t.mark("dequeue", when=0.001)
+    t.mark("first_write", when=ttfa_ms / 1000.0)
+    return t
+
+
+def test_nearest_rank_percentile():
+    values = list(range(1, 101))
+    assert _percentile(values, 50) == 50
+    assert _percentile(values, 95) == 95
+    assert _percentile(values, 99) == 99
+    assert _percentile([7], 99) == 7
+    assert _percentile([1, 2, 3], 50) == 2
+    assert _percentile([], 50) is None
+
+
+def test_percentiles_per_engine():
+    stats = LatencyStats()
+    for ms in range(1, 101):
+        stats.record(_timeline("edge", ms))
+    stats.record(_timeline("sherpa", 40))
+    edge = stats.percentiles("edge")
+    assert edge == {"count": 100, "p50": 50.0, "p95": 95.0, "p99": 99.0}
+    assert stats.percentiles("sherpa")["p99"] == 40.0
+    assert stats.percentiles("missing") is None
+
+
+def test_cache_hits_and_cancelled_requests_kept_separate():
+    stats = LatencyStats()
+    stats.record(_timeline("edge", 300))
+    stats.record(_timeline("edge", 5, cache_hit=True))
+    stats.record(_timeline("edge", 1, cancelled=True))
+    assert stats.percentiles("edge")["count"] == 1
+    assert stats.percentiles("cache")["p50"] == 5.0
+    assert stats.recorded == 2
+    assert len(stats.recent()) == 3
+
+
+def test_window_keeps_only_recent_samples():
+    stats = LatencyStats(window=10)
+    for ms in range(1, 101):
+        stats.record(_timeline("edge", ms))
+    entry = stats.percentiles("edge")
+    assert entry["count"] == 10
+    assert entry["p50"] == 95.0
+
+
+def test_other_intervals_and_missing_marks():
+    stats = LatencyStats()
+    t = LatencyTimeline("text", origin=0.0)
+    t.engine = "edge"
+    t.mark("dequeue", when=0.02)
+    t.mark("dequeue", when=0.5)  # 同名時間點只保留第一次
+    stats.record(t)
+    assert stats.percentiles("edge", interval="queue_wait")["p50"] == 20.0
+    assert stats.percentiles("edge") is None
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+import gc
+import time
+import threading
+
+from src.app.metrics import Counter, MetricsRegistry
+
+
+def _run_threads(count, target):
+    threads = [threading.Thread(target=target, args=(i,)) for i in range(count)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+def _wait_for_retired(counter, live=0, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while len(counter._cells) > live and time.monotonic() < deadline:
+        gc.collect()
+        time.sleep(0.01)
+    return len(counter._cells)
+
+
+def test_values_exact_after_short_lived_threads_exit():
+    counter = Counter("test_total", "test")
+
+    def work(i):
+        for _ in range(1000):
+            counter.inc()
+
+    _run_threads(20, work)
+    assert counter.values() == {"": 20000.0}
+    assert _wait_for_retired(counter) == 0
+    assert counter.values() == {"": 20000.0}
+    _run_threads(5, work)
+    assert counter.values() == {"": 25000.0}
+
+
+def test_labelled_values_tracked_separately():
+    counter = Counter("test_by_engine_total", "test", label="engine")
+    counter.inc(2, "main")
+
+    def work(i):
+        label = "edge" if i % 2 else "sherpa"
+        for _ in range(100):
+            counter.inc(label_value=label)
+        counter.inc(0.5, "shared")
+
+    _run_threads(10, work)
+    _wait_for_retired(counter, live=1)
+    assert counter.values() == {"main": 2.0, "edge": 500.0, "sherpa": 500.0, "shared": 5.0}
+    assert len(counter._cells) == 1  # 只剩主執行緒的計數格
+
+
+def test_values_never_decrease_while_threads_exit():
+    counter = Counter("test_total", "test")
+    stop = threading.Event()
+    seen = []
+
+    def reader():
+        while not stop.is_set():
+            seen.append(counter.values().get("", 0.0))
+
+    reading = threading.Thread(target=reader)
+    reading.start()
+    for _ in range(20):
+        _run_threads(5, lambda i: [counter.inc() for _ in range(50)])
+    stop.set()
+    reading.join()
+    assert seen == sorted(seen)
+    assert counter.values() == {"": 5000.0}
+
+
+def test_registry_exports_labelled_counter():
+    registry = MetricsRegistry(prefix="t_")
+    counter = registry.counter("plays_total", "plays", label="engine")
+    _run_threads(3, lambda i: counter.inc(label_value=f"e{i}"))
+    samples = {s.labels.get("engine"): s.value for s in registry.collect() if s.name == "t_plays_total"}
+    assert samples == {"e0": 1.0, "e1": 1.0, "e2": 1.0}
+    text = registry.to_prometheus()
+    assert 't_plays_total{engine="e1"} 1' in text
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+import types
+
+import pytest
+
+from src.app import model_pool
+from src.app.model_pool import SherpaModelPool
+
+MB = 1024 * 1024
+
+
+class FakeTts:
+    def __init__(self, name):
+        self.name = name
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    state = {"now": 1000.0}
+    monkeypatch.setattr(model_pool, "time", types.SimpleNamespace(monotonic=lambda: state["now"]))
+    monkeypatch.setattr(SherpaModelPool, "_ensure_reaper", lambda self: None)
+
+    def advance(sec):
+        state["now"] += sec
+    return advance
+
+
+def _pool(**kwargs):
+    return SherpaModelPool(log=lambda msg, level="INFO": None, **kwargs)
+
+
+def test_lru_eviction_by_model_count(clock):
+    pool = _pool(max_models=2, max_bytes=100 * MB)
+    pool.put("a", FakeTts("a"), MB)
+    pool.put("b", FakeTts("b"), MB)
+    assert pool.get("a").name == "a"  # a 變成最近使用
+    pool.put("c", FakeTts("c"), MB)
+    assert "b" not in pool
+    assert pool.stats()["models"] == ["a", "c"]
+    assert pool.get("b") is None
+
+
+def test_byte_budget_evicts_oldest(clock):
+    pool = _pool(max_models=10, max_bytes=5 * MB)
+    pool.put("a", FakeTts("a"), 2 * MB)
+    pool.put("b", FakeTts("b"), 2 * MB)
+    pool.put("c", FakeTts("c"), 2 * MB)
+    assert pool.stats()["models"] == ["b", "c"]
+    assert pool.stats()["est_bytes"] == 4 * MB
+    pool.configure(max_bytes=2 * MB)
+    assert pool.stats()["models"] == ["c"]
+
+
+def test_active_pinned_and_protected_models_survive(clock):
+    pool = _pool(max_models=1, max_bytes=100 * MB)
+    pool.pin("pinned")
+    pool.put("pinned", FakeTts("pinned"), MB)
+    pool.active_id = "active"
+    pool.put("active", FakeTts("active"), MB)
+    pool.put("loading", FakeTts("loading"), MB, protect=True)
+    pool.put("other", FakeTts("other"), MB)
+    # 超過上限時只能淘汰沒有受保護的模型
+    assert pool.stats()["models"] == ["pinned", "active", "loading"]
+    pool.unprotect("loading")
+    assert "loading" not in pool
+    assert pool.stats()["pinned"] == ["pinned"]
+
+
+def test_replacing_pinned_model_keeps_pin(clock):
+    # 參數變更後重建模型時以 put() 直接取代，釘選狀態不變
+    pool = _pool(max_models=1, max_bytes=100 * MB)
+    pool.pin("default")
+    pool.put("default", FakeTts("old"), MB)
+    pool.put("default", FakeTts("new"), MB)
+    pool.put("x", FakeTts("x"), MB)
+    assert pool.get("default").name == "new"
+    assert "x" not in pool
+    assert pool.stats()["pinned"] == ["default"]
+
+
+def test_pin_replaces_previous_pin_and_remove_unpins(clock):
+    pool = _pool(max_models=1, max_bytes=100 * MB)
+    pool.pin("a")
+    pool.put("a", FakeTts("a"), MB)
+    pool.pin("b")
+    pool.put("b", FakeTts("b"), MB)
+    assert "a" not in pool
+    assert pool.remove("b") is True
+    assert pool.remove("b") is False
+    assert pool.stats()["pinned"] == []
+    pool.pin(None)
+    assert pool.stats()["pinned"] == []
+
+
+def test_idle_models_released(clock):
+    pool = _pool(max_models=5, max_bytes=100 * MB, idle_timeout=60)
+    pool.pin("pinned")
+    for name in ("pinned", "active", "idle", "recent"):
+        pool.put(name, FakeTts(name), MB)
+    pool.active_id = "active"
+    clock(50)
+    pool.get("recent")
+    clock(20)
+    pool.evict_idle()
+    assert pool.stats()["models"] == ["pinned", "active", "recent"]
+
+    pool.configure(idle_timeout=0)
+    clock(1000)
+    pool.evict_idle()
+    assert len(pool.stats()["models"]) == 3
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+import os
+
+import pytest
+
+from src.app import model_staging
+from src.app.model_staging import stage_model, remove_staged_model, STAGE_MARKER
+
+MODEL_ID = "vits-test"
+FILES = ["model.onnx", "tokens.txt", "espeak-ng-data"]
+
+
+@pytest.fixture
+def stage_root(tmp_path, monkeypatch):
+    root = tmp_path / "stage"
+    monkeypatch.setattr(model_staging, "_stage_root", lambda: root)
+    return root
+
+
+@pytest.fixture
+def source(tmp_path):
+    """非 ASCII 路徑下的模型目錄，含一個會以目錄連結鏡像的子目錄。"""
+    src = tmp_path / "模型" / MODEL_ID
+    (src / "espeak-ng-data" / "voices").mkdir(parents=True)
+    (src / "model.onnx").write_bytes(b"onnx" * 100)
+    (src / "tokens.txt").write_text("a 1\nb 2\n", encoding="utf-8")
+    (src / "espeak-ng-data" / "phontab").write_bytes(b"phon")
+    (src / "espeak-ng-data" / "voices" / "en").write_text("voice", encoding="utf-8")
+    return src
+
+
+def _snapshot(root):
+    result = {}
+    for dirpath, _, files in os.walk(root):
+        for f in files:
+            path = os.path.join(dirpath, f)
+            with open(path, "rb") as fh:
+                result[os.path.relpath(path, root)] = fh.read()
+    return result
+
+
+def test_ascii_source_is_used_directly(tmp_path, stage_root):
+    src = tmp_path / "ascii-model"
+    src.mkdir()
+    assert stage_model(MODEL_ID, src, []) == src
+    assert not stage_root.exists()
+
+
+def test_stage_creates_mirror_and_reuses_it(source, stage_root):
+    staged = stage_model(MODEL_ID, source, FILES)
+    assert staged.parent == stage_root
+    assert (staged / STAGE_MARKER).exists()
+    assert (staged / "model.onnx").read_bytes() == (source / "model.onnx").read_bytes()
+    assert (staged / "espeak-ng-data" / "voices" / "en").read_text(encoding="utf-8") == "voice"
+
+    (staged / "reuse-check").write_text("x", encoding="utf-8")
+    assert stage_model(MODEL_ID, source, FILES) == staged
+    assert (staged / "reuse-check").exists()
+
+
+def test_changed_fingerprint_replaces_old_mirror(source, stage_root):
+    old = stage_model(MODEL_ID, source, FILES)
+    (source / "tokens.txt").write_text("a 1\nb 2\nc 3\n", encoding="utf-8")
+    new = stage_model(MODEL_ID, source, FILES)
+    assert new != old
+    assert not old.exists()
+    assert [p.name for p in stage_root.iterdir()] == [new.name]
+    assert (new / "tokens.txt").read_text(encoding="utf-8").endswith("c 3\n")
+
+
+def test_other_model_with_same_prefix_is_kept(source, stage_root):
+    other = stage_root / f"{MODEL_ID}-extra-{'0' * 16}"
+    other.mkdir(parents=True)
+    stage_model(MODEL_ID, source, FILES)
+    remove_staged_model(MODEL_ID)
+    assert other.exists()
+
+
+def test_remove_leaves_source_tree_intact(source, stage_root):
+    before = _snapshot(source)
+    staged = stage_model(MODEL_ID, source, FILES)
+    linked = staged / "espeak-ng-data"
+    if not model_staging._is_link(linked):
+        pytest.skip("此平台無法建立目錄連結")
+    remove_staged_model(MODEL_ID)
+    assert not staged.exists()
+    assert _snapshot(source) == before
+
+
+def test_remove_stage_only_unlinks_symlinked_subdirectory(tmp_path):
+    target = tmp_path / "原始" / "data"
+    target.mkdir(parents=True)
+    (target / "keep.bin").write_bytes(b"keep")
+    stage = tmp_path / "stage-dir"
+    stage.mkdir()
+    (stage / "file.txt").write_text("x", encoding="utf-8")
+    (stage / "nested").mkdir()
+    (stage / "nested" / "inner.txt").write_text("y", encoding="utf-8")
+    try:
+        os.symlink(target, stage / "data", target_is_directory=True)
+    except (OSError, NotImplementedError):
+        pytest.skip("此平台無法建立符號連結")
+    model_staging._remove_stage(stage)
+    assert not stage.exists()
+    assert (target / "keep.bin").read_bytes() == b"keep"
+
+    # 鏡像目錄本身是連結時不做任何事
+    os.symlink(target, tmp_path / "link-stage", target_is_directory=True)
+    model_staging._remove_stage(tmp_path / "link-stage")
+    assert (target / "keep.bin").exists()
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+from src.app.parallel_synth import CrossfadeJoiner
+
+FADE = 16
+
+
+def _join(segments, fade=FADE):
+    joiner = CrossfadeJoiner(fade)
+    parts = [joiner.push(s) for s in segments]
+    parts.append(joiner.flush())
+    return np.concatenate(parts), parts
+
+
+def _const(value, n):
+    return np.full(n, value, dtype=np.float32)
+
+
+def test_output_length_loses_one_fade_per_join():
+    segments = [_const(1.0, 100), _const(1.0, 57), _const(1.0, 200)]
+    out, parts = _join(segments)
+    assert out.dtype == np.float32
+    assert len(out) == sum(len(s) for s in segments) - (len(segments) - 1) * FADE
+
+
+def test_first_segment_tail_is_held_back_until_flush():
+    joiner = CrossfadeJoiner(FADE)
+    first = np.arange(100, dtype=np.float32)
+    head = joiner.push(first)
+    np.testing.assert_array_equal(head, first[:-FADE])
+    np.testing.assert_array_equal(joiner.flush(), first[-FADE:])
+    assert len(joiner.flush()) == 0
+
+
+def test_constant_signal_stays_constant_across_joins():
+    # 淡入與淡出的增益相加為 1，相同音量的兩句在接縫處不會有凹陷或突起
+    out, _ = _join([_const(0.5, 80), _const(0.5, 80), _const(0.5, 80)])
+    np.testing.assert_allclose(out, 0.5, atol=1e-6)
+
+
+def test_join_ramps_between_segments_without_jumps():
+    out, parts = _join([_const(1.0, 64), _const(-1.0, 64)])
+    joint = out[64 - FADE:64]
+    assert joint[0] == 1.0 and joint[-1] == -1.0
+    steps = np.diff(out)
+    # 最大的跳動不超過線性斜坡的一步
+    assert np.max(np.abs(steps)) <= 2.0 / (FADE - 1) + 1e-6
+
+
+def test_overlap_region_mixes_tail_and_head():
+    a = np.linspace(0.0, 1.0, 50, dtype=np.float32)
+    b = np.linspace(1.0, 2.0, 50, dtype=np.float32)
+    out, _ = _join([a, b])
+    ramp = np.linspace(0.0, 1.0, FADE, dtype=np.float32)
+    expected = a[-FADE:] * ramp[::-1] + b[:FADE] * ramp
+    np.testing.assert_allclose(out[50 - FADE:50], expected, atol=1e-6)
+    np.testing.assert_array_equal(out[50:], b[FADE:])
+
+
+def test_segments_shorter_than_two_fades_pass_through():
+    segments = [_const(1.0, 100), _const(2.0, 2 * FADE - 1), _const(3.0, 100)]
+    out, parts = _join(segments)
+    # 短句不做淡化，也不會吃掉任何樣本
+    assert len(out) == sum(len(s) for s in segments)
+    np.testing.assert_array_equal(out[:100], 1.0)
+    np.testing.assert_array_equal(out[100:100 + 2 * FADE - 1], 2.0)
+    np.testing.assert_array_equal(out[100 + 2 * FADE - 1:], 3.0)
+
+
+def test_zero_fade_is_plain_concatenation():
+    segments = [np.arange(10, dtype=np.float32), np.arange(5, dtype=np.float32)]
+    out, _ = _join(segments, fade=0)
+    np.testing.assert_array_equal(out, np.concatenate(segments))
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+import array
+
+import numpy as np
+import pytest
+
+from src.app.pcm import from_engine_samples, int_to_float32, BufferPool
+
+
+def test_from_list_and_tuple():
+    for samples in ([0.0, 0.5, -0.25], (0.0, 0.5, -0.25)):
+        out = from_engine_samples(samples)
+        assert out.dtype == np.float32 and out.ndim == 1
+        np.testing.assert_array_equal(out, [0.0, 0.5, -0.25])
+    assert len(from_engine_samples([])) == 0
+
+
+def test_float32_ndarray_is_not_copied():
+    samples = np.linspace(-1, 1, 10, dtype=np.float32)
+    out = from_engine_samples(samples)
+    assert np.shares_memory(out, samples)
+    column = samples.reshape(-1, 1)
+    assert from_engine_samples(column).shape == (10,)
+
+
+def test_float64_ndarray_and_buffer_input():
+    out = from_engine_samples(np.array([0.25, -0.5], dtype=np.float64))
+    assert out.dtype == np.float32
+    np.testing.assert_array_equal(out, [0.25, -0.5])
+
+    buf = array.array("f", [0.1, 0.2])
+    out = from_engine_samples(buf)
+    assert out.dtype == np.float32
+    np.testing.assert_allclose(out, [0.1, 0.2], rtol=1e-6)
+    assert np.shares_memory(out, np.frombuffer(buf, dtype=np.float32))
+
+
+def test_generator_input():
+    out = from_engine_samples(x / 4 for x in range(4))
+    np.testing.assert_array_equal(out, [0.0, 0.25, 0.5, 0.75])
+
+
+@pytest.mark.parametrize("dtype,full_scale", [(np.int16, 32768.0), (np.int32, 2147483648.0)])
+def test_int_scaling_from_ndarray_and_bytes(dtype, full_scale):
+    info = np.iinfo(dtype)
+    ints = np.array([0, info.max, info.min, int(full_scale // 2)], dtype=dtype)
+    expected = np.array([0.0, info.max / full_scale, -1.0, 0.5], dtype=np.float32)
+    from_array = int_to_float32(ints)
+    from_bytes = int_to_float32(ints.tobytes(), sample_width=np.dtype(dtype).itemsize)
+    for out in (from_array, from_bytes):
+        assert out.dtype == np.float32
+        np.testing.assert_allclose(out, expected, rtol=0, atol=1e-7)
+        assert np.all(out >= -1.0) and np.all(out < 1.0)
+
+
+def test_uint8_is_offset_binary():
+    out = int_to_float32(bytes([0, 128, 255]), sample_width=1)
+    np.testing.assert_allclose(out, [-1.0, 0.0, 127 / 128], atol=1e-7)
+
+
+def test_interleaved_channels_are_averaged():
+    stereo = np.array([1000, 3000, -2000, 2000, 32767, 32767], dtype=np.int16)
+    out = int_to_float32(stereo.tobytes(), sample_width=2, channels=2)
+    np.testing.assert_allclose(out, np.array([2000, 0, 32767]) / 32768.0, atol=1e-7)
+
+    u8 = bytes([0, 255, 128, 128])
+    np.testing.assert_allclose(int_to_float32(u8, sample_width=1, channels=2),
+                               [(-128 + 127) / 2 / 128, 0.0], atol=1e-7)
+
+    quad = np.tile(np.array([100, 200, 300, 400], dtype=np.int32) << 16, 3)
+    out = int_to_float32(quad, channels=4)
+    assert out.shape == (3,)
+    np.testing.assert_allclose(out, (250 << 16) / 2147483648.0, rtol=1e-6)
+
+
+def test_unsupported_sample_width():
+    with pytest.raises(ValueError):
+        int_to_float32(b"\x00\x00\x00", sample_width=3)
+
+
+def test_buffer_pool_reuses_memory():
+    pool = BufferPool()
+    a = pool.get("x", (100,))
+    b = pool.get("x", (50, 2))
+    assert b.shape == (50, 2) and np.shares_memory(a, b)
+    pool.get("x", (10,), np.int64)  # 不同 dtype 使用不同的緩衝區
+    pool.get("x", (120,))
+    assert pool.stats() == {"requests": 4, "allocations": 3}
+    pool.get("x", (150,))  # 上次已多配置 1.5 倍
+    assert pool.stats()["allocations"] == 3
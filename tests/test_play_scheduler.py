@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+import types
+
+import pytest
+
+from src.app import play_scheduler
+from src.app.play_scheduler import PlayScheduler, PRIORITY_QUICK_PHRASE, PRIORITY_TYPED
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """以手動推進的時鐘取代 play_scheduler 使用的 time 模組。"""
+    state = {"now": 1000.0}
+    fake = types.SimpleNamespace(monotonic=lambda: state["now"], perf_counter=lambda: state["now"])
+    monkeypatch.setattr(play_scheduler, "time", fake)
+
+    def advance(sec):
+        state["now"] += sec
+    return advance
+
+
+def _drain(scheduler):
+    texts = []
+    while not scheduler.empty():
+        texts.append(scheduler.get().text)
+    return texts
+
+
+def test_quick_phrases_before_typed_text_fifo_within_priority(clock):
+    s = PlayScheduler()
+    s.submit("typed 1", PRIORITY_TYPED)
+    s.submit("quick 1", PRIORITY_QUICK_PHRASE)
+    s.submit("typed 2", PRIORITY_TYPED)
+    s.submit("quick 2", PRIORITY_QUICK_PHRASE)
+    assert [p["text"] for p in s.pending()] == ["quick 1", "quick 2", "typed 1", "typed 2"]
+    assert _drain(s) == ["quick 1", "quick 2", "typed 1", "typed 2"]
+
+
+def test_duplicate_within_window_is_coalesced(clock):
+    s = PlayScheduler(coalesce_window=1.5)
+    first = s.submit("hello")
+    clock(1.0)
+    assert s.submit("hello") == first
+    assert len(s) == 1 and s.stats["coalesced"] == 1
+    # 不同優先權不合併
+    assert s.submit("hello", PRIORITY_QUICK_PHRASE) != first
+    clock(1.0)
+    assert s.submit("hello") != first
+    assert len(s) == 3
+
+
+def test_cancelled_item_does_not_swallow_resubmission(clock):
+    s = PlayScheduler(coalesce_window=10)
+    first = s.submit("hello")
+    assert s.cancel(first)
+    assert not s.cancel(first)
+    second = s.submit("hello")
+    assert second != first and len(s) == 1
+
+
+def test_overflow_rejects_new_item_of_equal_or_lower_priority(clock):
+    dropped = []
+    s = PlayScheduler(max_depth=2, on_drop=lambda item, reason: dropped.append((item.text, reason)))
+    s.submit("a")
+    s.submit("b")
+    assert s.submit("c") is None
+    assert dropped == [("c", "overflow")]
+    assert _drain(s) == ["a", "b"]
+
+
+def test_overflow_evicts_lowest_priority_newest_item(clock):
+    dropped = []
+    s = PlayScheduler(max_depth=3, on_drop=lambda item, reason: dropped.append((item.text, reason)))
+    s.submit("typed 1")
+    s.submit("quick 1", PRIORITY_QUICK_PHRASE)
+    s.submit("typed 2")
+    assert s.submit("quick 2", PRIORITY_QUICK_PHRASE) is not None
+    assert dropped == [("typed 2", "overflow")]
+    assert s.stats["overflow"] == 1
+    assert _drain(s) == ["quick 1", "quick 2", "typed 1"]
+
+
+def test_expired_items_are_dropped(clock):
+    dropped = []
+    s = PlayScheduler(deadlines={PRIORITY_QUICK_PHRASE: 5.0, PRIORITY_TYPED: 60.0},
+                      on_drop=lambda item, reason: dropped.append((item.text, reason)))
+    s.submit("quick", PRIORITY_QUICK_PHRASE)
+    s.submit("typed", PRIORITY_TYPED)
+    s.submit("forever", PRIORITY_TYPED, deadline_sec=0)
+    clock(10.0)
+    assert s.get().text == "typed"
+    assert dropped == [("quick", "expired")]
+    clock(100.0)
+    assert s.get().text == "forever"
+    assert s.stats["expired"] == 1
+
+
+def test_stop_signal_takes_precedence(clock):
+    s = PlayScheduler()
+    s.submit("a")
+    s.put_stop()
+    assert s.get() is None
+    assert s.get().text == "a"
+
+
+def test_clear_cancels_everything(clock):
+    dropped = []
+    s = PlayScheduler(on_drop=lambda item, reason: dropped.append(reason))
+    for text in ("a", "b", "c"):
+        s.submit(text)
+    assert s.clear() == 3
+    assert s.empty() and dropped == ["cancelled"] * 3
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+from src.app.ring_buffer import RingBuffer
+
+
+def test_write_and_read_wrap_around():
+    rb = RingBuffer(8)
+    assert rb.write(np.arange(6, dtype=np.float32)) == 6
+    out = np.zeros(4, dtype=np.float32)
+    assert rb.read_into(out) == 4
+    np.testing.assert_array_equal(out, [0, 1, 2, 3])
+    # 寫入位置跨過緩衝區尾端
+    assert rb.write(np.arange(6, 12, dtype=np.float32)) == 6
+    assert rb.available() == 8 and rb.free() == 0
+    out = np.zeros(8, dtype=np.float32)
+    assert rb.read_into(out) == 8
+    np.testing.assert_array_equal(out, np.arange(4, 12))
+
+
+def test_write_is_limited_by_free_space():
+    rb = RingBuffer(5)
+    assert rb.write(np.ones(7, dtype=np.float32)) == 5
+    assert rb.write(np.ones(1, dtype=np.float32)) == 0
+
+
+def test_partial_read_and_discard():
+    rb = RingBuffer(4)
+    rb.write(np.array([1, 2], dtype=np.float32))
+    out = np.full(4, -1, dtype=np.float32)
+    assert rb.read_into(out) == 2
+    np.testing.assert_array_equal(out[:2], [1, 2])
+    rb.write(np.array([3, 4, 5], dtype=np.float32))
+    rb.discard()
+    assert rb.available() == 0 and rb.free() == 4
+
+
+def test_many_wraps_preserve_order():
+    rb = RingBuffer(7)
+    data = np.arange(1000, dtype=np.float32)
+    got = []
+    pos = 0
+    out = np.zeros(3, dtype=np.float32)
+    while pos < len(data) or rb.available():
+        pos += rb.write(data[pos:pos + 5])
+        n = rb.read_into(out)
+        got.extend(out[:n])
+    np.testing.assert_array_equal(got, data)
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+from src.app.text_segmenter import segment_text, split_sentences
+
+
+def test_split_sentences_cjk_and_latin():
+    assert split_sentences("你好。今天天氣很好！Hello there. How are you?") == [
+        "你好。", "今天天氣很好！", "Hello there.", "How are you?"]
+
+
+def test_split_sentences_keeps_closers_and_repeated_punctuation():
+    assert split_sentences("「好！！」他說。Really?!\" Yes.") == ["「好！！」", "他說。", "Really?!\"", "Yes."]
+
+
+def test_split_sentences_does_not_split_decimals_or_abbreviations():
+    assert split_sentences("It costs 3.14 dollars. Mr. Smith agreed, e.g. this one.") == [
+        "It costs 3.14 dollars.", "Mr. Smith agreed, e.g. this one."]
+
+
+def test_split_sentences_merges_punctuation_only_fragments():
+    assert split_sentences("好。 …… 走吧") == ["好。……", "走吧"]
+
+
+def test_split_sentences_empty():
+    assert split_sentences("") == []
+    assert split_sentences("   ") == []
+
+
+def test_segment_text_splits_long_sentence_at_clause_breaks():
+    text = "第一段文字，" * 5 + "結束。"
+    segments = segment_text(text, max_chars=14)
+    assert all(len(s) <= 14 for s in segments)
+    assert "".join(segments) == text
+    assert all(s.endswith("，") for s in segments[:-1])
+
+
+def test_segment_text_hard_cuts_text_without_breaks():
+    segments = segment_text("啊" * 250, max_chars=100)
+    assert [len(s) for s in segments] == [100, 100, 50]
+
+    words = " ".join(["word"] * 60)
+    segments = segment_text(words, max_chars=40)
+    assert all(len(s) <= 40 for s in segments)
+    assert " ".join(segments).split() == words.split()
+
+
+def test_segment_text_limits_first_chunk():
+    text = "今天天氣很好，我們一起去公園散步吧，路上車子很多。"
+    segments = segment_text(text, first_chunk_chars=8)
+    assert segments[0] == "今天天氣很好，"
+    assert "".join(segments) == text
+
+
+def test_segment_text_first_chunk_overflows_to_next_break():
+    text = "這是一個沒有很快出現逗號的句子，後面還有。"
+    segments = segment_text(text, first_chunk_chars=6)
+    assert segments == ["這是一個沒有很快出現逗號的句子，", "後面還有。"]